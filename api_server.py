@@ -0,0 +1,222 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file implements a headless HTTP/JSON API for the agent graph, built on the standard library only.
+# Every request runs on the shared AnalystEngine (data, DuckDB, plots and graph are loaded once). Requests get an ID
+# (X-Request-ID), run under a concurrency limit and can stream one NDJSON line per finished node.
+# Run it with `python api_server.py --port 8000` (see --help for the options).
+#
+#   GET  /health   -> engine status and in-flight requests
+#   POST /invoke   -> {"question": "...", "model": "gpt-5-nano", "api_key": "...", "stream": false, "include_charts": false}
+
+import json
+import time
+import uuid
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from marketing_analyst import AnalystEngine, MarketingAnalyst, MODEL_NAMES
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+MAX_BODY_BYTES = 1024**2                                                                           # Largest accepted request body
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+def serialize_result(result: dict, include_charts: bool = False) -> dict:
+    """Convert the final graph state into a JSON-serializable response."""
+    responses = result.get('response') or []
+    charts = [chart for chart in (result.get('chart_json') or []) if chart]
+    payload = {
+        'next_action': result.get('next_action'),
+        'response': responses[0].content if responses else None,
+        'sql_query': result.get('sql_query'),
+        'insights': result.get('insights'),
+        'summary_table': result.get('summary_table'),
+        'chart_count': len(charts),
+    }
+    if include_charts:
+        payload['charts'] = [json.loads(chart) for chart in charts]
+    return payload
+
+# --------------------------------------SERVER CLASSES-------------------------------------
+
+class AgentServer(ThreadingHTTPServer):
+    """Threaded HTTP server sharing one AnalystEngine and limiting concurrent agent runs."""
+
+    daemon_threads = True
+
+    def __init__(self, address, default_model: str = 'gpt-5-nano', api_key: str = None,
+                 max_concurrent: int = 4, queue_timeout: float = 30.0):
+        """Initialize the server and warm the shared engine up.
+
+        Args:
+            address: (host, port) to listen on.
+            default_model: Model used when a request does not name one.
+            api_key: API key used when a request does not send one.
+            max_concurrent: Agent runs allowed at the same time.
+            queue_timeout: Seconds a request waits for a free slot before getting a 503.
+        """
+        if default_model not in MODEL_NAMES:
+            raise ValueError(f"Unknown model '{default_model}'. Expected one of {MODEL_NAMES}")
+        super().__init__(address, AgentRequestHandler)
+        self.default_model = default_model
+        self.api_key = api_key
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.in_flight = 0
+        self.served = 0
+        self.counter_lock = threading.Lock()
+        self.engine = AnalystEngine()                                                              # Loaded before the first request arrives
+
+class AgentRequestHandler(BaseHTTPRequestHandler):
+    """Handles /health and /invoke."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        """Route the access log through the module logger."""
+        LOGGER.info(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status: int, payload: dict, request_id: str = None, headers: dict = None):
+        """Send a complete JSON response."""
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if request_id:
+            self.send_header('X-Request-ID', request_id)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, payload: dict):
+        """Send one NDJSON line as an HTTP chunk."""
+        line = (json.dumps(payload, default=str) + '\n').encode('utf-8')
+        self.wfile.write(f'{len(line):X}\r\n'.encode('ascii') + line + b'\r\n')
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'error': f'Unknown path {self.path}'})
+            return
+        server = self.server
+        self._send_json(200, {'status': 'ok', 'engine_warmup_seconds': server.engine.warmup_seconds,
+                              'in_flight': server.in_flight, 'served': server.served,
+                              'max_concurrent': server.max_concurrent})
+
+    def do_POST(self):
+        request_id = self.headers.get('X-Request-ID') or uuid.uuid4().hex
+        if self.path != '/invoke':
+            self._send_json(404, {'error': f'Unknown path {self.path}', 'request_id': request_id}, request_id)
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {'error': 'Request body too large', 'request_id': request_id}, request_id)
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            question = body['question']
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': "Expected a JSON body with a 'question' field", 'request_id': request_id}, request_id)
+            return
+
+        server = self.server
+        model = body.get('model') or server.default_model
+        if model not in MODEL_NAMES:                                                               # Rejected before taking a slot
+            self._send_json(400, {'error': f"Unknown model '{model}'. Expected one of {MODEL_NAMES}",
+                                  'request_id': request_id}, request_id)
+            return
+        if not server.slots.acquire(timeout=server.queue_timeout):                                 # Concurrency limit
+            self._send_json(503, {'error': 'Too many concurrent requests', 'request_id': request_id},
+                            request_id, headers={'Retry-After': '1'})
+            return
+        with server.counter_lock:
+            server.in_flight += 1
+        try:
+            analyst = MarketingAnalyst(model=model,                                                  # Lightweight session on the shared engine
+                                       api_key=body.get('api_key') or server.api_key)
+            if body.get('stream'):
+                self._stream(analyst, question, request_id, body.get('include_charts', False))
+            else:
+                self._invoke(analyst, question, request_id, body.get('include_charts', False))
+        finally:
+            with server.counter_lock:
+                server.in_flight -= 1
+                server.served += 1
+            server.slots.release()
+
+    def _invoke(self, analyst, question: str, request_id: str, include_charts: bool):
+        """Run the graph and send the whole result at once."""
+        start = time.perf_counter()
+        try:
+            result = analyst.invoke_agent(question)
+        except Exception as e:
+            LOGGER.error(f"[{request_id}] Agent error: {e}")
+            self._send_json(500, {'error': str(e), 'request_id': request_id}, request_id)
+            return
+        payload = serialize_result(result, include_charts)
+        payload.update({'request_id': request_id, 'elapsed': round(time.perf_counter() - start, 4)})
+        LOGGER.info(f"[{request_id}] {payload['next_action']} answered in {payload['elapsed']:.3f}s")
+        self._send_json(200, payload, request_id)
+
+    def _stream(self, analyst, question: str, request_id: str, include_charts: bool):
+        """Run the graph and send one NDJSON line per finished node, then the result."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('X-Request-ID', request_id)
+        self.end_headers()
+
+        start = time.perf_counter()
+        try:
+            for node, update in analyst.stream_agent(question):
+                event = {'request_id': request_id, 'event': 'node', 'node': node,
+                         'elapsed': round(time.perf_counter() - start, 4)}
+                if update and update.get('next_action'):
+                    event['next_action'] = update['next_action']
+                self._send_chunk(event)
+            payload = serialize_result(analyst.get_response(), include_charts)
+            payload.update({'request_id': request_id, 'event': 'result', 'elapsed': round(time.perf_counter() - start, 4)})
+            self._send_chunk(payload)
+        except Exception as e:
+            LOGGER.error(f"[{request_id}] Agent error: {e}")
+            self._send_chunk({'request_id': request_id, 'event': 'error', 'error': str(e)})
+        self.wfile.write(b'0\r\n\r\n')                                                             # End of the chunked body
+
+# --------------------------------------MAIN-----------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the marketing analyst agents over HTTP/JSON.")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on.")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on.")
+    parser.add_argument('--model', default='gpt-5-nano', choices=MODEL_NAMES, help="Default model for requests that do not name one.")
+    parser.add_argument('--max-concurrent', type=int, default=4, help="Agent runs allowed at the same time.")
+    parser.add_argument('--queue-timeout', type=float, default=30.0, help="Seconds to wait for a free slot before a 503.")
+    args = parser.parse_args()
+
+    server = AgentServer((args.host, args.port), default_model=args.model,
+                         max_concurrent=args.max_concurrent, queue_timeout=args.queue_timeout)
+    LOGGER.info(f"Agent API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        LOGGER.info("Stopping agent API.")
+        server.shutdown()
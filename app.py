@@ -6,11 +6,12 @@
 
 import time
 import logging
-from openai import OpenAI
+import threading
 import streamlit as st
-import plotly.io as pio
 
-from marketing_analyst import MarketingAnalyst
+from marketing_analyst import AnalystEngine, MarketingAnalyst
+from key_validation import KeyValidator
+from plot_history import PlotHistory
 from langchain_community.chat_message_histories import StreamlitChatMessageHistory
 
 # --------------------------------------LOGGING--------------------------------------------
@@ -24,51 +25,113 @@ logging.basicConfig(
 logging.getLogger("httpx").setLevel(logging.WARNING)
 LOGGER = logging.getLogger(__name__)
 
+RECENT_TURNS = 5                                                                                                # Turns of the chat history rendered in full on every rerun
+HISTORY_PAGE_SIZE = 20                                                                                          # Collapsed older turns listed per page
+
 # --------------------------------------HELPER_FUNCTIONS------------------------------------
 
+def split_turns(messages):
+    """
+    Description: Group chat messages into turns. Every human message starts a new turn.
+    Args:
+        messages (list): Messages of StreamlitChatMessageHistory.
+    Returns:
+        list: Turns, each one a list of (position, message) tuples.
+    """
+    turns = []
+    for position, msg in enumerate(messages):
+        if msg.type == "human" or not turns:
+            turns.append([])
+        turns[-1].append((position, msg))
+    return turns
+
+def summarize_turn(turn) -> str:
+    """
+    Description: One-line summary of a collapsed turn (question, number of charts and whether it ran SQL).
+    Args:
+        turn (list): (position, message) tuples of the turn.
+    Returns:
+        str: Summary label.
+    """
+    question = next((msg.content for _, msg in turn if msg.type == "human"), turn[0][1].content)
+    question = question if len(question) <= 80 else question[:77] + "..."
+    charts = sum(msg.content.startswith("PLOT:") for _, msg in turn)
+    details = [f"📊 {charts}" if charts else "", "🔍 SQL" if any(msg.content.startswith("SQL_INDEX:") for _, msg in turn) else ""]
+    return " ".join([f"💬 {question}"] + [detail for detail in details if detail])
+
+def display_message(position, msg):
+    """
+    Description: Display one message of the chat history (text, plot or SQL query).
+    Safely replay plots and SQL queries stored in session state. If a plot or SQL query referenced by
+    the message is missing, show a warning instead of raising an exception.
+
+    Args:
+        position (int): Position of the message in the history (used for unique widget keys).
+        msg (BaseMessage): Message to display.
+    Returns:
+        None
+    """
+    with st.chat_message(msg.type):                                                                         # Display each message in the chat
+        # Replay Plotly charts if a plot hash marker was stored
+        if msg.content.startswith("PLOT:"):
+            try:
+                plot_hash = msg.content.split("PLOT:", 1)[1]                                                # Extract plot content hash
+                if "plots" not in st.session_state or plot_hash not in st.session_state.plots:
+                    st.warning(f"Plot not available ({plot_hash}).")
+                else:
+                    st.plotly_chart(st.session_state.plots.get_figure(plot_hash), key=f"history_plot_{position}")
+            except Exception as e:
+                st.warning(f"Could not replay plot: {e}")
+
+        # Replay stored SQL queries if a SQL index marker was stored
+        elif msg.content.startswith("SQL_INDEX:"):                                                          # Replay stored SQL queries if a SQL index marker was stored
+            try:
+                sql_index = int(msg.content.split("SQL_INDEX:", 1)[1])                                      # Extract SQL index
+                if ("sql_queries" in st.session_state and 0 <= sql_index < len(st.session_state.sql_queries)):
+                    sql_data = st.session_state.sql_queries[sql_index]                                      # Retrieve SQL query and response
+                    tab1, tab2 = st.tabs(["👨‍💼 AI Response", "🔍 SQL Query"])                               # Create the tabs
+                    with tab1:
+                        st.write(sql_data.get("response", ""))                                              # Display AI Response
+                    with tab2:
+                        st.code(sql_data.get("query", ""), language="sql")                                  # Display the SQL query
+                else:
+                    st.warning(f"SQL query not available (index={sql_index}).")
+            except Exception as e:
+                st.warning(f"Could not replay SQL query: {e}")
+
+        # Regular text message
+        else:
+            st.write(msg.content)
+
 def display_chat_history():
     """
     Description: Display chat history including text messages and plots.
-    Safely replay plots and SQL queries stored in session state. If an index stored in the
-    message is missing or invalid, show a warning instead of raising an exception.
+    Only the latest RECENT_TURNS turns are rendered in full. Older turns are listed as one-line summaries,
+    a page of HISTORY_PAGE_SIZE at a time, and rendered only when the user expands them, so the cost of
+    a rerun does not grow with the length of the conversation.
 
     Args:
         None
     Returns:
         None
     """
-    for msg in msgs.messages:                                                                                   # Iterate through stored messages
-        with st.chat_message(msg.type):                                                                         # Display each message in the chat
-            # Replay Plotly charts if a plot index marker was stored
-            if msg.content.startswith("PLOT_INDEX:"):
-                try:
-                    plot_index = int(msg.content.split("PLOT_INDEX:", 1)[1])                                    # Extract plot index
-                    if "plots" in st.session_state and 0 <= plot_index < len(st.session_state.plots):           # Check if plot index is valid
-                        st.plotly_chart(st.session_state.plots[plot_index], key=f"history_plot_{plot_index}")   # Display the plot
-                    else:
-                        st.warning(f"Plot not available (index={plot_index}).")
-                except Exception as e:
-                    st.warning(f"Could not replay plot: {e}")
-
-            # Replay stored SQL queries if a SQL index marker was stored
-            elif msg.content.startswith("SQL_INDEX:"):                                                          # Replay stored SQL queries if a SQL index marker was stored
-                try:
-                    sql_index = int(msg.content.split("SQL_INDEX:", 1)[1])                                      # Extract SQL index
-                    if ("sql_queries" in st.session_state and 0 <= sql_index < len(st.session_state.sql_queries)):
-                        sql_data = st.session_state.sql_queries[sql_index]                                      # Retrieve SQL query and response
-                        tab1, tab2 = st.tabs(["👨‍💼 AI Response", "🔍 SQL Query"])                               # Create the tabs
-                        with tab1:
-                            st.write(sql_data.get("response", ""))                                              # Display AI Response
-                        with tab2:
-                            st.code(sql_data.get("query", ""), language="sql")                                  # Display the SQL query
-                    else:
-                        st.warning(f"SQL query not available (index={sql_index}).")
-                except Exception as e:
-                    st.warning(f"Could not replay SQL query: {e}")
-
-            # Regular text message
-            else:
-                st.write(msg.content)
+    turns = split_turns(msgs.messages)
+    older, recent = turns[:-RECENT_TURNS], turns[-RECENT_TURNS:]
+
+    if older:
+        if "history_pages" not in st.session_state:                                                             # Pages of collapsed turns listed
+            st.session_state.history_pages = 1
+        hidden = len(older) - st.session_state.history_pages * HISTORY_PAGE_SIZE
+        if hidden > 0 and st.button(f"⬆️ Load earlier turns ({hidden} hidden)", key="load_earlier_turns"):
+            st.session_state.history_pages += 1
+        for turn in older[-st.session_state.history_pages * HISTORY_PAGE_SIZE:]:
+            if st.toggle(summarize_turn(turn), key=f"expand_turn_{turn[0][0]}"):                              # Render an older turn only on demand
+                for position, msg in turn:
+                    display_message(position, msg)
+
+    for turn in recent:
+        for position, msg in turn:
+            display_message(position, msg)
 
 def display_plots(result):
     """
@@ -83,14 +146,38 @@ def display_plots(result):
     if chart_json_list:
         for chart_json in chart_json_list:
             try:
-                plot_obj = pio.from_json(chart_json)
-                plot_index = len(st.session_state.plots)
-                st.session_state.plots.append(plot_obj)
-                msgs.add_ai_message(f"PLOT_INDEX:{plot_index}")
-                st.plotly_chart(plot_obj)
+                plot_hash = st.session_state.plots.add(chart_json)                                      # Stored once per content
+                msgs.add_ai_message(f"PLOT:{plot_hash}")
+                st.plotly_chart(st.session_state.plots.get_figure(plot_hash))
             except Exception as e:
                 st.warning(f"Could not display chart: {str(e)}")
 
+def display_trace_panel(trace):
+    """
+    Description: Show the latency breakdown of the last turn (time, calls, tokens and bytes per span) in a collapsible sidebar panel.
+    Args:
+        trace (dict): Trace returned by MarketingAnalyst.get_last_trace().
+    Returns:
+        None
+    """
+    with st.sidebar.expander(f"⏱️ Last turn: {trace['duration_ms'] / 1000:.2f}s ({trace.get('route')})", expanded=False):
+        rows = [{'span': name, **totals} for name, totals in
+                sorted(trace['breakdown'].items(), key=lambda item: item[1]['duration_ms'], reverse=True)]
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        if trace.get('profile'):
+            st.caption(f"Profile saved to {trace['profile']['path']}")
+
+@st.cache_resource(show_spinner="Loading data...")
+def get_engine():
+    """
+    Description: Get the process-wide analyst engine (data, DuckDB, plots and graph), created once and shared by all sessions.
+    Args:
+        None
+    Returns:
+        AnalystEngine: Shared engine
+    """
+    return AnalystEngine()
+
 # --------------------------------------INITIALIZATION--------------------------------------
 
 MODEL_LIST = ["gpt-5-nano", "gpt-4.1-nano", "gpt-4o-mini"]
@@ -152,8 +239,13 @@ if "api_key_valid" not in st.session_state:
 if "OPENAI_API_KEY" not in st.session_state:                                                        # Initialize session state for OpenAI API key 
     st.session_state["OPENAI_API_KEY"] = ""
 
+if "startup_timings" not in st.session_state:                                                       # Time-to-interactive breakdown, logged once per session
+    st.session_state.startup_timings = {}
+    st.session_state.bootstrap_started = None
+
+key_input = st.sidebar.empty()                                                                      # Placeholder so the input disappears in the same run it is validated
 if not st.session_state.api_key_valid:                                                              # Only show input field if API key is not yet validated
-    st.session_state["OPENAI_API_KEY"] = st.sidebar.text_input(
+    st.session_state["OPENAI_API_KEY"] = key_input.text_input(
         "Introduce your OpenAI API Key",
         type="password",
         help="Your OpenAI API key is required for the app to function.",
@@ -161,14 +253,18 @@ if not st.session_state.api_key_valid:
 
 if st.session_state["OPENAI_API_KEY"]:                                                              # If an API key is provided, check its validity
     if not st.session_state.api_key_valid:
-        try:
-            client = OpenAI(api_key=st.session_state["OPENAI_API_KEY"])                             # Initialize OpenAI client and validate API key by operation
-            client.models.list()
+        st.session_state.bootstrap_started = time.perf_counter()
+        if AnalystEngine._instance is None:                                                         # Warm the shared engine up while the key is validated
+            threading.Thread(target=AnalystEngine, name='engine-warmup', daemon=True).start()
+
+        valid, cached = KeyValidator().validate(st.session_state["OPENAI_API_KEY"])                 # Salted-hash cache, the API is only called on a miss
+        st.session_state.startup_timings['key_validation'] = round(time.perf_counter() - st.session_state.bootstrap_started, 4)
+        st.session_state.startup_timings['key_cached'] = cached
+        if valid:
             st.session_state.api_key_valid = True                                                   # Set API key as valid
-            success_key = st.sidebar.success("API Key validated successfully!")                     # Display success message for 1 second
-            time.sleep(1)
-            success_key.empty()
-        except Exception as e:                                                                      # If validation fails, show error and reset flag 
+            key_input.empty()                                                                       # Remove the API key input field
+            st.toast("API Key validated successfully!", icon="✅")                                  # Non-blocking banner
+        else:                                                                                       # If validation fails, show error and reset flag 
             st.session_state.api_key_valid = False
             st.sidebar.error(f"Invalid API Key: Please try again.")
             st.stop()
@@ -185,14 +281,17 @@ if "current_model" not in st.session_state:
 
 if st.session_state.current_model != model_option:                                                  # Reinitialize if model changed
     st.session_state.current_model = model_option                                                   # Update current model in session state
-    st.session_state.marketing_analyst = MarketingAnalyst(                                          # Initialize Marketing Analyst agent with a selected model and API key
-        model=model_option, 
-        api_key=st.session_state["OPENAI_API_KEY"]
-    )
-    success_model = st.sidebar.success(f"Initialized with {model_option}")                          # Display success message for 1 second
-    time.sleep(1)
-    success_model.empty()
-    st.rerun()                                                                                      # Rerun to apply changes to remove the API key input field
+    engine_wait = time.perf_counter()
+    get_engine()                                                                                    # Shared data, DuckDB, plots and graph (built once per process)
+    st.session_state.startup_timings.setdefault('engine_wait', round(time.perf_counter() - engine_wait, 4))
+    if st.session_state.marketing_analyst is None:
+        st.session_state.marketing_analyst = MarketingAnalyst(                                      # Initialize Marketing Analyst agent with a selected model and API key
+            model=model_option, 
+            api_key=st.session_state["OPENAI_API_KEY"]
+        )
+    else:
+        st.session_state.marketing_analyst.set_model(model_option)                                  # Only the model changes, the engine is reused
+    st.toast(f"Initialized with {model_option}")                                                    # Non-blocking banner
 
 marketing_analyst = st.session_state.marketing_analyst                                              # Get the marketing analyst instance
 
@@ -203,8 +302,8 @@ msgs = StreamlitChatMessageHistory(key="langchain_messages")
 if len(msgs.messages) == 0:                                                                         # If no previous messages, add a welcome message                                         
     msgs.add_ai_message("How can I help you?")
 
-if "plots" not in st.session_state:                                                                 # Initialize session state for storing plots
-    st.session_state.plots = []
+if "plots" not in st.session_state:                                                                 # Initialize session state for storing plots (deduplicated, spilled to disk)
+    st.session_state.plots = PlotHistory(recent_turns=RECENT_TURNS)
 
 if "sql_queries" not in st.session_state:                                                           # Initialize session state for storing SQL queries
     st.session_state.sql_queries = []
@@ -212,15 +311,25 @@ if "sql_queries" not in st.session_state:
 # Render current messages from StreamlitChatMessageHistory
 display_chat_history()
 
+if st.session_state.bootstrap_started is not None and 'time_to_interactive' not in st.session_state.startup_timings:
+    timings = st.session_state.startup_timings
+    timings['engine_warmup'] = get_engine().warmup_seconds                                          # Build time of the shared engine (0 wait if already warm)
+    timings['time_to_interactive'] = round(time.perf_counter() - st.session_state.bootstrap_started, 4)
+    LOGGER.info(f"Session startup timings (s): {timings}")
+
 # --------------------------------------CONVERSATION-----------------------------------------
 
+show_trace = st.sidebar.toggle("Show latency breakdown", value=False)                               # Per-turn spans recorded by tracing.py
+profile_option = st.sidebar.selectbox("Profile next question", [None, 'cprofile', 'pyinstrument'],
+                                      format_func=lambda option: option or 'off') if show_trace else None
+
 if question := st.chat_input("Enter your question here:", key="query_input"):
     with st.spinner("Thinking..."):                                                                 # Show a message while processing
         st.chat_message("human").write(question)                                                    # Display user message in chat
         msgs.add_user_message(question)                                                             # Adding user message to history      
 
         try:
-            marketing_analyst.invoke_agent(user_instructions=question)                              # Invoke the Marketing Analyst agent   
+            marketing_analyst.invoke_agent(user_instructions=question, profile=profile_option)      # Invoke the Marketing Analyst agent   
             result = marketing_analyst.get_response()                                               # Get the response
         except Exception as e:
             st.chat_message("ai").write(f"An error occurred while processing your query: {str(e)}") 
@@ -259,4 +368,7 @@ if question := st.chat_input("Enter your question here:", key="query_input"):
             with st.chat_message("ai"):
                 st.markdown(response_content)                                                       # Display AI message in chat
                 display_plots(result)                                                               # Display available plots
-            msgs.add_ai_message(response_content)                                                   # Add AI message to history
\ No newline at end of file
+            msgs.add_ai_message(response_content)                                                   # Add AI message to history
+
+if show_trace and marketing_analyst.get_last_trace():                                               # Rendered last so it shows the turn just answered
+    display_trace_panel(marketing_analyst.get_last_trace())
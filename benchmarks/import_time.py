@@ -0,0 +1,175 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file reports where cold start time goes. Every module is imported in a fresh interpreter with
+# `python -X importtime` and the output is aggregated per top-level package and per direct import of the module. The
+# deferred startup stages of the agents (graph compilation and engine warmup) are timed in a fresh process as well.
+# Results are written as JSON and can be compared with a previous run:
+# python -m benchmarks.import_time --modules marketing_analyst api_server --compare old.json
+
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import subprocess
+
+from benchmarks.segmentation_benchmark import get_commit
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ['marketing_analyst', 'api_server', 'customer_segmentation']
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)\s*$')
+
+# Deferred startup stages, timed in a fresh process after the import
+STAGES_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import marketing_analyst
+timings = {'import': time.perf_counter() - start}
+start = time.perf_counter()
+marketing_analyst.get_graph()
+timings['graph_build'] = time.perf_counter() - start
+if %(warmup)s:
+    start = time.perf_counter()
+    marketing_analyst.AnalystEngine(db_path=%(db_path)r)
+    timings['engine_warmup'] = time.perf_counter() - start
+print('STAGES ' + json.dumps(timings))
+"""
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+def _run(args: list) -> subprocess.CompletedProcess:
+    """Run a fresh interpreter with the repository on the path."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    return subprocess.run([sys.executable] + args, capture_output=True, text=True, env=env)
+
+def parse_importtime(stderr: str) -> list:
+    """Parse `-X importtime` output into (module, depth, self_ms, cumulative_ms) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append({'module': name, 'depth': (len(indent) - 1) // 2,
+                         'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+    return rows
+
+def import_report(module: str, top: int = 15) -> dict:
+    """Import a module in a fresh interpreter and aggregate where the import time goes.
+
+    Returns:
+        dict: total_ms, the direct imports of the module and the top-level packages ranked by time.
+    """
+    result = _run(['-X', 'importtime', '-c', f'import {module}'])
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    rows = parse_importtime(result.stderr)
+    target = next(row for row in reversed(rows) if row['module'] == module and row['depth'] == 0)
+
+    packages = {}
+    for row in rows:
+        package = row['module'].split('.')[0]
+        packages[package] = packages.get(package, 0.0) + row['self_ms']                             # Self times add up without double counting
+
+    # Direct imports are the rows one level below the module (importtime prints children before their parent)
+    direct = [row for row in rows if row['depth'] == 1 and row['module'].split('.')[0] != module]
+    return {
+        'module': module,
+        'total_ms': round(target['cumulative_ms'], 3),
+        'modules_imported': len(rows),
+        'direct_imports': sorted(({'module': row['module'], 'cumulative_ms': round(row['cumulative_ms'], 3)} for row in direct),
+                                 key=lambda row: row['cumulative_ms'], reverse=True)[:top],
+        'packages': [{'package': name, 'self_ms': round(ms, 3)} for name, ms in
+                     sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]],
+    }
+
+def startup_stages(db_path: str = None) -> dict:
+    """Time the import of marketing_analyst, the deferred graph build and (with a database) the engine warmup."""
+    result = _run(['-c', STAGES_SCRIPT % {'warmup': bool(db_path), 'db_path': db_path or ''}])
+    line = next((line for line in result.stdout.splitlines() if line.startswith('STAGES ')), None)
+    if line is None:
+        raise RuntimeError(f"Startup stages failed:\n{result.stderr[-2000:]}")
+    return {stage: round(seconds * 1000, 3) for stage, seconds in json.loads(line[len('STAGES '):]).items()}
+
+def benchmark(modules: list, repeat: int = 3, top: int = 15, db_path: str = None) -> dict:
+    """Best of `repeat` cold imports per module, plus the deferred startup stages."""
+    results = {}
+    for module in modules:
+        runs = [import_report(module, top) for _ in range(repeat)]
+        results[module] = min(runs, key=lambda run: run['total_ms'])                             # Least disturbed run
+        LOGGER.info(f"{module}: {results[module]['total_ms']:.1f} ms")
+    return {
+        'benchmark': 'import_time',
+        'commit': get_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'repeat': repeat,
+        'modules': results,
+        'startup_stages_ms': startup_stages(db_path),
+    }
+
+def compare(current: dict, baseline: dict) -> list:
+    """Ratio current / baseline of the import time of every module and of every startup stage."""
+    rows = []
+    for module, report in current['modules'].items():
+        old = baseline.get('modules', {}).get(module)
+        if old and old['total_ms']:
+            rows.append({'metric': f'import {module}', 'baseline_ms': old['total_ms'], 'current_ms': report['total_ms'],
+                         'ratio': round(report['total_ms'] / old['total_ms'], 3)})
+    for stage, ms in current['startup_stages_ms'].items():
+        old = baseline.get('startup_stages_ms', {}).get(stage)
+        if old:
+            rows.append({'metric': stage, 'baseline_ms': old, 'current_ms': ms, 'ratio': round(ms / old, 3)})
+    return rows
+
+# --------------------------------------MAIN-----------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report cold import time per module and deferred startup stages.")
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES, help="Modules to import.")
+    parser.add_argument('--repeat', type=int, default=3, help="Cold imports per module (best is kept).")
+    parser.add_argument('--top', type=int, default=15, help="Rows of the per-package and per-import tables.")
+    parser.add_argument('--db-path', default=None, help="Database to also time the engine warmup (e.g. data/leads_scored.db).")
+    parser.add_argument('--output', default=None, help="Results file (default: benchmarks/results/import_time_<commit>.json).")
+    parser.add_argument('--compare', default=None, help="Previous results file to compare with.")
+    args = parser.parse_args()
+
+    run = benchmark(args.modules, args.repeat, args.top, args.db_path)
+
+    for module, report in run['modules'].items():
+        print(f"\n{module}: {report['total_ms']:.1f} ms ({report['modules_imported']} modules)")
+        print(f"  {'direct import':<40} {'cumulative ms':>14}")
+        for row in report['direct_imports']:
+            print(f"  {row['module']:<40} {row['cumulative_ms']:>14.1f}")
+        print(f"  {'package':<40} {'self ms':>14}")
+        for row in report['packages']:
+            print(f"  {row['package']:<40} {row['self_ms']:>14.1f}")
+    print(f"\nstartup stages (ms): {run['startup_stages_ms']}")
+
+    output = args.output or os.path.join('benchmarks', 'results', f"import_time_{run['commit']}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(run, f, indent=2)
+    LOGGER.info(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        for row in compare(run, baseline):
+            print(f"{row['metric']:<40} {row['baseline_ms']:>10} -> {row['current_ms']:>10} ms (x{row['ratio']})")
@@ -0,0 +1,206 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file load-tests the agents with many concurrent MarketingAnalyst sessions. Every session asks a
+# seeded mix of the example questions of app.py using the 'stub' model (stub_llm) with an artificial latency, so the
+# run needs no network and the LLM time is controlled. It reports p50/p95/p99 latency per route, throughput, CPU and
+# peak RSS, and flags regressions against a stored baseline:
+# python -m benchmarks.load_test --sessions 50 --turns 4 --compare benchmarks/results/load_<commit>.json
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.segmentation_benchmark import peak_rss_mb, get_commit
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+PERCENTILES = [50, 95, 99]
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+def load_example_questions(app_path: str = APP_PATH) -> list:
+    """Read the questions listed in the 'Example Questions' expander of app.py."""
+    with open(app_path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    block = source.split('st.expander("Example Questions"', 1)[1].split('"""', 2)[1]               # Text of the st.write block
+    return [question.strip() for question in re.findall(r'^\s*-\s+(.+)$', block, re.MULTILINE)]
+
+def cpu_seconds() -> float:
+    """User + system CPU time consumed by this process."""
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def run_session(session_id: int, questions: list, turns: int, seed: int, think_time: float) -> list:
+    """Run one simulated analyst session and return one record per request."""
+    from marketing_analyst import MarketingAnalyst
+
+    rng = random.Random(seed + session_id)
+    analyst = MarketingAnalyst(model='stub')                                                        # Lightweight session on the shared engine
+    records = []
+    for _ in range(turns):
+        question = rng.choice(questions)
+        start = time.perf_counter()
+        try:
+            result = analyst.invoke_agent(question)
+            route, error = result.get('next_action') or 'unknown', None
+        except Exception as e:
+            route, error = 'error', str(e)
+        records.append({'session': session_id, 'question': question, 'route': route,
+                        'latency': time.perf_counter() - start, 'error': error})
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))                                              # User reading the answer
+    return records
+
+def summarize(latencies: list) -> dict:
+    """Count and p50/p95/p99/mean/max of a list of latencies."""
+    values = np.asarray(latencies, dtype=float)
+    summary = {'count': int(values.size)}
+    if values.size:
+        summary.update({f'p{p}': round(float(np.percentile(values, p)), 4) for p in PERCENTILES})
+        summary.update({'mean': round(float(values.mean()), 4), 'max': round(float(values.max()), 4)})
+    return summary
+
+def load_test(sessions: int = 50, turns: int = 4, llm_latency: float = 0.8, llm_jitter: float = 0.3,
+              think_time: float = 0.0, seed: int = 42) -> dict:
+    """Drive concurrent sessions through the full graph and collect latency, throughput and resource usage.
+
+    Args:
+        sessions: Concurrent analyst sessions.
+        turns: Questions asked by every session.
+        llm_latency: Mean seconds of every stub LLM call.
+        llm_jitter: Standard deviation of the stub LLM latency.
+        think_time: Mean seconds between two questions of a session.
+        seed: Seed of the question mix, think times and stub LLM latencies.
+
+    Returns:
+        dict: Run metadata, overall and per-route latency summaries, throughput, CPU and peak RSS.
+    """
+    os.environ['STUB_LLM_LATENCY'] = str(llm_latency)                                              # Part of the stub cache key: a new stub is built
+    os.environ['STUB_LLM_LATENCY_JITTER'] = str(llm_jitter)
+    os.environ['STUB_LLM_LATENCY_SEED'] = str(seed)
+
+    from marketing_analyst import AnalystEngine
+    warmup_start = time.perf_counter()
+    AnalystEngine()                                                                                # Shared engine built before the clock starts
+    warmup = time.perf_counter() - warmup_start
+
+    questions = load_example_questions()
+    LOGGER.info(f"Load test: {sessions} sessions x {turns} turns over {len(questions)} example questions")
+
+    cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, i, questions, turns, seed, think_time) for i in range(sessions)]
+        records = [record for future in futures for record in future.result()]
+    wall = time.perf_counter() - wall_start
+    cpu = cpu_seconds() - cpu_start
+
+    routes = sorted({record['route'] for record in records})
+    return {
+        'benchmark': 'load_test',
+        'commit': get_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {'sessions': sessions, 'turns': turns, 'llm_latency': llm_latency, 'llm_jitter': llm_jitter,
+                   'think_time': think_time, 'seed': seed},
+        'cpu_count': os.cpu_count(),
+        'engine_warmup_seconds': round(warmup, 4),
+        'wall_seconds': round(wall, 4),
+        'requests': len(records),
+        'errors': sum(record['error'] is not None for record in records),
+        'throughput_rps': round(len(records) / wall, 4) if wall else None,
+        'cpu_seconds': round(cpu, 4),
+        'cpu_utilization': round(cpu / wall, 4) if wall else None,                                 # Average busy cores
+        'peak_rss_mb': peak_rss_mb(),
+        'overall': summarize([record['latency'] for record in records]),
+        'routes': {route: summarize([r['latency'] for r in records if r['route'] == route]) for route in routes},
+    }
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.2) -> list:
+    """Compare a run with a baseline and flag metrics that got worse by more than the tolerance.
+
+    Latencies, CPU and RSS regress when they grow; throughput regresses when it drops.
+
+    Returns:
+        list: One row per compared metric with baseline, current, ratio and a regression flag.
+    """
+    rows = []
+
+    def add(metric, old, new, higher_is_better=False):
+        if old is None or new is None or not old:
+            return
+        ratio = new / old
+        regression = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+        rows.append({'metric': metric, 'baseline': old, 'current': new, 'ratio': round(ratio, 3),
+                     'regression': regression})
+
+    add('throughput_rps', baseline.get('throughput_rps'), current.get('throughput_rps'), higher_is_better=True)
+    add('cpu_seconds', baseline.get('cpu_seconds'), current.get('cpu_seconds'))
+    add('peak_rss_mb', baseline.get('peak_rss_mb'), current.get('peak_rss_mb'))
+    for p in PERCENTILES:
+        add(f'overall.p{p}', baseline['overall'].get(f'p{p}'), current['overall'].get(f'p{p}'))
+    for route, summary in current['routes'].items():
+        previous = baseline.get('routes', {}).get(route, {})
+        for p in PERCENTILES:
+            add(f'{route}.p{p}', previous.get(f'p{p}'), summary.get(f'p{p}'))
+    return rows
+
+# --------------------------------------MAIN-----------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the agents with concurrent stub-LLM sessions.")
+    parser.add_argument('--sessions', type=int, default=50, help="Concurrent analyst sessions.")
+    parser.add_argument('--turns', type=int, default=4, help="Questions per session.")
+    parser.add_argument('--llm-latency', type=float, default=0.8, help="Mean seconds per stub LLM call.")
+    parser.add_argument('--llm-jitter', type=float, default=0.3, help="Standard deviation of the stub LLM latency.")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Mean seconds between questions of a session.")
+    parser.add_argument('--seed', type=int, default=42, help="Seed of the question mix and latencies.")
+    parser.add_argument('--output', default=None, help="Results file (default: benchmarks/results/load_<commit>.json).")
+    parser.add_argument('--compare', default=None, help="Baseline results file to flag regressions against.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Relative change tolerated before flagging.")
+    args = parser.parse_args()
+
+    run = load_test(args.sessions, args.turns, args.llm_latency, args.llm_jitter, args.think_time, args.seed)
+
+    print(f"{'route':<20} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, summary in list(run['routes'].items()) + [('overall', run['overall'])]:
+        print(f"{route:<20} {summary['count']:>6} {summary.get('p50', 0):>8} {summary.get('p95', 0):>8} {summary.get('p99', 0):>8}")
+    print(f"throughput {run['throughput_rps']} req/s, CPU {run['cpu_utilization']} cores, "
+          f"peak RSS {run['peak_rss_mb']} MB, errors {run['errors']}")
+
+    output = args.output or os.path.join('benchmarks', 'results', f"load_{run['commit']}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(run, f, indent=2)
+    LOGGER.info(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        rows = compare(run, baseline, args.tolerance)
+        for row in rows:
+            flag = 'REGRESSION' if row['regression'] else ''
+            print(f"{row['metric']:<32} {row['baseline']:>10} -> {row['current']:>10} (x{row['ratio']}) {flag}")
+        if any(row['regression'] for row in rows):
+            sys.exit(1)
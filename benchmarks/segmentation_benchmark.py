@@ -0,0 +1,177 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file benchmarks customer_segmentation on synthetic databases of growing size. The production path
+# is timed stage by stage (load_features, segment_customers, update_database) and end to end (run_segmentation), in a
+# fresh process per size so the reported peak RSS belongs to that size only. Every run works on a fresh copy of the
+# generated database, because update_database rewrites it. Results are written as JSON and can be compared with a
+# previous run: python -m benchmarks.segmentation_benchmark --sizes 10000 100000 --compare old.json
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import subprocess
+import multiprocessing
+
+from benchmarks.synthetic_data import generate_database
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]                                                       # Add 10_000_000 with --sizes on a large machine
+STAGES = ['load_features', 'segment_customers', 'update_database']
+END_TO_END = 'run_segmentation'                                                                    # Whole pipeline, timed on its own copy
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the current process in MB."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024**2 if sys.platform == 'darwin' else peak / 1024, 1)                 # Bytes on macOS, KB on Linux
+
+def get_commit() -> str:
+    """Current git commit, used to tag the results."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+def fresh_copy(db_path: str, suffix: str) -> str:
+    """Copy the generated database so that a run never measures a database rewritten by a previous one."""
+    root, extension = os.path.splitext(db_path)
+    copy_path = f'{root}_{suffix}{extension}'
+    shutil.copyfile(db_path, copy_path)
+    return copy_path
+
+def run_stages(db_path: str, n_clusters: int = 5) -> dict:
+    """Time the production segmentation path on one database (runs inside a dedicated process)."""
+    # Imported in the worker so that import cost and memory are not charged to the parent
+    from customer_segmentation import (get_db_connection, load_features, segment_customers_with_centroids,
+                                       update_database, run_segmentation)
+
+    timings = {}
+    stages_path = fresh_copy(db_path, 'stages')
+    conn = get_db_connection(stages_path)
+    try:
+        start = time.perf_counter()
+        customer_data, X_scaled = load_features(stages_path, conn)
+        timings['load_features'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        customer_data, _ = segment_customers_with_centroids(customer_data, X_scaled, n_clusters=n_clusters)
+        timings['segment_customers'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        update_database(conn, customer_data)
+        timings['update_database'] = time.perf_counter() - start
+    finally:
+        conn.close()
+        os.remove(stages_path)
+
+    end_to_end_path = fresh_copy(db_path, 'end_to_end')
+    state_path = os.path.splitext(end_to_end_path)[0] + '_state.json'                                # No saved centroids: same work as a first run
+    try:
+        start = time.perf_counter()
+        run_segmentation(end_to_end_path, state_path=state_path)
+        end_to_end = time.perf_counter() - start
+    finally:
+        for path in (end_to_end_path, state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    return {'stages': {stage: round(seconds, 4) for stage, seconds in timings.items()},
+            END_TO_END: round(end_to_end, 4),
+            'peak_rss_mb': peak_rss_mb()}
+
+def benchmark(sizes: list, work_dir: str = 'data/benchmarks', n_clusters: int = 5, reuse: bool = True) -> dict:
+    """Generate (or reuse) a database per size and time the segmentation pipeline on fresh copies of it.
+
+    Returns:
+        dict: Run metadata and one result per size.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    context = multiprocessing.get_context('spawn')                                                 # Fresh interpreter per size: clean peak RSS
+    results = []
+    for size in sizes:
+        db_path = os.path.join(work_dir, f'synthetic_{size}.db')
+        if not (reuse and os.path.exists(db_path)):
+            generate_database(db_path, size)
+
+        LOGGER.info(f"Benchmarking segmentation with {size:,} customers...")
+        with context.Pool(processes=1) as pool:
+            result = pool.apply(run_stages, (db_path, n_clusters))
+        result['customers'] = size
+        result['total_seconds'] = round(sum(result['stages'].values()), 4)
+        LOGGER.info(f"{size:,} customers: {result['stages']} {END_TO_END} {result[END_TO_END]}s "
+                    f"peak RSS {result['peak_rss_mb']} MB")
+        results.append(result)
+
+    return {
+        'benchmark': 'segmentation',
+        'commit': get_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+
+def compare(current: dict, baseline: dict) -> list:
+    """Ratio current/baseline of every stage time and peak RSS, for the sizes present in both runs."""
+    baseline_by_size = {result['customers']: result for result in baseline.get('results', [])}
+    rows = []
+    for result in current['results']:
+        previous = baseline_by_size.get(result['customers'])
+        if previous is None:
+            continue
+        for stage in STAGES + [END_TO_END, 'total_seconds', 'peak_rss_mb']:
+            new = result['stages'].get(stage) if stage in STAGES else result.get(stage)
+            old = previous['stages'].get(stage) if stage in STAGES else previous.get(stage)
+            if new is None or not old:
+                continue
+            rows.append({'customers': result['customers'], 'metric': stage, 'baseline': old,
+                         'current': new, 'ratio': round(new / old, 3)})
+    return rows
+
+# --------------------------------------MAIN-----------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark customer segmentation on synthetic data.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Numbers of customers to test.")
+    parser.add_argument('--work-dir', default='data/benchmarks', help="Where synthetic databases are stored.")
+    parser.add_argument('--output', default=None, help="Results file (default: benchmarks/results/segmentation_<commit>.json).")
+    parser.add_argument('--compare', default=None, help="Previous results file to compare against.")
+    parser.add_argument('--regenerate', action='store_true', help="Rebuild the synthetic databases.")
+    args = parser.parse_args()
+
+    run = benchmark(args.sizes, args.work_dir, reuse=not args.regenerate)
+
+    output = args.output or os.path.join('benchmarks', 'results', f"segmentation_{run['commit']}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(run, f, indent=2)
+    LOGGER.info(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        for row in compare(run, baseline):
+            print(f"{row['customers']:>12,} {row['metric']:<18} {row['baseline']:>10} -> {row['current']:>10} (x{row['ratio']})")
@@ -0,0 +1,125 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file generates a synthetic SQLite database with the leads, leads_scored, transactions and products
+# tables documented in prompts.py. Rows are written in chunks, so databases with millions of customers can be built
+# with bounded memory. Usage: python -m benchmarks.synthetic_data --customers 100000 --db-path data/synthetic.db
+
+import os
+import sqlite3
+import logging
+import argparse
+import numpy as np
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+COUNTRIES = np.array(['US', 'CA', 'GB', 'AU', 'NZ', 'DE', 'FR', 'ES', 'IN', 'BR'])
+COUNTRY_WEIGHTS = np.array([0.45, 0.1, 0.1, 0.07, 0.03, 0.06, 0.05, 0.05, 0.05, 0.04])
+EMAIL_PROVIDERS = np.array(['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'icloud.com', 'company.com'])
+PROVIDER_WEIGHTS = np.array([0.5, 0.15, 0.1, 0.1, 0.05, 0.1])
+
+SCHEMA = """
+    CREATE TABLE leads (mailchimp_id INTEGER, user_full_name TEXT, user_email TEXT, member_rating INTEGER,
+                        optin_time TIMESTAMP, country_code TEXT, made_purchase INTEGER, optin_days INTEGER,
+                        email_provider TEXT);
+    CREATE TABLE leads_scored (user_email TEXT, p1 REAL, member_rating INTEGER, purchase_frequency REAL,
+                               customer_segment INTEGER);
+    CREATE TABLE transactions (transaction_id INTEGER, purchased_at TEXT, user_full_name TEXT, user_email TEXT,
+                               charge_country TEXT, product_id REAL);
+    CREATE TABLE products (product_id REAL, description TEXT, suggested_price REAL);
+"""
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+def generate_database(db_path: str, n_customers: int, n_products: int = 50, purchase_rate: float = 0.3,
+                      avg_transactions: float = 3.0, seed: int = 42, chunk_size: int = 100_000):
+    """Create a synthetic database following the schema of the production one.
+
+    Args:
+        db_path: Path of the SQLite file to create (overwritten if it exists).
+        n_customers: Number of leads / scored customers.
+        n_products: Size of the product catalog.
+        purchase_rate: Fraction of customers with at least one transaction.
+        avg_transactions: Mean number of transactions per purchasing customer.
+        seed: Random seed, the same arguments always produce the same database.
+        chunk_size: Customers generated and inserted per batch.
+    Returns:
+        dict: Row count of every table.
+    """
+    rng = np.random.default_rng(seed)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+
+    product_ids = np.arange(1, n_products + 1, dtype=float)
+    prices = np.round(rng.lognormal(mean=5.0, sigma=0.8, size=n_products), 2)
+    conn.executemany('INSERT INTO products VALUES (?, ?, ?)',
+                     [(pid, f'Course {int(pid)}', float(price)) for pid, price in zip(product_ids, prices)])
+    product_weights = rng.dirichlet(np.ones(n_products))                                           # Some products sell far more than others
+
+    n_transactions = 0
+    for start in range(0, n_customers, chunk_size):
+        ids = np.arange(start, min(start + chunk_size, n_customers))
+        size = len(ids)
+
+        providers = rng.choice(EMAIL_PROVIDERS, size=size, p=PROVIDER_WEIGHTS)
+        emails = [f'customer{i}@{provider}' for i, provider in zip(ids, providers)]
+        names = [f'Customer {i}' for i in ids]
+        countries = rng.choice(COUNTRIES, size=size, p=COUNTRY_WEIGHTS)
+        member_rating = rng.integers(1, 6, size=size)
+        optin_days = rng.integers(-1000, 30, size=size)
+        optin_time = (np.datetime64('2024-01-01') + optin_days.astype('timedelta64[D]')).astype(str)
+
+        purchases = np.where(rng.random(size) < purchase_rate, rng.poisson(avg_transactions - 1, size=size) + 1, 0)
+        p1 = np.clip(0.15 * member_rating / 5 + 0.2 * (purchases > 0) + rng.beta(2, 5, size=size), 0, 1)
+
+        conn.executemany('INSERT INTO leads VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                         zip(ids.tolist(), names, emails, member_rating.tolist(), optin_time.tolist(),
+                             countries.tolist(), (purchases > 0).astype(int).tolist(), optin_days.tolist(),
+                             providers.tolist()))
+        conn.executemany('INSERT INTO leads_scored VALUES (?, ?, ?, ?, ?)',
+                         zip(emails, p1.tolist(), member_rating.tolist(), purchases.astype(float).tolist(),
+                             rng.integers(0, 5, size=size).tolist()))
+
+        # One row per purchase, repeating each buyer as many times as their purchase count
+        buyers = np.repeat(np.arange(size), purchases)
+        n_chunk = len(buyers)
+        purchased_at = (np.datetime64('2023-01-01') + rng.integers(0, 730, size=n_chunk).astype('timedelta64[D]')).astype(str)
+        bought = rng.choice(product_ids, size=n_chunk, p=product_weights)
+        conn.executemany('INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?)',
+                         zip(range(n_transactions, n_transactions + n_chunk), purchased_at.tolist(),
+                             [names[b] for b in buyers], [emails[b] for b in buyers],
+                             countries[buyers].tolist(), bought.tolist()))
+        n_transactions += n_chunk
+        conn.commit()
+
+    conn.close()
+    counts = {'leads': n_customers, 'leads_scored': n_customers, 'transactions': n_transactions, 'products': n_products}
+    LOGGER.info(f"Synthetic database written to {db_path}: {counts}")
+    return counts
+
+# --------------------------------------MAIN-----------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic marketing database.")
+    parser.add_argument('--customers', type=int, default=10_000, help="Number of customers.")
+    parser.add_argument('--db-path', default='data/synthetic.db', help="SQLite file to create.")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed.")
+    args = parser.parse_args()
+
+    generate_database(args.db_path, args.customers, seed=args.seed)
@@ -0,0 +1,113 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file implements a process-wide, size-bounded LRU cache of chart payloads. Hot charts are served
+# from memory instead of being re-read from plots/ on every agent turn. Entries are keyed by path and version: the
+# content hash recorded in the plot manifest, or the file modification time for files outside the manifest. Payloads
+# are kept as stored on disk (zstd-compressed when written by PlotGenerator) and decoded to JSON on every get. Charts
+# without a file (ad-hoc query charts) are stored with put and read with lookup.
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+
+from chart_codec import decode_payload
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------CHART CACHE CLASS----------------------------------
+
+class ChartCache:
+    """LRU cache of chart payloads with a cap on the total cached bytes."""
+
+    _instance = None
+
+    def __new__(cls, max_bytes: int = 64 * 1024**2):
+        """Ensure only one instance of ChartCache exists (max_bytes only applies on creation)."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.max_bytes = max_bytes
+            cls._instance._entries = OrderedDict()                                                  # path -> (version, payload, size)
+            cls._instance._bytes = 0
+            cls._instance._hits = 0
+            cls._instance._misses = 0
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    def get(self, path: str, version=None) -> str:
+        """Get the chart JSON of a chart file, reading it from disk only if it is not cached or changed.
+
+        Args:
+            path: Chart file path.
+            version: Version of the file (e.g. its content hash in the plot manifest). If None, the
+                modification time and size of the file are used.
+
+        Returns:
+            str: Chart JSON.
+        """
+        if version is None:
+            stat = os.stat(path)
+            version = (stat.st_mtime_ns, stat.st_size)                                              # Changes whenever the file is rewritten
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(path)                                                     # Mark as most recently used
+                self._hits += 1
+                return decode_payload(entry[1])
+            self._misses += 1
+
+        with open(path, 'rb') as f:
+            payload = f.read()
+        self.put(path, version, payload)
+        return decode_payload(payload)
+
+    def lookup(self, key: str, version=None) -> str:
+        """Get the chart JSON cached under a key without touching the disk (None if missing or outdated).
+
+        Used for charts that are not backed by a file, such as the ad-hoc charts of query results.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return decode_payload(entry[1])
+
+    def put(self, path: str, version, payload):
+        """Store a payload and evict the least recently used entries above the byte cap."""
+        size = len(payload.encode('utf-8')) if isinstance(payload, str) else len(payload)
+        with self._lock:
+            if path in self._entries:
+                self._bytes -= self._entries.pop(path)[2]
+            if size > self.max_bytes:                                                               # Too big to cache, serve it uncached
+                return
+            self._entries[path] = (version, payload, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Entries, cached bytes, hits and misses since the process started."""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes,
+                    'hits': self._hits, 'misses': self._misses}
@@ -0,0 +1,96 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file encodes chart payloads compactly. Numeric arrays of Plotly traces are stored as base64 typed
+# arrays ({'dtype', 'bdata'}, the format Plotly.js reads natively), the JSON is minified and optionally compressed
+# with zstd. Decoding accepts both compact payloads and the plain JSON written by fig.to_json().
+
+import base64
+import orjson
+import logging
+import numpy as np
+import zstandard as zstd
+import plotly.graph_objects as go
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'                                                                   # First bytes of every zstd frame
+ZSTD_LEVEL = 10
+MIN_TYPED_ARRAY_LENGTH = 8                                                                         # Shorter lists are smaller as plain JSON
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+def _typed_array(values: list):
+    """Encode a list of numbers as a Plotly typed array, or return None if it is not purely numeric."""
+    if any(isinstance(v, bool) or not isinstance(v, (int, float)) for v in values):
+        return None
+    if all(isinstance(v, int) for v in values):
+        array = np.asarray(values)
+        for dtype in ('i1', 'i2', 'i4'):                                                            # Smallest integer type that fits
+            if np.iinfo(dtype).min <= array.min() and array.max() <= np.iinfo(dtype).max:
+                array = array.astype(dtype)
+                break
+        else:
+            return None                                                                             # Plotly.js has no 64-bit integer arrays
+    else:
+        array = np.asarray(values, dtype='f8')
+    return {'dtype': array.dtype.str.lstrip('<|'), 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+
+def pack_arrays(obj):
+    """Recursively replace long numeric lists with typed arrays."""
+    if isinstance(obj, dict):
+        return {key: pack_arrays(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        if len(obj) >= MIN_TYPED_ARRAY_LENGTH:
+            packed = _typed_array(obj)
+            if packed is not None:
+                return packed
+        return [pack_arrays(value) for value in obj]
+    return obj
+
+def encode_figure(fig, compress: bool = True) -> bytes:
+    """Serialize a Plotly figure into a compact payload.
+
+    Args:
+        fig: Plotly figure.
+        compress: If True, compress the minified JSON with zstd.
+    Returns:
+        bytes: Payload to store on disk.
+    """
+    figure = pack_arrays(orjson.loads(fig.to_json()))                                                 # to_json already encodes NumPy arrays as bdata
+    payload = orjson.dumps(figure)
+    if compress:
+        payload = zstd.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    return payload
+
+def compress_json(chart_json: str) -> bytes:
+    """Compress chart JSON that is already encoded (e.g. served by the ChartCache) for storage."""
+    return zstd.ZstdCompressor(level=ZSTD_LEVEL).compress(chart_json.encode('utf-8'))
+
+def decode_payload(payload) -> str:
+    """Get the chart JSON string from a stored payload (compressed or plain)."""
+    if isinstance(payload, str):
+        return payload
+    if payload[:4] == ZSTD_MAGIC:
+        payload = zstd.ZstdDecompressor().decompress(payload)
+    return payload.decode('utf-8')
+
+def figure_from_json(chart_json: str):
+    """Build a Plotly figure from chart JSON without re-validating it.
+
+    Payloads are produced by Plotly itself, so the property validation done by pio.from_json is skipped.
+    """
+    figure = orjson.loads(chart_json)
+    return go.Figure(data=figure.get('data'), layout=figure.get('layout'), frames=figure.get('frames'), _validate=False)
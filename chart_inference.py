@@ -0,0 +1,135 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file infers an ad-hoc chart from the result of a DataExplorer query. The chart type is chosen from
+# the schema of the result (time + numeric -> line, category + numeric -> bar, two numerics -> scatter, one numeric
+# -> histogram) and rendered locally with Plotly, so no extra LLM call is needed. Charts are cached by query hash.
+
+import hashlib
+import logging
+import pandas as pd
+import plotly.express as px
+from pandas.api import types as ptypes
+
+from chart_cache import ChartCache
+from chart_codec import encode_figure, decode_payload
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+MAX_CATEGORIES = 20                                                                                # Bars shown for category + numeric results
+MAX_POINTS = 2000                                                                                  # Rows plotted for line/scatter/histogram results
+MAX_NUMERIC_SERIES = 4                                                                             # Numeric columns drawn in one chart
+COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8']
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+def _is_identifier(series: pd.Series) -> bool:
+    """Numeric columns that are really ids (id, product_id...) are treated as categories."""
+    if series.name is None:
+        return False
+    name = str(series.name).lower()
+    return name == 'id' or name.endswith('_id')                                                    # Not 'paid', 'valid', 'amount_paid'...
+
+def classify_columns(df: pd.DataFrame) -> dict:
+    """Split the columns of a result frame into time, numeric and categorical columns."""
+    columns = {'time': [], 'numeric': [], 'categorical': []}
+    for name in df.columns:
+        series = df[name]
+        if ptypes.is_datetime64_any_dtype(series):
+            columns['time'].append(name)
+        elif ptypes.is_bool_dtype(series):
+            columns['categorical'].append(name)
+        elif ptypes.is_numeric_dtype(series) and not _is_identifier(series):
+            columns['numeric'].append(name)
+        else:
+            columns['categorical'].append(name)
+    return columns
+
+def infer_chart(df: pd.DataFrame, title: str = None):
+    """Build the chart that best fits the schema of a query result.
+
+    Args:
+        df: Query result.
+        title: Optional chart title.
+    Returns:
+        plotly Figure or None if the result has no chartable shape (empty, a single value, only text...).
+    """
+    if df is None or len(df) < 2:                                                                  # Scalars and single rows read better as text
+        return None
+    columns = classify_columns(df)
+    time, numeric, categorical = columns['time'], columns['numeric'][:MAX_NUMERIC_SERIES], columns['categorical']
+
+    if time and numeric:                                                                           # Trend over time
+        data = df.sort_values(time[0]).tail(MAX_POINTS)
+        return px.line(data, x=time[0], y=numeric, title=title or f"{', '.join(numeric)} over {time[0]}",
+                       color_discrete_sequence=COLORS)
+
+    if categorical and numeric:                                                                    # Value per category
+        label = categorical[0]
+        data = df.nlargest(MAX_CATEGORIES, numeric[0]) if len(df) > MAX_CATEGORIES else df
+        data = data.assign(**{label: data[label].astype(str)})
+        if len(numeric) == 1:
+            fig = px.bar(data, x=label, y=numeric[0], title=title or f"{numeric[0]} by {label}",
+                         color=label, color_discrete_sequence=COLORS, text=numeric[0])
+            fig.update_traces(texttemplate='%{text:,.2~f}', textposition='outside', showlegend=False)
+            return fig
+        return px.bar(data, x=label, y=numeric, barmode='group', title=title or f"{', '.join(numeric)} by {label}",
+                      color_discrete_sequence=COLORS)
+
+    if len(numeric) >= 2:                                                                          # Relationship between two measures
+        data = df.sample(MAX_POINTS, random_state=0) if len(df) > MAX_POINTS else df
+        return px.scatter(data, x=numeric[0], y=numeric[1], title=title or f"{numeric[1]} vs. {numeric[0]}",
+                          color_discrete_sequence=COLORS)
+
+    if len(numeric) == 1:                                                                          # Distribution of one measure
+        return px.histogram(df, x=numeric[0], title=title or f"Distribution of {numeric[0]}",
+                            color_discrete_sequence=COLORS)
+
+    return None
+
+def query_hash(query: str) -> str:
+    """Hash of the exact query text, ignoring only outer whitespace and a trailing ';'.
+
+    The body is not normalized any further: letter case and spacing inside string literals change the result.
+    """
+    normalized = query.strip()
+    if normalized.endswith(';'):
+        normalized = normalized[:-1].rstrip()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+def infer_chart_json(query: str, df: pd.DataFrame, data_version: str = None) -> str:
+    """Get the ad-hoc chart JSON of a query result, cached by query hash and data version.
+
+    Args:
+        query: SQL query that produced the result.
+        df: Query result.
+        data_version: Version of the data the query ran on (a new version invalidates the cached chart).
+    Returns:
+        str: Chart JSON, or None if the result has no chartable shape.
+    """
+    key = f"adhoc/{query_hash(query)}"
+    cached = ChartCache().lookup(key, data_version)
+    if cached is not None:
+        return cached or None                                                                      # Empty payload: not chartable
+
+    try:
+        fig = infer_chart(df)
+    except Exception as e:
+        LOGGER.warning(f"Could not infer a chart for the query result: {e}")
+        fig = None
+    payload = encode_figure(fig) if fig is not None else b''
+    ChartCache().put(key, data_version, payload)
+    LOGGER.info(f"Ad-hoc chart for query {key}: {fig.data[0].type if fig is not None else 'none'}")
+    return decode_payload(payload) or None
@@ -4,11 +4,18 @@
 # DESCRIPTION: This file connects to the database, processes customer data, applies KMeans clustering to segment customers, 
 # and stores the updated segments back in the database.
 
+import os
+import json
 import pandas as pd
+import numpy as np
 import sqlite3
 import logging 
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+import duckdb
+from resource_config import ResourceConfig
+from data_manager import DataManager
+
+# scipy and sklearn are imported inside the functions that use them, so importing this module (e.g. from the
+# segmentation scheduler) does not load them until a segmentation actually runs.
 
 # --------------------------------------LOGGING--------------------------------------------
 # Logging configuration (print time, name, level and message using the terminal)
@@ -22,6 +29,28 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 
 LOGGER = logging.getLogger(__name__)
 
+# --------------------------------------VARIABLES------------------------------------------
+
+FEATURE_COLUMNS = ['purchase_frequency', 'p1', 'member_rating']                                   # Features used by KMeans (in this order)
+STATE_PATH = 'data/segmentation_state.json'                                                        # Centroids and row counts of the last segmentation
+
+# Same features as preprocess_data, computed inside DuckDB so only one row per customer reaches Python.
+# {prefix} is 'src.' when the SQLite file is attached, or empty when the tables are already registered.
+FEATURES_QUERY = """
+    WITH purchase_frequency AS (
+        SELECT user_email, COUNT(*) AS purchase_frequency
+        FROM {prefix}transactions
+        GROUP BY user_email
+    )
+    SELECT
+        l.user_email,
+        CAST(COALESCE(pf.purchase_frequency, 0) AS DOUBLE) AS purchase_frequency,
+        CAST(COALESCE(l.p1, AVG(l.p1) OVER ()) AS DOUBLE) AS p1,
+        CAST(COALESCE(l.member_rating, AVG(l.member_rating) OVER ()) AS DOUBLE) AS member_rating
+    FROM {prefix}leads_scored l
+    LEFT JOIN purchase_frequency pf ON l.user_email = pf.user_email
+"""
+
 # --------------------------------------FUNCTIONS------------------------------------------
 
 def get_db_connection(db_path: str = 'data/leads_scored.db'):
@@ -45,6 +74,7 @@ def load_data(conn):
 
 def preprocess_data(transactions, leads_scored):
     """Calculate new metrics, merge features and fill missing values."""
+    from sklearn.preprocessing import StandardScaler
 
     # Calculate purchase_frequency (group by user_email and count transactions)
     purchase_frequency = transactions.groupby('user_email').size().reset_index(name='purchase_frequency')
@@ -64,14 +94,143 @@ def preprocess_data(transactions, leads_scored):
 
     return customer_data, X_scaled
 
+def extract_features(db_path: str = 'data/leads_scored.db', conn=None):
+    """Compute the per-customer feature matrix with a single DuckDB query.
+
+    The query runs over a DuckDB connection with the tables already registered (e.g. DataManager().get_connection())
+    or, without one, directly over the SQLite file (DuckDB sqlite scanner, which may need to download the sqlite
+    extension). The transactions table is aggregated inside DuckDB and never materialized as a DataFrame.
+
+    Returns:
+        tuple: (user_emails, X) NumPy arrays, X holds the unscaled FEATURE_COLUMNS.
+    """
+    if conn is not None:
+        columns = conn.execute(FEATURES_QUERY.format(prefix='')).fetchnumpy()                       # Dict of column arrays, one row per customer
+    else:
+        with duckdb.connect() as own_conn:                                                          # Closed on success and on error
+            ResourceConfig().apply_duckdb(own_conn, 'segmentation')
+            escaped_path = db_path.replace("'", "''")                                               # ATTACH does not take bound parameters
+            own_conn.execute(f"ATTACH '{escaped_path}' AS src (TYPE sqlite, READ_ONLY)")            # Scan SQLite tables without loading them
+            columns = own_conn.execute(FEATURES_QUERY.format(prefix='src.')).fetchnumpy()
+
+    user_emails = np.asarray(columns['user_email'], dtype=object)
+    X = np.column_stack([np.asarray(columns[col], dtype=np.float64) for col in FEATURE_COLUMNS])
+    return user_emails, X
+
+def preprocess_features(user_emails, X):
+    """Build the customer table and standardized features from extract_features output."""
+    from sklearn.preprocessing import StandardScaler
+
+    customer_data = pd.DataFrame({'user_email': user_emails,                                        # Same column layout as preprocess_data
+                                  'p1': X[:, 1],
+                                  'member_rating': X[:, 2],
+                                  'purchase_frequency': X[:, 0]})
+    X_scaled = StandardScaler().fit_transform(X)
+    return customer_data, X_scaled
+
+def match_labels(centroids, previous_centroids):
+    """Map new KMeans labels to the labels of the closest previous centroids.
+
+    Solves the optimal one-to-one assignment (Hungarian algorithm) on the squared distances between
+    centroids, so a rerun keeps the same segment ID for a cluster that barely moved.
+
+    Returns:
+        np.ndarray: mapping[new_label] = stable label
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    centroids = np.asarray(centroids)
+    previous_centroids = np.asarray(previous_centroids)
+    cost = ((centroids[:, None, :] - previous_centroids[None, :, :]) ** 2).sum(axis=2)
+    new_labels, previous_labels = linear_sum_assignment(cost)
+    mapping = np.empty(len(centroids), dtype=int)
+    mapping[new_labels] = previous_labels
+    return mapping
+
+def segment_centroids(customer_data, X_scaled, segments: pd.Series, n_clusters=5):
+    """Per-segment mean of the standardized features, used as the previous centroids of existing segments.
+
+    Lets the first run without a saved state (or the scheduler baseline) keep the segment IDs already
+    stored in the database instead of numbering clusters from scratch.
+
+    Returns:
+        np.ndarray: Row i holds the centroid of segment i, or None if the segments are not 0..n_clusters-1.
+    """
+    labels = customer_data['user_email'].map(segments)
+    if labels.isna().any():
+        return None
+    labels = labels.to_numpy()
+    if set(np.unique(labels).tolist()) != set(range(n_clusters)):                                  # IDs must be the row indices
+        return None
+    return np.vstack([X_scaled[labels == segment].mean(axis=0) for segment in range(n_clusters)])
+
 def segment_customers(customer_data, X_scaled, n_clusters=5):
     """Segment customers using KMeans Clustering."""
-    # Initialize KMeans, with specified number of clusters and random state for reproducibility
-    kmeans = KMeans(n_clusters=n_clusters,random_state=42)
-    customer_data['customer_segment'] = kmeans.fit_predict(X_scaled)
-
+    customer_data, _ = segment_customers_with_centroids(customer_data, X_scaled, n_clusters)
     return customer_data
 
+def segment_customers_with_centroids(customer_data, X_scaled, n_clusters=5, init_centroids=None, previous_centroids=None):
+    """Segment customers using KMeans Clustering and also return the cluster centroids.
+
+    If init_centroids (from a previous run) is given, KMeans is warm-started from them with a single
+    initialization, which converges in a few iterations when the data only changed incrementally.
+    If previous_centroids is given, labels are renumbered to match them (see match_labels).
+
+    Returns:
+        tuple: (customer_data with customer_segment column, cluster centroids as NumPy array)
+    """
+    from sklearn.cluster import KMeans
+
+    if init_centroids is not None and np.shape(init_centroids) == (n_clusters, X_scaled.shape[1]):
+        kmeans = KMeans(n_clusters=n_clusters, init=np.asarray(init_centroids), n_init=1, random_state=42)
+    else:
+        # Initialize KMeans, with specified number of clusters and random state for reproducibility
+        kmeans = KMeans(n_clusters=n_clusters,random_state=42)
+    labels = kmeans.fit_predict(X_scaled)
+    centroids = kmeans.cluster_centers_
+
+    if previous_centroids is not None and np.shape(previous_centroids) == centroids.shape:
+        mapping = match_labels(centroids, previous_centroids)
+        labels = mapping[labels]                                                                    # Relabel customers with the stable IDs
+        stable_centroids = np.empty_like(centroids)
+        stable_centroids[mapping] = centroids                                                       # Row i holds the centroid of segment i
+        centroids = stable_centroids
+
+    customer_data['customer_segment'] = labels
+    return customer_data, centroids
+
+def load_previous_segments(conn) -> pd.Series:
+    """Load the current customer_segment of every customer (empty if the column does not exist yet)."""
+    try:
+        previous = pd.read_sql('SELECT user_email, customer_segment FROM leads_scored', conn)
+    except Exception as e:
+        LOGGER.warning(f"No previous segments found: {e}")
+        return pd.Series(dtype='float64')
+    return previous.drop_duplicates('user_email').set_index('user_email')['customer_segment']
+
+def segment_diff(previous_segments: pd.Series, customer_data) -> dict:
+    """Report how many customers moved between segments compared with the previous run.
+
+    Returns:
+        dict: total, changed (existing customers with a different segment), new and removed customers,
+        plus moved = changed + new + removed and its fraction of the total.
+    """
+    current = customer_data.drop_duplicates('user_email').set_index('user_email')['customer_segment']
+    common = current.index.intersection(previous_segments.index)
+    changed = int((current.loc[common] != previous_segments.loc[common]).sum())
+    new = int(len(current.index.difference(previous_segments.index)))
+    removed = int(len(previous_segments.index.difference(current.index)))
+    moved = changed + new + removed
+
+    return {
+        'total_customers': int(len(current)),
+        'changed_customers': changed,
+        'new_customers': new,
+        'removed_customers': removed,
+        'moved_customers': moved,
+        'moved_fraction': round(moved / len(current), 6) if len(current) else 0.0
+    }
+
 def update_database(conn, customer_data):
     """Update the lead_scored table in the database with customer segments."""
     # Update the leads_scored table with new customer segments
@@ -81,29 +240,107 @@ def update_database(conn, customer_data):
         LOGGER.error(f"Failed to update database: {e}")
         raise
 
-# --------------------------------------MAIN-----------------------------------------------
+def load_segmentation_state(state_path: str = STATE_PATH) -> dict:
+    """Load the state saved by the last segmentation run (empty dict if there is none)."""
+    if not os.path.exists(state_path):
+        return {}
+    try:
+        with open(state_path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        LOGGER.warning(f"Could not read segmentation state '{state_path}': {e}")
+        return {}
 
-if __name__ == "__main__":
-    LOGGER.info("Starting customer segmentation process.")
+def save_segmentation_state(state: dict, state_path: str = STATE_PATH):
+    """Persist the segmentation state (centroids, row counts) as JSON."""
     try:
-        conn = get_db_connection()
-        LOGGER.info("Database connection established.")
-        transactions, leads_scored = load_data(conn)
-        LOGGER.info("Data loaded successfully.")
+        with open(state_path, 'w') as f:
+            json.dump(state, f, indent=2)
     except Exception as e:
-        exit(1)
+        LOGGER.error(f"Failed to save segmentation state '{state_path}': {e}")
+        raise
 
-    customer_data, X_scaled = preprocess_data(transactions, leads_scored)
-    LOGGER.info("Data preprocessed successfully.")
-    customer_data = segment_customers(customer_data, X_scaled)
-    LOGGER.info("Customers segmented successfully.")
+def load_features(db_path: str, conn):
+    """Customer table and standardized features, computed in DuckDB with pandas as the last resort.
 
+    Uses the DataManager tables if this process already holds an up-to-date copy of them, otherwise the
+    query runs directly over the SQLite file, so a standalone run never materializes the transactions.
+
+    Args:
+        db_path (str): Path to the SQLite database file.
+        conn: Open SQLite connection, only used by the pandas fallback.
+    Returns:
+        tuple: (customer_data, X_scaled)
+    """
+    try:
+        data_manager = DataManager()
+        if data_manager.is_current(db_path):                                                        # Tables already cached in memory by this process
+            features = extract_features(db_path, conn=data_manager.get_connection())
+        else:
+            features = extract_features(db_path)                                                    # Scan the SQLite file, no table is loaded into pandas
+        LOGGER.info("Features extracted with DuckDB.")
+        return preprocess_features(*features)
+    except Exception as e:
+        LOGGER.warning(f"DuckDB feature extraction unavailable, falling back to pandas: {e}")        # Last resort
+        transactions, leads_scored = load_data(conn)
+        return preprocess_data(transactions, leads_scored)
+
+def current_segment_centroids(db_path: str = 'data/leads_scored.db', n_clusters: int = 5):
+    """Centroids of the segments currently stored in the database (None if there are no valid segments)."""
+    conn = get_db_connection(db_path)
     try:
+        customer_data, X_scaled = load_features(db_path, conn)
+        return segment_centroids(customer_data, X_scaled, load_previous_segments(conn), n_clusters)
+    finally:
+        conn.close()
+
+def run_segmentation(db_path: str = 'data/leads_scored.db', state_path: str = STATE_PATH, incremental: bool = False):
+    """Run the full segmentation pipeline and persist the resulting centroids.
+
+    Labels are matched to the centroids of the previous run (or, without a saved state, to the segments
+    stored in the database), so segment IDs only change for customers that really moved. The returned report (also saved in the state as 'last_diff') tells downstream
+    caches whether they need to be invalidated.
+
+    Args:
+        db_path (str): Path to the SQLite database file.
+        state_path (str): Where centroids of the previous run are stored.
+        incremental (bool): If True, warm-start KMeans from the previous centroids.
+    Returns:
+        tuple: (customer_data with the new customer_segment column, segment diff report)
+    """
+    state = load_segmentation_state(state_path)
+    conn = get_db_connection(db_path)
+    try:
+        customer_data, X_scaled = load_features(db_path, conn)
+        LOGGER.info("Data preprocessed successfully.")
+
+        previous_centroids = state.get('centroids')
+        init_centroids = previous_centroids if incremental else None
+        previous_segments = load_previous_segments(conn)
+        if previous_centroids is None:                                                              # No saved state: keep the IDs stored in the database
+            previous_centroids = segment_centroids(customer_data, X_scaled, previous_segments)
+        with ResourceConfig().limit('segmentation'):                                                # Bound KMeans/BLAS threads
+            customer_data, centroids = segment_customers_with_centroids(customer_data, X_scaled, init_centroids=init_centroids,
+                                                                        previous_centroids=previous_centroids)
+        report = segment_diff(previous_segments, customer_data)
+        LOGGER.info(f"Customers segmented successfully. {report['moved_customers']} of {report['total_customers']} customers moved.")
+
         update_database(conn, customer_data)
         LOGGER.info("Database updated successfully.")
-    except Exception as e:
-        exit(1)
     finally:
         LOGGER.info("Closing database connection.")
         conn.close()
 
+    state['centroids'] = centroids.tolist()
+    state['last_diff'] = report
+    save_segmentation_state(state, state_path)
+    return customer_data, report
+
+# --------------------------------------MAIN-----------------------------------------------
+
+if __name__ == "__main__":
+    LOGGER.info("Starting customer segmentation process.")
+    try:
+        run_segmentation()
+    except Exception as e:
+        exit(1)
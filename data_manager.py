@@ -5,9 +5,16 @@
 # DESCRIPTION: This file manages data loading from the SQLite database just once, avoiding redundant reads 
 # and improving performance.
 
+import os
+import uuid
+import hashlib
 import logging
+import tempfile
+import threading
+import duckdb
 import pandas as pd
 from sqlalchemy import create_engine
+from resource_config import ResourceConfig
 
 # --------------------------------------LOGGING--------------------------------------------
 # Logging configuration (print time, name, level and message using the terminal)
@@ -20,6 +27,45 @@ logging.basicConfig(
 logging.getLogger("httpx").setLevel(logging.WARNING)
 LOGGER = logging.getLogger(__name__)
 
+# --------------------------------------VARIABLES------------------------------------------
+
+VERSION_FILE_SUFFIX = '.version'                                                                # <db_path>.version, rewritten by every writer of the database
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+def read_data_version(db_path: str = 'data/leads_scored.db') -> str:
+    """
+    Description: Read the version token that writers of the database (e.g. the segmentation scheduler) publish
+    next to it, so other processes notice the change.
+    Args:
+        db_path (str): Path to the SQLite database file.
+    Returns:
+        str: Current token, or None if the database was never bumped
+    """
+    try:
+        with open(db_path + VERSION_FILE_SUFFIX, 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def bump_data_version(db_path: str = 'data/leads_scored.db') -> str:
+    """
+    Description: Publish a new version token for the database. Every DataManager that loaded it reloads its
+    tables on the next access.
+    Args:
+        db_path (str): Path to the SQLite database file.
+    Returns:
+        str: New token
+    """
+    token = uuid.uuid4().hex
+    directory = os.path.dirname(os.path.abspath(db_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+    os.replace(tmp_path, db_path + VERSION_FILE_SUFFIX)                                         # Atomic, readers never see a partial token
+    LOGGER.info(f"Data version of {db_path} bumped to {token}")
+    return token
+
 # --------------------------------------DATA MANAGER CLASS---------------------------------
 
 class DataManager:
@@ -34,6 +80,12 @@ class DataManager:
     _leads_scored: pd.DataFrame = None
     _transactions: pd.DataFrame = None
     _products: pd.DataFrame = None
+    _connection: duckdb.DuckDBPyConnection = None
+    _versions: dict = {}
+    _db_path: str = None                                                                        # Absolute path and modification time of the loaded file
+    _db_mtime: float = None
+    _version_token: str = None                                                                  # Token of <db_path>.version when the tables were read
+    _reload_lock = threading.Lock()
     _is_loaded: bool = False
     
     def __new__(cls):
@@ -57,6 +109,7 @@ class DataManager:
 
         if not self._is_loaded or force_reload:                                                 # Load data only if not already loaded or if forced                                                                                                      
             try:
+                version_token = read_data_version(db_path)                                      # Read first, a bump during the load triggers another one
                 engine = create_engine(f'sqlite:///{db_path}')                                  # Connect to the SQLite database
                 conn = engine.connect()
                 # Get data from each table
@@ -74,6 +127,12 @@ class DataManager:
                    self._transactions.empty or self._products.empty:
                     LOGGER.warning("One or more tables are empty in the database")
                 
+                self._versions = {name: self._fingerprint(df) for name, df in (
+                    ('leads', self._leads), ('leads_scored', self._leads_scored),
+                    ('transactions', self._transactions), ('products', self._products))}
+                self._db_path = os.path.abspath(db_path)
+                self._db_mtime = os.path.getmtime(db_path)
+                self._version_token = version_token
                 self._is_loaded = True                                                          # Mark data as loaded if successful                                          
                 LOGGER.info(f"Data loaded successfully from database {db_path}")
             except Exception as e:
@@ -101,7 +160,100 @@ class DataManager:
 
         LOGGER.info("Forcing data refresh...")
         self.load_data(db_path, force_reload=True)
+
+    def is_current(self, db_path: str = 'data/leads_scored.db') -> bool:
+        """
+        Description: Whether the cached tables were loaded from db_path and neither the file nor its data version
+        file changed since.
+        Args:
+            db_path (str): Path to the SQLite database file.
+        Returns:
+            bool: True if the cache can be used instead of reading the file again
+        """
+        return (self._is_loaded and self._db_path == os.path.abspath(db_path)
+                and os.path.exists(db_path) and os.path.getmtime(db_path) == self._db_mtime
+                and read_data_version(db_path) == self._version_token)
+
+    def reload_if_changed(self):
+        """
+        Description: Load the data if needed, or reload it if another process bumped the data version of the
+        loaded database since it was read (see bump_data_version).
+        Args:
+            None
+        Returns:
+            None
+        """
+        if not self._is_loaded:                                                                 # Load data if not already loaded
+            LOGGER.warning("Data not loaded yet, loading now...")
+            self.load_data()
+            return
+        if read_data_version(self._db_path) == self._version_token:
+            return
+        with self._reload_lock:                                                                 # Only one thread reloads
+            if read_data_version(self._db_path) != self._version_token:
+                LOGGER.info("Database changed in another process, reloading data.")
+                self.load_data(self._db_path, force_reload=True)
+
+    def get_connection(self) -> duckdb.DuckDBPyConnection:
+        """
+        Description: Get a DuckDB cursor with the cached tables (leads, leads_scored, transactions, products)
+        registered as views. Every call returns a new cursor over the same in-memory database, so each thread
+        can hold its own cursor while sharing the database instance and its settings.
+        Args:
+            None
+        Returns:
+            duckdb.DuckDBPyConnection: Cursor ready to query the four tables by name
+        """
+        self.reload_if_changed()
+        if self._connection is None:                                                            # Create the in-memory database only once
+            self._connection = duckdb.connect()
+            ResourceConfig().apply_duckdb(self._connection, 'interactive')                      # Bound DuckDB's thread pool for agent queries
+
+        cursor = self._connection.cursor()
+        cursor.register('leads', self._leads)                                                   # Registering is zero-copy, DuckDB scans the DataFrames
+        cursor.register('leads_scored', self._leads_scored)
+        cursor.register('transactions', self._transactions)
+        cursor.register('products', self._products)
+        return cursor
         
+    @staticmethod
+    def _fingerprint(df: pd.DataFrame) -> str:
+        """
+        Description: Content hash of a DataFrame (columns and values), used as its data version.
+        Args:
+            df (pd.DataFrame): DataFrame to hash
+        Returns:
+            str: Short hexadecimal digest
+        """
+        digest = hashlib.sha1(','.join(map(str, df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())              # Vectorized row hashes
+        return digest.hexdigest()[:16]
+
+    def get_data_version(self, tables: list = None) -> str:
+        """
+        Description: Data version of a set of tables. It only changes when the content of one of them changes,
+        including changes written by another process that bumped the data version file.
+        Args:
+            tables (list): Table names (default: all four tables)
+        Returns:
+            str: Combined version of the requested tables
+        """
+        self.reload_if_changed()                                                                # Picks up changes published by other processes
+        tables = sorted(tables or self._versions.keys())
+        combined = '|'.join(f"{table}:{self._versions[table]}" for table in tables)
+        return hashlib.sha1(combined.encode()).hexdigest()[:16]
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Description: Whether the tables are currently cached in memory.
+        Args:
+            None
+        Returns:
+            bool: True if load_data succeeded and the cache is valid
+        """
+        return self._is_loaded
+
     @property
     def leads(self):
         """
@@ -5,9 +5,21 @@
 # DESCRIPTION: This file generates and saves relevant visualizations available for our Marketing Analyst.
 
 import os 
+import json
+import time
+import hashlib
 import logging
+import tempfile
+import datetime
+import threading
 import duckdb
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import plotly.express as px
+from resource_config import ResourceConfig
+from chart_cache import ChartCache
+from chart_codec import encode_figure, decode_payload
 
 # --------------------------------------LOGGING--------------------------------------------
 # Logging configuration (print time, name, level and message using the terminal)
@@ -20,73 +32,245 @@ logging.basicConfig(
 logging.getLogger("httpx").setLevel(logging.WARNING)
 LOGGER = logging.getLogger(__name__)
 
+# --------------------------------------AGGREGATES----------------------------------------
+# Shared pass over the source tables (registered as src_*). Built once per data version, every plot reads from these.
+AGGREGATE_QUERIES = [
+    # One row per transaction with its date, product price and customer segment (LEFT JOINs keep every transaction)
+    """
+    CREATE OR REPLACE TABLE fact_sales AS
+    SELECT t.transaction_id, TRY_CAST(t.purchased_at AS DATE) AS purchased_at, t.user_email, t.charge_country,
+           t.product_id, p.description, p.suggested_price, s.customer_segment
+    FROM src_transactions t
+    LEFT JOIN src_products p ON t.product_id = p.product_id
+    LEFT JOIN (
+        SELECT user_email, ANY_VALUE(customer_segment) AS customer_segment
+        FROM src_leads_scored
+        GROUP BY user_email
+    ) s ON t.user_email = s.user_email
+    """,
+    # One row per leads_scored customer with purchases and revenue (0 / NULL if they never purchased)
+    """
+    CREATE OR REPLACE TABLE agg_customer AS
+    SELECT l.user_email, l.customer_segment, l.p1, l.member_rating, l.purchase_frequency,
+           COALESCE(f.purchase_count, 0) AS purchase_count, f.total_revenue
+    FROM src_leads_scored l
+    LEFT JOIN (
+        SELECT user_email, COUNT(transaction_id) AS purchase_count, SUM(suggested_price) AS total_revenue
+        FROM fact_sales
+        GROUP BY user_email
+    ) f ON l.user_email = f.user_email
+    """,
+    # One row per product that was sold
+    """
+    CREATE OR REPLACE TABLE agg_product AS
+    SELECT product_id, description, suggested_price,
+           COUNT(transaction_id) AS purchase_count, SUM(suggested_price) AS total_revenue
+    FROM fact_sales
+    WHERE suggested_price IS NOT NULL
+    GROUP BY product_id, description, suggested_price
+    """,
+    # One row per charge country
+    """
+    CREATE OR REPLACE TABLE agg_country AS
+    SELECT charge_country AS country, SUM(suggested_price) AS total_revenue,
+           COUNT(DISTINCT user_email) AS customer_count
+    FROM fact_sales
+    GROUP BY charge_country
+    """,
+    # One row per email provider
+    """
+    CREATE OR REPLACE TABLE agg_email_provider AS
+    SELECT email_provider, COUNT(*) AS customer_count
+    FROM src_leads
+    GROUP BY email_provider
+    """
+]
+
+# --------------------------------------PLOT VARIANTS-------------------------------------
+# Parameterized versions of the top-N plots, executed on the plot DuckDB connection with the bound parameters
+# $1 = top N, $2 = country, $3 = start date, $4 = end date (inclusive), $5 = customer segment (NULL = no filter).
+# The user variants only count leads_scored customers (one row per agg_customer row, as the stock plots do), so an
+# unfiltered variant ranks the same users as its stock chart.
+VARIANT_FILTERS = """
+    ($2::VARCHAR IS NULL OR charge_country = $2)
+    AND ($3::DATE IS NULL OR purchased_at >= $3)
+    AND ($4::DATE IS NULL OR purchased_at <= $4)
+    AND ($5::DOUBLE IS NULL OR customer_segment = $5::DOUBLE)
+"""
+
+PLOT_VARIANT_QUERIES = {
+    '_best_selling_products_plot': f"""
+        SELECT 'Product ' || CAST(product_id AS BIGINT) AS product_id, ANY_VALUE(description) AS product_description,
+               SUM(suggested_price) AS total_revenue
+        FROM fact_sales
+        WHERE suggested_price IS NOT NULL AND {VARIANT_FILTERS}
+        GROUP BY product_id
+        ORDER BY total_revenue DESC
+        LIMIT $1
+    """,
+    '_best_products_by_purchases_plot': f"""
+        SELECT 'Product ' || CAST(product_id AS BIGINT) AS product_id, ANY_VALUE(description) AS product_description,
+               COUNT(transaction_id) AS purchase_count
+        FROM fact_sales
+        WHERE suggested_price IS NOT NULL AND {VARIANT_FILTERS}
+        GROUP BY product_id
+        ORDER BY purchase_count DESC
+        LIMIT $1
+    """,
+    '_best_countries_by_revenue_plot': f"""
+        SELECT charge_country AS country, SUM(suggested_price) AS total_revenue
+        FROM fact_sales
+        WHERE {VARIANT_FILTERS}
+        GROUP BY charge_country
+        HAVING SUM(suggested_price) IS NOT NULL
+        ORDER BY total_revenue DESC
+        LIMIT $1
+    """,
+    '_best_countries_by_customers_plot': f"""
+        SELECT charge_country AS country, COUNT(DISTINCT user_email) AS customer_count
+        FROM fact_sales
+        WHERE {VARIANT_FILTERS}
+        GROUP BY charge_country
+        ORDER BY customer_count DESC
+        LIMIT $1
+    """,
+    '_best_users_by_revenue_plot': f"""
+        SELECT user_email AS user_name, SUM(suggested_price) AS total_revenue
+        FROM fact_sales
+        JOIN (SELECT user_email FROM agg_customer) USING (user_email)
+        WHERE {VARIANT_FILTERS}
+        GROUP BY user_email
+        HAVING SUM(suggested_price) IS NOT NULL
+        ORDER BY total_revenue DESC
+        LIMIT $1
+    """,
+    '_best_users_by_purchases_plot': f"""
+        SELECT user_email, COUNT(transaction_id) AS purchase_count
+        FROM fact_sales
+        JOIN (SELECT user_email FROM agg_customer) USING (user_email)
+        WHERE {VARIANT_FILTERS}
+        GROUP BY user_email
+        ORDER BY purchase_count DESC
+        LIMIT $1
+    """,
+}
+
+# --------------------------------------POINT BUDGET--------------------------------------
+# Bounds the size of every chart payload regardless of the data size: bar charts keep the top N groups and sum the
+# rest into an 'Other' bar, scatter charts merge their points into at most max_points equal-width bins.
+DEFAULT_POINT_BUDGET = {'top_n': 5, 'other_bucket': True, 'max_points': 500}
+OTHER_LABEL = 'Other'
+OTHER_COLOR_MAP = {OTHER_LABEL: '#B0B0B0'}
+
 # --------------------------------------PLOT GENERATOR CLASS---------------------------------
 
 class PlotGenerator:
     """Generates and saves plots for marketing analysis."""
 
     _instance = None
+    _max_variant_results = 128                                                                     # Query results of plot variants kept in memory
+    _compress_plots = True                                                                          # Store plots as zstd-compressed typed-array JSON
+    _manifest_path = 'plots/manifest.json'                                                         # Source tables, data version and hash of every saved plot
+    # Plot registry: every entry is generated on first request by its builder method and cached on disk
     _plots = [
-             {
-                "title": "Customer Segment Analysis",
-                "description": "Bar plot that visualizes customer segments based on key metrics.",
-                "path": "plots/segment_analysis.json"
-             },{
-                 'title': 'Customer Segment Distribution',
-                 'description': 'Pie chart showing the distribution of customers across different segments.',
-                 'path': 'plots/segment_distribution.json'
-             },{
-                 'title': 'Revenue by Customer Segment',
-                 'description': 'Bar chart displaying revenue generated by each customer segment.',
-                 'path': 'plots/revenue_by_segment.json'
-             },{
-                 'title': 'Best Selling Products by Revenue',
-                 'description': 'Bar chart highlighting the top-selling products in the dataset by revenue.',
-                 'path': 'plots/best_selling_products.json'
-             },{
-                 'title': 'Best Countries by Revenue',
-                 'description': 'Bar chart showing the top countries by revenue.',
-                 'path': 'plots/best_countries_by_revenue.json'
-             },{
-                'title': 'Best Countries by Number of Customers',
-                'description': 'Bar chart showing the top countries by number of customers.',
-                'path': 'plots/best_countries_by_customers.json'
-            },{
-                'title': 'Best Products by Number of Purchases',
-                'description': 'Bar chart highlighting the top-selling products in the dataset by number of purchases.',
-                'path': 'plots/best_products_by_purchases.json'
-             },{
-                'title': 'Best Users by Revenue',
-                'description': 'Bar chart highlighting the top users in the dataset by revenue.',
-                'path': 'plots/best_users_by_revenue.json'
-             },{
-                'title': 'Best Users by Number of Purchases',
-                'description': 'Bar chart highlighting the top users in the dataset by number of purchases.',
-                'path': 'plots/best_users_by_purchases.json'
-             },{
-                'title': 'Correlation Heatmap of Key Metrics',
-                'description': 'Heatmap showing the correlation between p1, purchase_frequency and average_order_value.',
-                'path': 'plots/correlation_heatmap.json'
-             },{
-                'title': 'Price vs. Purchase Count',
-                'description': 'Scatter plot showing the relationship between product price and number of purchases.',
-                'path': 'plots/price_vs_purchase_count.json'
-             },{
-                'title': 'Email Provider Distribution',
-                'description': 'Bar chart showing the top email providers by number of customers.',
-                'path': 'plots/email_provider_distribution.json'
-             } 
+        {
+            'title': 'Customer Segment Analysis',
+            'description': 'Bar plot that visualizes customer segments based on key metrics.',
+            'path': 'plots/segment_analysis.json',
+            'builder': '_segment_analysis_plot',
+            'sources': ['leads_scored', 'transactions'],
+            'depends_on': ['customer_segment']
+        },{
+            'title': 'Customer Segment Distribution',
+            'description': 'Pie chart showing the distribution of customers across different segments.',
+            'path': 'plots/segment_distribution.json',
+            'builder': '_segment_distribution_plot',
+            'sources': ['leads_scored'],
+            'depends_on': ['customer_segment']
+        },{
+            'title': 'Revenue by Customer Segment',
+            'description': 'Bar chart displaying revenue generated by each customer segment.',
+            'path': 'plots/revenue_by_segment.json',
+            'builder': '_revenue_by_segment_plot',
+            'sources': ['leads_scored', 'transactions', 'products'],
+            'depends_on': ['customer_segment']
+        },{
+            'title': 'Best Selling Products by Revenue',
+            'description': 'Bar chart highlighting the top-selling products in the dataset by revenue.',
+            'path': 'plots/best_selling_products.json',
+            'builder': '_best_selling_products_plot',
+            'sources': ['transactions', 'products']
+        },{
+            'title': 'Best Countries by Revenue',
+            'description': 'Bar chart showing the top countries by revenue.',
+            'path': 'plots/best_countries_by_revenue.json',
+            'builder': '_best_countries_by_revenue_plot',
+            'sources': ['transactions', 'products']
+        },{
+            'title': 'Best Countries by Number of Customers',
+            'description': 'Bar chart showing the top countries by number of customers.',
+            'path': 'plots/best_countries_by_customers.json',
+            'builder': '_best_countries_by_customers_plot',
+            'sources': ['transactions']
+        },{
+            'title': 'Best Products by Number of Purchases',
+            'description': 'Bar chart highlighting the top-selling products in the dataset by number of purchases.',
+            'path': 'plots/best_products_by_purchases.json',
+            'builder': '_best_products_by_purchases_plot',
+            'sources': ['transactions', 'products']
+        },{
+            'title': 'Best Users by Revenue',
+            'description': 'Bar chart highlighting the top users in the dataset by revenue.',
+            'path': 'plots/best_users_by_revenue.json',
+            'builder': '_best_users_by_revenue_plot',
+            'sources': ['leads_scored', 'transactions', 'products']
+        },{
+            'title': 'Best Users by Number of Purchases',
+            'description': 'Bar chart highlighting the top users in the dataset by number of purchases.',
+            'path': 'plots/best_users_by_purchases.json',
+            'builder': '_best_users_by_purchases_plot',
+            'sources': ['leads_scored', 'transactions', 'products']
+        },{
+            'title': 'Correlation Heatmap of Key Metrics',
+            'description': 'Heatmap showing the correlation between p1, purchase_frequency and average_order_value.',
+            'path': 'plots/correlation_heatmap.json',
+            'builder': '_correlation_heatmap_plot',
+            'sources': ['leads_scored']
+        },{
+            'title': 'Price vs. Purchase Count',
+            'description': 'Scatter plot showing the relationship between product price and number of purchases.',
+            'path': 'plots/price_vs_purchase_count.json',
+            'builder': '_price_vs_purchase_count_plot',
+            'sources': ['transactions', 'products']
+        },{
+            'title': 'Email Provider Distribution',
+            'description': 'Bar chart showing the top email providers by number of customers.',
+            'path': 'plots/email_provider_distribution.json',
+            'builder': '_email_provider_plot',
+            'sources': ['leads']
+        }
     ]
 
     def __new__(cls):
         """Ensure only one instance of PlotGenerator exists."""
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._timings = {}
+            cls._instance._background = None
+            cls._instance._lock = threading.Lock()
+            cls._instance._connection = duckdb.connect()                                            # Holds the shared plot aggregates
+            ResourceConfig().apply_duckdb(cls._instance._connection, 'plots')                       # Once, the setting is database-wide
+            cls._instance._aggregates_version = None
+            cls._instance._plot_locks = {}
+            cls._instance._manifest_cache = (None, {})
+            cls._instance._point_budget = dict(DEFAULT_POINT_BUDGET)
+            cls._instance._variant_lock = threading.Lock()                                          # Guards the variant results only
+            cls._instance._variant_results = OrderedDict()                                          # (builder, params) -> (data version, result)
         return cls._instance
     
     def get_plots(self) -> list:
-        """Public method to get all plots metadata."""
-        return self._plots.copy()
+        """Public method to get all plots metadata (title, description and path)."""
+        return [{key: plot[key] for key in ('title', 'description', 'path')} for plot in self._plots]
     
     def get_available_plots(self) -> list:
         """Get list of plots that exist on disk.
@@ -116,83 +300,436 @@ class PlotGenerator:
                 return plot.copy()
         return None
     
+    def invalidate_plots(self, column: str = 'customer_segment') -> list:
+        """Delete the saved plots that depend on a column so the next generate_plots rebuilds them.
+
+        Args:
+            column: Column whose change invalidates the plots (listed in each plot's 'depends_on').
+
+        Returns:
+            list: Paths of the plots that were removed.
+        """
+        removed = []
+        for plot in self._plots:
+            if column in plot.get('depends_on', []) and self.check_plot_exist(plot['path']):
+                os.remove(plot['path'])
+                removed.append(plot['path'])
+        LOGGER.info(f"Invalidated {len(removed)} plots depending on '{column}': {removed}")
+        return removed
+
+    def set_point_budget(self, top_n: int = None, other_bucket: bool = None, max_points: int = None):
+        """Change the point budget of the generated plots.
+
+        Plots saved with a different budget are treated as stale and rebuilt on the next generation.
+
+        Args:
+            top_n: Groups shown in top-N bar and pie charts.
+            other_bucket: If True, the groups outside the top N are summed into an 'Other' bar/slice.
+            max_points: Maximum points of a scatter chart; above it points are merged into bins.
+        """
+        if top_n is not None:
+            self._point_budget['top_n'] = max(1, int(top_n))
+        if other_bucket is not None:
+            self._point_budget['other_bucket'] = bool(other_bucket)
+        if max_points is not None:
+            self._point_budget['max_points'] = max(2, int(max_points))
+        LOGGER.info(f"Plot point budget set to {self._point_budget}")
+
+    def get_point_budget(self) -> dict:
+        """Current point budget (top_n, other_bucket, max_points)."""
+        return dict(self._point_budget)
+
     def check_plot_exist(self, path) -> bool:
         """Check if a specific plot exists."""
         if not os.path.exists(path):
             return False
         return True
 
-    def generate_plots(self,dataManager):
-        """Generate and save all plots."""
+    def _write_atomic(self, path: str, content):
+        """Write a file (text or bytes) atomically: write a temporary file in the same folder, then rename it."""
+        directory = os.path.dirname(path) or '.'
+        mode = 'wb' if isinstance(content, bytes) else 'w'
+        with tempfile.NamedTemporaryFile(mode, dir=directory, suffix='.tmp', delete=False) as f:
+            f.write(content)
+            tmp_path = f.name
+        try:
+            os.replace(tmp_path, path)                                                              # Readers see the old or the new file, never half of it
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def get_manifest_version(self):
+        """Version of the plot manifest (modification time in ns, None if there is no manifest)."""
+        try:
+            return os.stat(self._manifest_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def load_manifest(self) -> dict:
+        """Load the plot manifest (empty if it does not exist or cannot be read).
+
+        The parsed manifest is kept in memory and only re-read when the file changes.
+        """
+        version = self.get_manifest_version()
+        if version is None:
+            return {}
+        cached_version, cached_manifest = self._manifest_cache
+        if cached_version == version:
+            return dict(cached_manifest)
+        try:
+            with open(self._manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except Exception as e:
+            LOGGER.warning(f"Could not read plot manifest: {e}")
+            return {}
+        self._manifest_cache = (version, manifest)
+        return dict(manifest)
+
+    def get_plot_version(self, path: str) -> str:
+        """Content hash recorded in the manifest for a plot file (None if the plot is not in the manifest)."""
+        entry = self.load_manifest().get(path)
+        return entry.get('content_hash') if entry else None
+
+    def _is_stale(self, plot, manifest: dict, dataManager) -> bool:
+        """A plot is stale if its file is missing, its source tables changed or the point budget changed since it was saved."""
+        if not self.check_plot_exist(plot['path']):
+            return True
+        entry = manifest.get(plot['path'])
+        return (entry is None or entry.get('data_version') != dataManager.get_data_version(plot['sources'])
+                or entry.get('point_budget') != self._point_budget)
+
+    def _get_builder(self, plot: dict):
+        """Get the method that builds a registered plot."""
+        return getattr(self, plot['builder'])
+
+    def _find_plot(self, key: str) -> dict:
+        """Find a registered plot by its path or title (None if it is not registered)."""
+        normalized = os.path.normpath(key)
+        for plot in self._plots:
+            if os.path.normpath(plot['path']) == normalized or plot['title'] == key:
+                return plot
+        return None
+
+    def _build_and_save(self, plot, dataManager) -> tuple:
+        """Build one plot, save it to disk atomically and return its timings and manifest entry."""
+        builder = self._get_builder(plot)
+        data_version = dataManager.get_data_version(plot['sources'])                                # Version of the data the plot is built from
+        point_budget = dict(self._point_budget)
+        start = time.perf_counter()
+        fig = builder(dataManager)                                                                  # DuckDB query + Plotly figure
+        built = time.perf_counter()
+        payload = encode_figure(fig, compress=self._compress_plots)                                 # Typed arrays + zstd
+        serialized = time.perf_counter()
+        self._write_atomic(plot['path'], payload)
+        saved = time.perf_counter()
+
+        timings = {'build': round(built - start, 4), 'serialize': round(serialized - built, 4),
+                   'write': round(saved - serialized, 4), 'total': round(saved - start, 4)}
+        entry = {'title': plot['title'], 'sources': plot['sources'], 'data_version': data_version,
+                 'point_budget': point_budget, 'content_hash': hashlib.sha256(payload).hexdigest(),
+                 'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        return timings, entry
+
+    def generate_plots(self, dataManager, max_workers: int = None, background: bool = False):
+        """Generate and save every missing or stale plot on a bounded pool of worker threads.
+
+        Sessions only need ensure_plot (lazy, per plot); this is meant for batch runs and warm-up.
+
+        A plot is regenerated only when its file is missing or when the data version of its source
+        tables differs from the one recorded in the plot manifest.
+
+        Args:
+            dataManager: DataManager with the data loaded.
+            max_workers: Plots built at the same time (default: up to 4, never more than the CPU count).
+            background: If True, return immediately and keep generating in a background thread.
+                Use wait_for_plots() to block until the plots are ready.
+
+        Returns:
+            dict: Timings per plot title, or None when running in the background.
+        """
+        if background:
+            with self._lock:
+                if self._background is None or not self._background.is_alive():
+                    self._background = threading.Thread(target=self.generate_plots, args=(dataManager, max_workers),
+                                                        name='plot-generator', daemon=True)
+                    self._background.start()
+            return None
+
         # Create plots directory if it doesn't exist
         os.makedirs('plots', exist_ok=True)
 
-        for plot in self._plots:
-            # Generate each plot based on its title or description
-            if plot['title'] == "Customer Segment Analysis" and not self.check_plot_exist(plot['path']):
-                fig = self._segment_analysis_plot(dataManager)
-            elif plot['title'] == "Customer Segment Distribution" and not self.check_plot_exist(plot['path']):
-                fig = self._segment_distribution_plot(dataManager)
-            elif plot['title'] == "Revenue by Customer Segment" and not self.check_plot_exist(plot['path']):
-                fig = self._revenue_by_segment_plot(dataManager)
-            elif plot['title'] == "Best Selling Products by Revenue" and not self.check_plot_exist(plot['path']):
-                fig = self._best_selling_products_plot(dataManager)
-            elif plot['title'] == "Best Countries by Revenue" and not self.check_plot_exist(plot['path']):
-                fig = self._best_countries_by_revenue_plot(dataManager)
-            elif plot['title'] == "Best Countries by Number of Customers" and not self.check_plot_exist(plot['path']):
-                fig = self._best_countries_by_customers_plot(dataManager)
-            elif plot['title'] == "Best Products by Number of Purchases" and not self.check_plot_exist(plot['path']):
-                fig = self._best_selling_products_plot(dataManager)
-            elif plot['title'] == "Best Users by Revenue" and not self.check_plot_exist(plot['path']):
-                fig = self._best_users_by_revenue_plot(dataManager)
-            elif plot['title'] == "Best Users by Number of Purchases" and not self.check_plot_exist(plot['path']):
-                fig = self._best_users_by_purchases_plot(dataManager)
-            elif plot['title'] == "Correlation Heatmap of Key Metrics" and not self.check_plot_exist(plot['path']):
-                fig = self._correlation_heatmap_plot(dataManager)
-            elif plot['title'] == "Email Provider Distribution" and not self.check_plot_exist(plot['path']):
-                fig = self._email_provider_plot(dataManager)
-            else:
-                continue
-            
-            # Save the plot to the specified path
-            # Save to file
+        manifest = self.load_manifest()
+        pending = [plot for plot in self._plots if self._is_stale(plot, manifest, dataManager)]
+        if not pending:
+            LOGGER.info("All plots are up to date.")
+            return {}
+
+        max_workers = max_workers or min(4, os.cpu_count() or 1)
+        start = time.perf_counter()
+        timings, entries = {}, {}
+        # Plot queries run on cursors of the PlotGenerator database, bounded by the 'plots' thread budget
+        with ResourceConfig().limit('plots'):
+            self._prepare_aggregates(dataManager)                                                   # Single shared pass over the source tables
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(pending)), thread_name_prefix='plot') as executor:
+                futures = {executor.submit(self._build_and_save, plot, dataManager): plot for plot in pending}
+                for future in as_completed(futures):
+                    plot = futures[future]
+                    try:
+                        timings[plot['title']], entries[plot['path']] = future.result()
+                        LOGGER.info(f"Plot '{plot['title']}' generated in {timings[plot['title']]['total']:.3f}s")
+                    except Exception as e:
+                        LOGGER.error(f"Error generating plot '{plot['title']}': {e}")
+
+        self._update_manifest(entries)
+        self._timings.update(timings)
+        LOGGER.info(f"Generated {len(timings)} plots in {time.perf_counter() - start:.3f}s with {max_workers} workers")
+        return timings
+
+    def _update_manifest(self, entries: dict):
+        """Add or replace manifest entries (re-read first so concurrent generations do not drop entries)."""
+        with self._lock:
+            manifest = self.load_manifest()
+            manifest.update(entries)
+            self._write_atomic(self._manifest_path, json.dumps(manifest, indent=2))
+
+    def ensure_plot(self, key: str, dataManager) -> str:
+        """Get the path of a registered plot, generating it first if it is missing or stale.
+
+        Plots are built lazily: nothing is generated until a plot is requested, then the saved file is
+        reused until its source data changes.
+
+        Args:
+            key: Path or title of the plot.
+            dataManager: DataManager with the data loaded.
+
+        Returns:
+            str: Path of the up-to-date plot file, or None if the plot is not registered or fails.
+        """
+        plot = self._find_plot(key)
+        if plot is None:
+            LOGGER.warning(f"Plot '{key}' is not registered.")
+            return None
+
+        with self._lock:
+            plot_lock = self._plot_locks.setdefault(plot['path'], threading.Lock())
+        with plot_lock:                                                                             # Concurrent requests build the plot only once
+            if not self._is_stale(plot, self.load_manifest(), dataManager):
+                return plot['path']
             try:
-                with open(plot['path'], 'w') as f:
-                    f.write(fig.to_json())
+                os.makedirs(os.path.dirname(plot['path']) or '.', exist_ok=True)
+                with ResourceConfig().limit('plots'):
+                    self._prepare_aggregates(dataManager)
+                    timings, entry = self._build_and_save(plot, dataManager)
             except Exception as e:
-                print(f"Error saving plot: {e}")
-        
-    def _segment_analysis_plot(self, dataManager):
-        """Generate Customer Segment Analysis plot."""
-    
-        try:
-            leads_scored = dataManager.leads_scored
-            transactions = dataManager.transactions
-            # Select only needed columns for analysis
-            leads_scored = leads_scored[['user_email', 'p1', 'member_rating', 'customer_segment']]
-            transactions = transactions[['user_email', 'purchased_at']]
-        except Exception as e:
-            LOGGER.error(f"Error loading data: {e}")
-            raise
+                LOGGER.error(f"Error generating plot '{plot['title']}': {e}")
+                return None
+            self._update_manifest({plot['path']: entry})
+            self._timings[plot['title']] = timings
+            LOGGER.info(f"Plot '{plot['title']}' generated on demand in {timings['total']:.3f}s")
+            return plot['path']
+
+    def wait_for_plots(self, timeout: float = None) -> bool:
+        """Block until a background generation finishes.
+
+        Returns:
+            bool: True if no generation is running anymore.
+        """
+        background = self._background
+        if background is not None:
+            background.join(timeout)
+            return not background.is_alive()
+        return True
+
+    def get_plot_timings(self) -> dict:
+        """Timings (build, serialize, write, total) of the last generation of each plot."""
+        return dict(self._timings)
+
+    def _prepare_aggregates(self, dataManager):
+        """Materialize the shared fact table and rollups every plot is built from.
+
+        The transactions/products/leads_scored join and its rollups are computed once per data version
+        in the PlotGenerator DuckDB database; plot builders then only read these small tables.
+        """
+        data_version = dataManager.get_data_version()
+        with self._lock:
+            if self._aggregates_version == data_version:                                           # Already built for this data
+                return
+            start = time.perf_counter()
+            cursor = self._connection.cursor()
+            cursor.register('src_leads', dataManager.leads)
+            cursor.register('src_leads_scored', dataManager.leads_scored)
+            cursor.register('src_transactions', dataManager.transactions)
+            cursor.register('src_products', dataManager.products)
+            for statement in AGGREGATE_QUERIES:
+                cursor.execute(statement)
+            for name in ('src_leads', 'src_leads_scored', 'src_transactions', 'src_products'):
+                cursor.unregister(name)
+            self._aggregates_version = data_version
+            LOGGER.info(f"Plot aggregates built in {time.perf_counter() - start:.3f}s (data version {data_version})")
+
+    def _query(self, query: str):
+        """Run a query on the plot aggregates with a cursor of its own (safe across worker threads)."""
+        return self._connection.cursor().execute(query).df()
+
+    def get_variant_plots(self) -> list:
+        """Metadata (title, description and path) of the plots that accept filters in get_plot_variant."""
+        return [{key: plot[key] for key in ('title', 'description', 'path')}
+                for plot in self._plots if plot['builder'] in PLOT_VARIANT_QUERIES]
+
+    def _variant_params(self, top_n=None, country=None, start_date=None, end_date=None, segment=None) -> tuple:
+        """Validate and normalize the filters of a plot variant into the bound parameters of its query."""
+        def to_date(value):
+            if value is None or isinstance(value, datetime.date):
+                return value
+            return datetime.date.fromisoformat(str(value)[:10])
+        return (max(1, int(top_n or self._point_budget['top_n'])),
+                str(country) if country else None,
+                to_date(start_date),
+                to_date(end_date),
+                int(segment) if segment is not None else None)
+
+    def get_plot_variant_data(self, key: str, dataManager, **filters):
+        """Query result of a filtered variant of a registered plot.
+
+        The variant query runs on a cursor of its own over the plot DuckDB connection, with the filters as
+        bound parameters. Results are cached per parameter tuple until the data version changes.
 
-        # Calculate transaction_frequency (group by user_email and count transactions)
-        purchase_frequency = transactions.groupby('user_email').size().reset_index(name='purchase_frequency')
-        LOGGER.info(f"Transaction frequency calculated. Mean frequency: {purchase_frequency['purchase_frequency'].mean():.2f}")
+        Args:
+            key: Path or title of the plot (see get_variant_plots).
+            dataManager: DataManager with the data loaded.
+            **filters: top_n, country, start_date, end_date ('YYYY-MM-DD', inclusive) and segment.
 
-        # Combines customer profiles with their purchase activity, keeping all customers even if they never purchased anything.
-        df_analysis = leads_scored.merge(purchase_frequency, on='user_email', how='left')
-        LOGGER.info(f"Features merged. Customer data shape: {df_analysis.shape}")
+        Returns:
+            DataFrame: Result rows of the variant.
+        """
+        plot = self._find_plot(key)
+        if plot is None or plot['builder'] not in PLOT_VARIANT_QUERIES:
+            raise ValueError(f"Plot '{key}' has no filtered variants.")
+        params = self._variant_params(**filters)
+        cache_key = (plot['builder'], params)
+
+        self._prepare_aggregates(dataManager)
+        data_version = self._aggregates_version
+        with self._variant_lock:
+            cached = self._variant_results.get(cache_key)
+            if cached is not None and cached[0] == data_version:
+                self._variant_results.move_to_end(cache_key)
+                return cached[1].copy()
+
+        with ResourceConfig().limit('interactive'):                                                 # Concurrent variants run in parallel
+            result = self._connection.cursor().execute(PLOT_VARIANT_QUERIES[plot['builder']], list(params)).df()
+
+        with self._variant_lock:
+            self._variant_results[cache_key] = (data_version, result)
+            while len(self._variant_results) > self._max_variant_results:
+                self._variant_results.popitem(last=False)
+        return result.copy()
+
+    def get_plot_variant(self, key: str, dataManager, **filters) -> str:
+        """Chart JSON of a filtered variant of a registered plot (e.g. top 10 users in one country and segment).
+
+        Figures are cached in the ChartCache per parameter tuple and data version, so repeated requests
+        for the same variant cost neither a query nor a Plotly build.
 
-        # Fill missing values
-        df_analysis['purchase_frequency'] = df_analysis['purchase_frequency'].fillna(0)
+        Args:
+            key: Path or title of the plot (see get_variant_plots).
+            dataManager: DataManager with the data loaded.
+            **filters: top_n, country, start_date, end_date ('YYYY-MM-DD', inclusive) and segment.
 
-        # Create summary statistics for each customer segment and rename user_email to customer_count
-        df_summary = df_analysis.groupby('customer_segment').agg({
-            'p1': 'mean',                                                                                                           # Use mean for lead score                        
-            'member_rating': 'mean',                                                                                                # Use mean for member rating                                                         
-            'purchase_frequency': 'mean',                                                                                           # Use mean for purchase frequency      
-            'user_email': 'count'                                                                                                   # Count customers in each segment   
-        }).rename(columns={'user_email': 'customer_count'}).reset_index()
+        Returns:
+            str: Chart JSON of the variant.
+        """
+        plot = self._find_plot(key)
+        if plot is None or plot['builder'] not in PLOT_VARIANT_QUERIES:
+            raise ValueError(f"Plot '{key}' has no filtered variants.")
+        params = self._variant_params(**filters)
+        self._prepare_aggregates(dataManager)
+        cache_key = f"variants/{plot['builder']}/{hashlib.sha1(repr(params).encode()).hexdigest()[:16]}"
+        chart_json = ChartCache().lookup(cache_key, self._aggregates_version)
+        if chart_json is not None:
+            return chart_json
+
+        result = self.get_plot_variant_data(key, dataManager, **filters)
+        fig = self._get_builder(plot)(dataManager, result=result, top_n=params[0])
+        top_n, country, start_date, end_date, segment = params
+        applied = [f"Country {country}" if country else None,
+                   f"From {start_date}" if start_date else None,
+                   f"To {end_date}" if end_date else None,
+                   f"Segment {segment}" if segment is not None else None]
+        applied = [text for text in applied if text]
+        if applied:
+            fig.update_layout(title_text=f"{fig.layout.title.text} ({', '.join(applied)})")
+
+        payload = encode_figure(fig, compress=self._compress_plots)
+        ChartCache().put(cache_key, self._aggregates_version, payload)
+        return decode_payload(payload)
+
+    def _query_top_n(self, query: str, label: str, value: str):
+        """Run a query and keep its top-N rows by value, summing the remaining rows into an 'Other' row.
+
+        Args:
+            query: Query returning one row per group.
+            label: Column with the group name (set to 'Other' in the bucket row).
+            value: Column to rank and sum by.
+        Returns:
+            DataFrame: At most top_n + 1 rows, ordered by value with 'Other' last.
+        """
+        top_n = self._point_budget['top_n']
+        if not self._point_budget['other_bucket']:
+            return self._query(f"SELECT * FROM ({query}) ORDER BY {value} DESC LIMIT {top_n}")
+        return self._query(f"""
+            WITH ranked AS (
+                SELECT *, ROW_NUMBER() OVER (ORDER BY {value} DESC) AS group_rank FROM ({query})
+            )
+            SELECT * EXCLUDE (group_rank) FROM (
+                SELECT * FROM ranked WHERE group_rank <= {top_n}
+                UNION ALL BY NAME
+                SELECT '{OTHER_LABEL}' AS {label}, SUM({value}) AS {value}, {top_n + 1} AS group_rank
+                FROM ranked WHERE group_rank > {top_n} HAVING COUNT(*) > 0
+            )
+            ORDER BY group_rank
+        """)
+
+    def _query_binned(self, query: str, x: str, y: str):
+        """Run a query returning (x, y) points and, above the point budget, merge them into equal-width x bins.
+
+        Args:
+            query: Query returning one row per point (x values are expected to be unique).
+            x: Column binned on (the mean x of each bin is returned).
+            y: Column summed within each bin.
+        Returns:
+            DataFrame: x, y and point_count (points merged into each row), at most max_points rows ordered by x.
+        """
+        max_points = self._point_budget['max_points']
+        return self._query(f"""
+            WITH points AS ({query}),
+            bounds AS (SELECT MIN({x}) AS low, MAX({x}) AS high, COUNT(*) AS total FROM points)
+            SELECT AVG({x}) AS {x}, SUM({y}) AS {y}, COUNT(*) AS point_count
+            FROM points, bounds
+            GROUP BY CASE
+                WHEN total <= {max_points} OR high = low THEN {x}
+                ELSE LEAST(FLOOR(({x} - low) / (high - low) * {max_points}), {max_points} - 1)
+            END
+            ORDER BY 1
+        """)
+
+    def _segment_analysis_plot(self, dataManager):
+        """Generate Customer Segment Analysis plot."""
+
+        # Summary statistics for each customer segment, keeping customers that never purchased anything (0 purchases)
+        query = """
+            SELECT
+                customer_segment,
+                AVG(p1) AS p1,
+                AVG(member_rating) AS member_rating,
+                AVG(purchase_count) AS purchase_frequency,
+                COUNT(user_email) AS customer_count
+            FROM agg_customer
+            GROUP BY customer_segment
+            ORDER BY customer_segment
+        """
+
+        df_summary = self._query(query)
 
         # Round statistics for better readability
         df_summary['avg_p1'] = df_summary['p1'].round(3)
@@ -231,17 +768,16 @@ class PlotGenerator:
 
     def _segment_distribution_plot(self, dataManager):  
         """Generate Customer Segment Distribution plot."""
-        leads_scored = dataManager.leads_scored
 
         query = """
             SELECT 
                 customer_segment,
                 COUNT(*) AS customer_count
-            FROM leads_scored
+            FROM agg_customer
             GROUP BY customer_segment
         """
 
-        result = duckdb.query(query).to_df()
+        result = self._query(query)
         result['customer_segment'] = result['customer_segment'].map(lambda x: f'Segment {x}')
         fig = px.pie(
             result,
@@ -264,22 +800,17 @@ class PlotGenerator:
 
     def _revenue_by_segment_plot(self, dataManager):
         """Generate Revenue by Customer Segment plot."""
-        leads_scored = dataManager.leads_scored
-        transactions = dataManager.transactions
-        products = dataManager.products
 
         query = """
             SELECT 
-                l.customer_segment,
-                SUM(p.suggested_price) AS total_revenue
-            FROM leads_scored l
-            LEFT JOIN transactions t ON l.user_email = t.user_email
-            LEFT JOIN products p ON t.product_id = p.product_id
-            GROUP BY l.customer_segment
-            ORDER BY l.customer_segment
+                customer_segment,
+                SUM(total_revenue) AS total_revenue
+            FROM agg_customer
+            GROUP BY customer_segment
+            ORDER BY customer_segment
         """
 
-        result = duckdb.query(query).to_df()
+        result = self._query(query)
         result['customer_segment'] = result['customer_segment'].map(lambda x: f'Segment {x}')
          
         fig = px.bar(
@@ -298,36 +829,32 @@ class PlotGenerator:
         
         return fig
 
-    def _best_selling_products_plot(self, dataManager):
+    def _best_selling_products_plot(self, dataManager, result=None, top_n: int = None):
         """Generate Best Selling Products by Revenue plot."""
-        transactions = dataManager.transactions
-        products = dataManager.products
 
         query = """
             SELECT 
-                p.product_id,
-                p.description AS product_description,
-                SUM(p.suggested_price) AS total_revenue
-            FROM transactions t
-            INNER JOIN products p ON t.product_id = p.product_id
-            GROUP BY p.product_id, p.description
-            ORDER BY total_revenue DESC
-            LIMIT 5
+                'Product ' || CAST(product_id AS BIGINT) AS product_id,
+                description AS product_description,
+                total_revenue
+            FROM agg_product
         """
 
-        result = duckdb.query(query).to_df()
-        result['product_id'] = result['product_id'].map(lambda x: f'Product {int(x)}')
+        if result is None:                                                                          # Stock plot, not a filtered variant
+            result = self._query_top_n(query, 'product_id', 'total_revenue')
+        result['product_description'] = result['product_description'].fillna('Other products')
         result['total_revenue'] = result['total_revenue'].round(2)
 
         fig = px.bar(
             result,
             x='product_id',
             y='total_revenue',
-            title='Top 5 Best Selling Products by Revenue',
+            title=f"Top {top_n or self._point_budget['top_n']} Best Selling Products by Revenue",
             labels={'product_id': 'Product', 'total_revenue': 'Total Revenue ($)', 'product_description': 'Description'},
             text='total_revenue',
             color='product_id',  
             color_discrete_sequence=['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8'],
+            color_discrete_map=OTHER_COLOR_MAP,
             hover_data=['product_description']  # Show description on hover
         )
         
@@ -336,34 +863,30 @@ class PlotGenerator:
         
         return fig
 
-    def _best_countries_by_revenue_plot(self, dataManager):
+    def _best_countries_by_revenue_plot(self, dataManager, result=None, top_n: int = None):
         """Generate Best Countries by Revenue plot."""
-        leads = dataManager.leads_scored
-        transactions = dataManager.transactions
-        products = dataManager.products
 
         query = """
             SELECT 
-                t.charge_country AS country,
-                SUM(p.suggested_price) AS total_revenue
-            FROM transactions t
-            INNER JOIN products p ON t.product_id = p.product_id
-            GROUP BY t.charge_country
-            ORDER BY total_revenue DESC
-            LIMIT 5
+                country,
+                total_revenue
+            FROM agg_country
+            WHERE total_revenue IS NOT NULL
         """
 
-        result = duckdb.query(query).to_df()
+        if result is None:                                                                          # Stock plot, not a filtered variant
+            result = self._query_top_n(query, 'country', 'total_revenue')
         result['total_revenue'] = result['total_revenue'].round(2)
          
         fig = px.pie(
             result,
             values='total_revenue',
             names='country',
-            title='Top 5 Best Countries by Revenue',
+            title=f"Top {top_n or self._point_budget['top_n']} Best Countries by Revenue",
             labels={'country': 'Country', 'total_revenue': 'Total Revenue ($)'},
             color='country',
             color_discrete_sequence=['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8'],
+            color_discrete_map=OTHER_COLOR_MAP,
         )
         
         # Format the text on pie slices to show percentage and currency
@@ -375,32 +898,30 @@ class PlotGenerator:
         
         return fig
     
-    def _best_countries_by_customers_plot(self, dataManager):
+    def _best_countries_by_customers_plot(self, dataManager, result=None, top_n: int = None):
         """Generate Best Countries by number of customers plot."""
-        transactions = dataManager.transactions
 
         query = """
             SELECT 
-                t.charge_country AS country,
-                COUNT(DISTINCT t.user_email) AS customer_count
-            FROM transactions t
-            GROUP BY t.charge_country
-            ORDER BY customer_count DESC
-            LIMIT 5
+                country,
+                customer_count
+            FROM agg_country
         """
 
-        result = duckdb.query(query).to_df()
+        if result is None:                                                                          # Stock plot, not a filtered variant
+            result = self._query_top_n(query, 'country', 'customer_count')
         result['customer_count'] = result['customer_count'].round(2)
 
         fig = px.bar(
             result,
             x='country',
             y='customer_count',
-            title='Top 5 Countries by Number of Customers',
+            title=f"Top {top_n or self._point_budget['top_n']} Countries by Number of Customers",
             labels={'country': 'Country', 'customer_count': 'Number of Customers'},
             color='country',
             text='customer_count',
             color_discrete_sequence=['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8'],
+            color_discrete_map=OTHER_COLOR_MAP,
         )
 
         # Format text on bars
@@ -408,36 +929,32 @@ class PlotGenerator:
 
         return fig
     
-    def _best_selling_products_plot(self, dataManager):
+    def _best_products_by_purchases_plot(self, dataManager, result=None, top_n: int = None):
         """Generate Best Selling Products by number of purchases plot."""
-        transactions = dataManager.transactions
-        products = dataManager.products
 
         query = """
             SELECT 
-                p.product_id,
-                p.description AS product_description,
-                COUNT(t.transaction_id) AS purchase_count
-            FROM transactions t
-            INNER JOIN products p ON t.product_id = p.product_id
-            GROUP BY p.product_id, p.description
-            ORDER BY purchase_count DESC
-            LIMIT 5
+                'Product ' || CAST(product_id AS BIGINT) AS product_id,
+                description AS product_description,
+                purchase_count
+            FROM agg_product
         """
 
-        result = duckdb.query(query).to_df()
-        result['product_id'] = result['product_id'].map(lambda x: f'Product {int(x)}')
+        if result is None:                                                                          # Stock plot, not a filtered variant
+            result = self._query_top_n(query, 'product_id', 'purchase_count')
+        result['product_description'] = result['product_description'].fillna('Other products')
         result['purchase_count'] = result['purchase_count'].round(2)
 
         fig = px.bar(
             result,
             x='product_id',
             y='purchase_count',
-            title='Top 5 Best Selling Products by Number of Purchases',
+            title=f"Top {top_n or self._point_budget['top_n']} Best Selling Products by Number of Purchases",
             labels={'product_id': 'Product', 'purchase_count': 'Number of Purchases', 'product_description': 'Description'},
             text='purchase_count',
             color='product_id',
             color_discrete_sequence=['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8'],
+            color_discrete_map=OTHER_COLOR_MAP,
             hover_data=['product_description']
         )
 
@@ -446,36 +963,30 @@ class PlotGenerator:
 
         return fig
 
-    def _best_users_by_revenue_plot(self, dataManager):
+    def _best_users_by_revenue_plot(self, dataManager, result=None, top_n: int = None):
         """Generate Best Users by Revenue plot."""
-        leads = dataManager.leads
-        leads_scored = dataManager.leads_scored
-        transactions = dataManager.transactions
-        products = dataManager.products
 
         query = """
             SELECT 
-                l.user_email AS user_name,
-                SUM(p.suggested_price) AS total_revenue
-            FROM leads_scored l
-            LEFT JOIN transactions t ON l.user_email = t.user_email
-            LEFT JOIN products p ON t.product_id = p.product_id
-            GROUP BY l.user_email
-            ORDER BY total_revenue DESC
-            LIMIT 5
+                user_email AS user_name,
+                SUM(total_revenue) AS total_revenue
+            FROM agg_customer
+            GROUP BY user_email
         """
 
-        result = duckdb.query(query).to_df()
+        if result is None:                                                                          # Stock plot, not a filtered variant
+            result = self._query_top_n(query, 'user_name', 'total_revenue')
         result['total_revenue'] = result['total_revenue'].round(2)
          
         fig = px.bar(
             result,
             x='user_name',
             y='total_revenue',
-            title='Top 5 Best Users by Revenue',
+            title=f"Top {top_n or self._point_budget['top_n']} Best Users by Revenue",
             labels={'user_name': 'User Name', 'total_revenue': 'Total Revenue ($)'},
             color='user_name',
-            text='total_revenue'
+            text='total_revenue',
+            color_discrete_map=OTHER_COLOR_MAP
         )
         
         # Format text on bars to show currency
@@ -483,36 +994,30 @@ class PlotGenerator:
         
         return fig
     
-    def _best_users_by_purchases_plot(self, dataManager):
+    def _best_users_by_purchases_plot(self, dataManager, result=None, top_n: int = None):
         """Generate Best Users by Number of Purchases plot."""
-        leads = dataManager.leads
-        leads_scored = dataManager.leads_scored
-        transactions = dataManager.transactions
-        products = dataManager.products
 
         query = """
             SELECT 
-                l.user_email,
-                COUNT(t.transaction_id) AS purchase_count
-            FROM leads_scored l
-            LEFT JOIN transactions t ON l.user_email = t.user_email
-            LEFT JOIN products p ON t.product_id = p.product_id
-            GROUP BY l.user_email
-            ORDER BY purchase_count DESC
-            LIMIT 5
+                user_email,
+                CAST(SUM(purchase_count) AS BIGINT) AS purchase_count
+            FROM agg_customer
+            GROUP BY user_email
         """
 
-        result = duckdb.query(query).to_df()
+        if result is None:                                                                          # Stock plot, not a filtered variant
+            result = self._query_top_n(query, 'user_email', 'purchase_count')
         result['purchase_count'] = result['purchase_count'].round(2)
          
         fig = px.bar(
             result,
             x='user_email',
             y='purchase_count',
-            title='Top 5 Best Users by Number of Purchases',
+            title=f"Top {top_n or self._point_budget['top_n']} Best Users by Number of Purchases",
             labels={'user_email': 'User Email', 'purchase_count': 'Number of Purchases'},
             color='user_email',
-            text='purchase_count'
+            text='purchase_count',
+            color_discrete_map=OTHER_COLOR_MAP
         )
         
         # Format text on bars
@@ -522,25 +1027,24 @@ class PlotGenerator:
     
     def _correlation_heatmap_plot(self, dataManager):
         """Generate Correlation Heatmap plot."""
-        leads_scored = dataManager.leads_scored
 
-        query = """
+        # Pairwise correlations are computed in DuckDB, so only the 3x3 matrix leaves the database
+        columns = ['p1', 'member_rating', 'purchase_frequency']
+        query = f"""
             SELECT
-                l.p1,
-                l.member_rating,
-                l.purchase_frequency
-            FROM leads_scored l
+                {', '.join(f'corr({a}, {b})' for a in columns for b in columns)}
+            FROM agg_customer
         """
 
-        df_analysis = duckdb.query(query).to_df() 
-        corr_matrix = df_analysis.corr()
+        row = self._connection.cursor().execute(query).fetchone()
+        corr_matrix = np.array(row, dtype=float).reshape(len(columns), len(columns))
 
         fig = px.imshow(
             corr_matrix,
             text_auto=True,
             title='Correlation Heatmap of Key Metrics',
-            x=df_analysis.columns,
-            y=df_analysis.columns,
+            x=columns,
+            y=columns,
             color_continuous_scale='RdBu_r',
             zmin=-1,
             zmax=1
@@ -550,56 +1054,62 @@ class PlotGenerator:
     
     def _price_vs_purchase_count_plot(self, dataManager):
         """Generate Price vs. Purchase Count plot."""
-        transactions = dataManager.transactions
-        products = dataManager.products
 
         query = """
             SELECT 
-                p.suggested_price,
-                COUNT(t.transaction_id) AS purchase_count
-            FROM transactions t
-            INNER JOIN products p ON t.product_id = p.product_id
-            GROUP BY p.suggested_price
+                suggested_price,
+                CAST(SUM(purchase_count) AS BIGINT) AS purchase_count
+            FROM agg_product
+            GROUP BY suggested_price
         """
 
-        result = duckdb.query(query).to_df()
+        result = self._query_binned(query, 'suggested_price', 'purchase_count')                     # At most max_points points
 
         fig = px.scatter(
             result,
             x='suggested_price',
             y='purchase_count',
             title='Price vs. Purchase Count',
-            labels={'suggested_price': 'Suggested Price ($)', 'purchase_count': 'Number of Purchases'},
-            trendline='ols',
+            labels={'suggested_price': 'Suggested Price ($)', 'purchase_count': 'Number of Purchases',
+                    'point_count': 'Prices Merged'},
+            hover_data=['point_count'],
             color_discrete_sequence=['#FF6B6B']
         )
 
+        # Least squares trend line fitted in DuckDB on every price, not on the binned points
+        # (px trendline='ols' would require statsmodels)
+        slope, intercept, low, high = self._connection.cursor().execute(f"""
+            SELECT regr_slope(purchase_count, suggested_price), regr_intercept(purchase_count, suggested_price),
+                   MIN(suggested_price), MAX(suggested_price)
+            FROM ({query})
+        """).fetchone()
+        if slope is not None:
+            fig.add_scatter(x=[low, high], y=[slope * low + intercept, slope * high + intercept],
+                            mode='lines', name='OLS trend', line={'color': '#45B7D1'})
+
         return fig
     
     def _email_provider_plot(self, dataManager):
         """Generate Email Provider Distribution plot."""
-        leads = dataManager.leads
 
         query = """
             SELECT 
                 email_provider,
-                COUNT(*) AS customer_count
-            FROM leads
-            GROUP BY email_provider
-            ORDER BY customer_count DESC
-            LIMIT 5
+                customer_count
+            FROM agg_email_provider
         """
 
-        result = duckdb.query(query).to_df()
+        result = self._query_top_n(query, 'email_provider', 'customer_count')
         fig = px.bar(
             result,
             x='email_provider',
             y='customer_count',
-            title='Top 5 Email Providers by Number of Customers',
+            title=f"Top {self._point_budget['top_n']} Email Providers by Number of Customers",
             labels={'email_provider': 'Email Provider', 'customer_count': 'Number of Customers'},
             color='email_provider',
             text='customer_count',
             color_discrete_sequence=['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8'],
+            color_discrete_map=OTHER_COLOR_MAP,
         )
 
         # Format text on bars
@@ -609,18 +1119,17 @@ class PlotGenerator:
     
     def _member_rating_distribution_plot(self, dataManager):
         """Generate Member Rating Distribution plot."""
-        leads_scored = dataManager.leads_scored
 
         query = """
             SELECT 
                 member_rating,
                 COUNT(*) AS customer_count
-            FROM leads_scored
+            FROM agg_customer
             GROUP BY member_rating
             ORDER BY member_rating
         """
 
-        result = duckdb.query(query).to_df()
+        result = self._query(query)
         fig = px.bar(
             result,
             x='member_rating',
@@ -0,0 +1,111 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file draws the diagram of the multi-agent graph as an explicit build step, so the agents never
+# render or write it at startup. The default renderer is offline and has no extra dependencies (Mermaid source that
+# GitHub and most editors display). ASCII (grandalf) and PNG (local browser with pyppeteer, or the Mermaid web API with
+# --online) are also available. A diagram is only redrawn when the graph structure changes:
+# python graph_diagram.py --format mermaid
+
+import os
+import sys
+import hashlib
+import logging
+import argparse
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+DEFAULT_OUTPUTS = {
+    'mermaid': 'marketing_graph.mmd',
+    'ascii': 'marketing_graph.txt',
+    'png': 'marketing_graph.png',
+}
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+def graph_fingerprint(drawable) -> str:
+    """Hash of the graph structure (nodes and edges), used to skip redrawing an unchanged graph."""
+    return hashlib.sha256(drawable.draw_mermaid().encode('utf-8')).hexdigest()
+
+def render(drawable, fmt: str, online: bool = False):
+    """Render the graph in the given format.
+
+    Args:
+        drawable: Drawable graph (compiled_graph.get_graph())
+        fmt: 'mermaid', 'ascii' or 'png'
+        online: For 'png', use the Mermaid web API instead of a local browser
+    Returns:
+        str | bytes: Diagram content (bytes for 'png')
+    """
+    if fmt == 'mermaid':
+        return drawable.draw_mermaid()                                                          # Pure Python, offline
+    if fmt == 'ascii':
+        return drawable.draw_ascii()                                                            # Requires grandalf
+    if fmt == 'png':
+        from langchain_core.runnables.graph import MermaidDrawMethod
+        if online:
+            return drawable.draw_mermaid_png(draw_method=MermaidDrawMethod.API, max_retries=5, retry_delay=2.0)
+        return drawable.draw_mermaid_png(draw_method=MermaidDrawMethod.PYPPETEER)              # Requires pyppeteer
+    raise ValueError(f"Unknown format '{fmt}'. Expected one of {list(DEFAULT_OUTPUTS)}")
+
+def draw_diagram(fmt: str = 'mermaid', output: str = None, online: bool = False, force: bool = False) -> str:
+    """Draw the diagram of the agents graph unless an up-to-date one already exists.
+
+    The fingerprint of the drawn graph is stored next to the diagram (<output>.sha256).
+
+    Args:
+        fmt: 'mermaid', 'ascii' or 'png'
+        output: Diagram path (default depends on the format)
+        online: For 'png', use the Mermaid web API
+        force: Redraw even if the diagram is up to date
+    Returns:
+        str: Path of the diagram
+    """
+    from marketing_analyst import get_graph                                                     # Compiles the graph only, no data is loaded
+
+    output = output or DEFAULT_OUTPUTS[fmt]
+    drawable = get_graph().get_graph()
+    fingerprint = graph_fingerprint(drawable)
+    fingerprint_path = f'{output}.sha256'
+
+    if not force and os.path.exists(output) and os.path.exists(fingerprint_path):
+        with open(fingerprint_path, 'r') as f:
+            if f.read().strip() == fingerprint:
+                LOGGER.info(f"{output} is up to date.")
+                return output
+
+    diagram = render(drawable, fmt, online)
+    with open(output, 'wb' if isinstance(diagram, bytes) else 'w') as f:
+        f.write(diagram)
+    with open(fingerprint_path, 'w') as f:
+        f.write(fingerprint)
+    LOGGER.info(f"Graph diagram written to {output}")
+    return output
+
+# --------------------------------------MAIN-----------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Draw the diagram of the multi-agent graph.")
+    parser.add_argument('--format', choices=list(DEFAULT_OUTPUTS), default='mermaid', help="Diagram format.")
+    parser.add_argument('--output', default=None, help="Diagram path (default: marketing_graph.<ext>).")
+    parser.add_argument('--online', action='store_true', help="Render PNG with the Mermaid web API.")
+    parser.add_argument('--force', action='store_true', help="Redraw even if the graph did not change.")
+    args = parser.parse_args()
+
+    try:
+        draw_diagram(args.format, args.output, args.online, args.force)
+    except ImportError as e:                                                                    # Optional renderer not installed
+        LOGGER.error(f"{e} Use --format mermaid for the offline renderer.")
+        sys.exit(1)
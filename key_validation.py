@@ -0,0 +1,84 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file validates OpenAI API keys and remembers the valid ones for a while, so a returning user (or
+# a new session with the same key) does not pay a models.list() round trip. Keys are never stored: only a salted
+# hash with a per-process random salt is kept in memory, together with its expiry time.
+
+import time
+import hashlib
+import logging
+import secrets
+import threading
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------KEY VALIDATOR CLASS--------------------------------
+
+class KeyValidator:
+    """Process-wide cache of validated API keys, keyed by salted hash and expiring after a TTL."""
+
+    _instance = None
+
+    def __new__(cls, ttl: float = 3600.0):
+        """Ensure only one instance of KeyValidator exists (ttl only applies on creation)."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.ttl = ttl
+            cls._instance._salt = secrets.token_bytes(16)                                           # New salt per process: hashes are useless elsewhere
+            cls._instance._valid = {}                                                               # key hash -> expiry (monotonic seconds)
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    def _hash(self, api_key: str) -> str:
+        """Salted hash of an API key."""
+        return hashlib.sha256(self._salt + api_key.encode('utf-8')).hexdigest()
+
+    def is_cached(self, api_key: str) -> bool:
+        """Whether the key was validated less than ttl seconds ago."""
+        key_hash = self._hash(api_key)
+        with self._lock:
+            expiry = self._valid.get(key_hash)
+            if expiry is None:
+                return False
+            if expiry < time.monotonic():
+                del self._valid[key_hash]
+                return False
+            return True
+
+    def validate(self, api_key: str) -> tuple:
+        """Validate an OpenAI API key, calling the API only if it is not cached.
+
+        Args:
+            api_key: OpenAI API key.
+        Returns:
+            tuple: (valid, cached) where cached tells whether the API call was skipped.
+        """
+        if not api_key:
+            return False, False
+        if self.is_cached(api_key):
+            return True, True
+        try:
+            from openai import OpenAI                                                               # Only needed when the key is not cached
+            OpenAI(api_key=api_key).models.list()
+        except Exception as e:
+            LOGGER.warning(f"API key validation failed: {type(e).__name__}")
+            return False, False
+        with self._lock:
+            self._valid[self._hash(api_key)] = time.monotonic() + self.ttl
+        return True, False
+
+    def forget(self, api_key: str):
+        """Drop a key from the cache (e.g. after the API rejected it)."""
+        with self._lock:
+            self._valid.pop(self._hash(api_key), None)
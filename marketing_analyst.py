@@ -6,21 +6,25 @@
 # --------------------------------------IMPORTS--------------------------------------------
 import os
 import json
-import duckdb
+import time
 import logging
+import threading
+from collections import OrderedDict
 
-from langchain_openai import ChatOpenAI
-from langchain_ollama import ChatOllama 
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langgraph.graph import StateGraph, START, END
-from typing import List, Sequence, TypedDict, Literal
+from typing import Any, List, Sequence, TypedDict, Literal
 from pydantic import BaseModel
-from data_manager import DataManager
+from resource_config import ResourceConfig
 from prompts import DATA_OVERVIEW_PROMPT, BUSINESS_ANALYST_PROMPT, MARKETING_ANALYST_PROMPT, BEST_EMAILS_PROMPT, WRITE_EMAILS_PROMPT
 from prompts import ROUTER_PROMPT, QUERY_GENERATOR_PROMPT, DATA_EXPLORER_PROMPT, PLOT_SELECTION_PROMPT
-from generate_plots import PlotGenerator
+from tracing import span, trace_turn, traced_node
+
+# Heavy dependencies (LLM clients, LangGraph, pandas/DuckDB through data_manager, plotly through generate_plots and
+# chart_inference) are imported on first use inside the functions that need them, so importing this module is cheap.
+# The graph is compiled on the first call to get_graph(), and never drawn here (see graph_diagram.py). See
+# benchmarks/import_time.py for the cold start report.
 
 # --------------------------------------LOGGING--------------------------------------------
 # Logging configuration (print time, name, level and message using the terminal)
@@ -71,14 +75,15 @@ def select_visualizations(user_message: str, model, api_key=None) -> dict:
     Returns:
         dict: Dictionary with selected plot titles and paths, if no plots selected returns empty lists
     """
+    from generate_plots import PlotGenerator
+
     try:
-        models = get_models(api_key)                                                        # Get model instances with API key
-        llm = models[model]                                                                 # Get the LLM model
-        prompt_template = ChatPromptTemplate.from_template(PLOT_SELECTION_PROMPT)           # Load prompt template
-        agent = prompt_template | llm | JsonOutputParser()                                  # Create agent with JSON output parser
+        agent = get_chain('plot_selection', model, api_key)                                 # Cached prompt | model | JSON output parser
 
-        result = agent.invoke({'user_message': user_message,                                # Invoke with user message and available plots
-                               'available_plots': json.dumps(PlotGenerator().get_plots())})
+        with span('plot_selection') as attrs:
+            result = agent.invoke({'user_message': user_message,                            # Invoke with user message and available plots
+                                   'available_plots': json.dumps(PlotGenerator().get_plots())})
+            attrs['selected'] = len(result.get('paths') or []) if isinstance(result, dict) else 0
         
         # Ensure result is a dict and has required keys
         if not isinstance(result, dict):   
@@ -96,15 +101,23 @@ def select_visualizations(user_message: str, model, api_key=None) -> dict:
 
 def load_chart_json(path: str) -> str:
     """
-    Description: Load Plotly chart JSON from file.
+    Description: Load Plotly chart JSON. Registered plots are generated on first request, and payloads are
+    served from the process-wide ChartCache until their manifest entry changes.
     Args:
         path (str): File path to the chart JSON
     Returns:
         str: JSON string of the chart, or empty string if error occurs
     """
+    from data_manager import DataManager
+    from generate_plots import PlotGenerator
+    from chart_cache import ChartCache
+
     try:
-        with open(path, 'r') as f:
-            chart_json = f.read()
+        with span('chart_load', path=path) as attrs:
+            plot_generator = PlotGenerator()
+            plot_path = plot_generator.ensure_plot(path, DataManager())                         # Build the plot lazily if missing or stale
+            chart_json = ChartCache().get(plot_path or path, plot_generator.get_plot_version(plot_path or path))
+            attrs['bytes'] = len(chart_json or '')
         return chart_json
     except Exception as e:
         LOGGER.error(f"Error loading chart JSON from {path}: {e}")
@@ -112,29 +125,119 @@ def load_chart_json(path: str) -> str:
 
 # -------------------------------------MODELS----------------------------------------------
 
+OLLAMA_MODELS = {'llama3.1': 'llama3.1:8b', 'gpt-oss:20b': 'gpt-oss:20b'}                    # Model option -> Ollama model
+OPENAI_MODELS = ['gpt-5-nano', 'gpt-4.1-nano', 'gpt-4o-mini']
+MODEL_NAMES = list(OLLAMA_MODELS) + OPENAI_MODELS + ['stub']                                 # Every model name accepted by get_llm
+MAX_CACHED_MODELS = 64                                                                      # (model, api_key) pairs kept alive
+STUB_ENV_VARS = ('STUB_LLM_MODE', 'STUB_LLM_CASSETTE', 'STUB_LLM_STRICT', 'STUB_LLM_LATENCY',
+                 'STUB_LLM_LATENCY_JITTER', 'STUB_LLM_LATENCY_SEED', 'STUB_LLM_RECORD_MODEL')
+
+_model_cache = OrderedDict()                                                                # _model_key(model, api_key) -> chat model
+_chain_cache = OrderedDict()                                                                # (chain,) + _model_key(model, api_key) -> runnable
+_model_lock = threading.Lock()
+
+def _create_model(model: str, api_key=None):
+    """Instantiate one chat model (HTTP clients and SSL contexts are created here, so this is not cheap)."""
+    if model in OLLAMA_MODELS:
+        from langchain_ollama import ChatOllama                                             # Loaded on the first LLM call, not on import
+        return ChatOllama(model=OLLAMA_MODELS[model])
+    if model in OPENAI_MODELS:
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model=model, api_key=api_key) if api_key else ChatOpenAI(model=model)
+    if model == 'stub':
+        # Deterministic fake model for offline runs, configured with the STUB_LLM_* environment variables
+        from stub_llm import StubChatModel
+        record_model = os.environ.get('STUB_LLM_RECORD_MODEL')
+        return StubChatModel.from_env(record_from=get_llm(record_model, api_key) if record_model else None)
+    raise KeyError(f"Unknown model '{model}'")
+
+def _cached(cache: OrderedDict, key: tuple, factory, max_size: int):
+    """Get a value from an LRU cache, creating it on a miss."""
+    with _model_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    value = factory()                                                                       # Built outside the lock (may be slow)
+    with _model_lock:
+        value = cache.setdefault(key, value)                                                # Keep the first one if two threads raced
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+    return value
+
+def _model_key(model: str, api_key=None) -> tuple:
+    """Cache key of a model. The stub is also keyed by its STUB_LLM_* settings, so changing them builds a new one."""
+    if model == 'stub':
+        return (model, api_key) + tuple(os.environ.get(name) for name in STUB_ENV_VARS)
+    return (model, api_key)
+
+def get_llm(model: str, api_key=None):
+    """
+    Description: Get the chat model of a (model, API key) pair, created once and reused by every turn and session.
+    Args:
+        model (str): Model name (e.g. 'gpt-5-nano', 'llama3.1', 'stub')
+        api_key (str, optional): OpenAI API key for session isolation
+    Returns:
+        BaseChatModel: The chat model
+    """
+    return _cached(_model_cache, _model_key(model, api_key), lambda: _create_model(model, api_key), MAX_CACHED_MODELS)
+
+def get_chain(name: str, model: str, api_key=None):
+    """
+    Description: Get a node chain (precompiled prompt template | model [| parser]), built once per (model, API key).
+    Args:
+        name (str): One of CHAIN_NAMES
+        model (str): Model name
+        api_key (str, optional): OpenAI API key for session isolation
+    Returns:
+        Runnable: The chain, ready to invoke
+    """
+    if name not in CHAIN_NAMES:
+        raise KeyError(f"Unknown chain '{name}'. Expected one of {CHAIN_NAMES}")
+
+    def build():
+        llm = get_llm(model, api_key)
+        if name == 'router':
+            return llm.with_structured_output(Route)                                        # Invoked with the formatted ROUTER_PROMPT
+        if name == 'plot_selection':
+            return PROMPT_TEMPLATES[name] | llm | JsonOutputParser()
+        return PROMPT_TEMPLATES[name] | llm
+
+    return _cached(_chain_cache, (name,) + _model_key(model, api_key), build, MAX_CACHED_MODELS * len(CHAIN_NAMES))
+
 def get_models(api_key=None):
     """
-    Create model instances with optional API key for multi-user isolation.
-    
+    Get the model instances available with an optional API key for multi-user isolation (cached, see get_llm).
+
     Args:
         api_key (str, optional): OpenAI API key for session isolation
-    
+
     Returns:
         dict: Dictionary of model instances
     """
-    models = {
-        'llama3.1': ChatOllama(model='llama3.1:8b'),
-        'gpt-oss:20b': ChatOllama(model='gpt-oss:20b'), 
-        'gpt-5-nano': ChatOpenAI(model='gpt-5-nano', api_key=api_key) if api_key else ChatOpenAI(model='gpt-5-nano'),
-        'gpt-4.1-nano': ChatOpenAI(model='gpt-4.1-nano', api_key=api_key) if api_key else ChatOpenAI(model='gpt-4.1-nano'),
-        'gpt-4o-mini': ChatOpenAI(model='gpt-4o-mini', api_key=api_key) if api_key else ChatOpenAI(model='gpt-4o-mini')
-    }
-    return models
+    names = list(OLLAMA_MODELS)
+    if api_key or os.environ.get('OPENAI_API_KEY'):                                          # ChatOpenAI cannot be created without credentials (offline stub runs)
+        names += OPENAI_MODELS
+    return {name: get_llm(name, api_key) for name in names + ['stub']}
+
+# -------------------------------------PROMPTS---------------------------------------------
+
+# Templates parsed once at import instead of on every node call
+PROMPT_TEMPLATES = {
+    'plot_selection': ChatPromptTemplate.from_template(PLOT_SELECTION_PROMPT),
+    'data_overview': ChatPromptTemplate.from_template(DATA_OVERVIEW_PROMPT),
+    'query_generator': ChatPromptTemplate.from_template(QUERY_GENERATOR_PROMPT),
+    'data_explorer': ChatPromptTemplate.from_template(DATA_EXPLORER_PROMPT),
+    'best_emails': ChatPromptTemplate.from_template(BEST_EMAILS_PROMPT),
+    'write_emails': ChatPromptTemplate.from_template(WRITE_EMAILS_PROMPT),
+    'business_analyst': ChatPromptTemplate.from_template(BUSINESS_ANALYST_PROMPT),
+    'marketing_analyst': ChatPromptTemplate.from_template(MARKETING_ANALYST_PROMPT),
+}
+CHAIN_NAMES = ['router'] + list(PROMPT_TEMPLATES)
 
 # -------------------------------------VARIABLES-------------------------------------------
 
 db_path = 'data/leads_scored.db'                                                            # Path to the SQLite database                                                        
-marketing_path = 'marketing_graph.png'                                                      # Path to save marketing graph image
 
 class Route(BaseModel):
     '''
@@ -153,12 +256,13 @@ class State(TypedDict):
     chart_json: List[str]                                                                   # List of chart JSON strings
     model: str                                                                              # Model used for all agents
     api_key: str                                                                            # OpenAI API key for session isolation
-    data_manager: DataManager                                                               # DataManager instance to avoid several loads
+    data_manager: Any                                                                       # DataManager instance to avoid several loads
     next_action: str                                                                        # Next action decided by the router
     sql_query: str                                                                          # Generated SQL query 
 
 # --------------------------------------NODES----------------------------------------------
 
+@traced_node('router')
 def router_node(state: State):
     """
     Description: Decides the next step: data_overview, data_exploration or marketing_analysis
@@ -180,9 +284,8 @@ def router_node(state: State):
     
     try:
         # Decides the next node based on the last user's message
-        models = get_models(state.get('api_key'))
-        llm = models[state.get('model')] 
-        response = llm.with_structured_output(Route).invoke(messages)                       # response = ['data_overview' or 'data_exploration' or 'business_analysis' or 'marketing_analysis']
+        router = get_chain('router', state.get('model'), state.get('api_key'))
+        response = router.invoke(messages)                       # response = ['data_overview' or 'data_exploration' or 'business_analysis' or 'marketing_analysis']
         LOGGER.info(f'Router decided: {response.next}')
         return {'next_action': response.next}
     except Exception as e:
@@ -201,6 +304,7 @@ def route_after_router(state: State):
 
     return state['next_action']
 
+@traced_node('data_overview')
 def DataOverview_node(state: State):
     """
     Description: Provide an overview of the datasets.
@@ -217,28 +321,30 @@ def DataOverview_node(state: State):
     transactions = data_manager.transactions
     products = data_manager.products
 
-    # Prepare dataset info and descriptions in JSON format for LLM
-    leads_info = get_dataset_info_json(leads)
-    leads_scored_info = get_dataset_info_json(leads_scored)
-    transactions_info = get_dataset_info_json(transactions)
-    products_info = get_dataset_info_json(products)
-
-    leads_describe = leads.describe().to_json(orient='columns')
-    leads_scored_describe = leads_scored.describe().to_json(orient='columns')
-    transactions_describe = transactions.describe().to_json(orient='columns')
-    products_describe = products.describe().to_json(orient='columns')
-
-    # Provide first five data samples for each table
-    leads_sample = leads.head().to_json(orient='records')
-    leads_scored_sample = leads_scored.head().to_json(orient='records')
-    transactions_sample = transactions.head().to_json(orient='records')
-    products_sample = products.head().to_json(orient='records')
+    with span('to_json', source='dataset_profiles') as attrs:
+        # Prepare dataset info and descriptions in JSON format for LLM
+        leads_info = get_dataset_info_json(leads)
+        leads_scored_info = get_dataset_info_json(leads_scored)
+        transactions_info = get_dataset_info_json(transactions)
+        products_info = get_dataset_info_json(products)
+
+        leads_describe = leads.describe().to_json(orient='columns')
+        leads_scored_describe = leads_scored.describe().to_json(orient='columns')
+        transactions_describe = transactions.describe().to_json(orient='columns')
+        products_describe = products.describe().to_json(orient='columns')
+
+        # Provide first five data samples for each table
+        leads_sample = leads.head().to_json(orient='records')
+        leads_scored_sample = leads_scored.head().to_json(orient='records')
+        transactions_sample = transactions.head().to_json(orient='records')
+        products_sample = products.head().to_json(orient='records')
+        attrs['bytes'] = sum(len(part) for part in (leads_info, leads_scored_info, transactions_info, products_info,
+                                                    leads_describe, leads_scored_describe, transactions_describe,
+                                                    products_describe, leads_sample, leads_scored_sample,
+                                                    transactions_sample, products_sample))
 
     # Prepare and invoke LLM agent
-    models = get_models(state.get('api_key'))
-    llm = models[state.get('model')] 
-    prompt_template = ChatPromptTemplate.from_template(DATA_OVERVIEW_PROMPT)
-    agent = prompt_template | llm
+    agent = get_chain('data_overview', state.get('model'), state.get('api_key'))
 
     messages = state.get('message', [])
     last_question = messages[-1].content if messages else "Provide comprehensive data analysis"
@@ -276,6 +382,7 @@ def DataOverview_node(state: State):
         'chart_json': chart_json if chart_json else None
     }
 
+@traced_node('data_exploration')
 def DataExplorer_node(state: State):
     """
     Description: Execute SQL queries on DataFrames using DuckDB based on user questions.
@@ -285,12 +392,8 @@ def DataExplorer_node(state: State):
         dict: A dictionary containing the response from the LLM, executed SQL query, and any relevant chart JSONs.
     """
 
-    models = get_models(state.get('api_key'))
-    llm = models[state.get('model')] 
-    
     # Step 1: Generate SQL query from user question
-    prompt_template = ChatPromptTemplate.from_template(QUERY_GENERATOR_PROMPT)
-    query_agent = prompt_template | llm
+    query_agent = get_chain('query_generator', state.get('model'), state.get('api_key'))
 
     messages = state.get('message', [])
     last_question = messages[-1].content if messages else "No query requested"
@@ -300,17 +403,18 @@ def DataExplorer_node(state: State):
 
     LOGGER.info(f"Generated SQL Query: \n{query_response.content}")
 
-    # Load DataFrames
+    # Cursor with the cached tables registered as views (no DataFrame copies)
     data_manager = state.get('data_manager')
-    leads = data_manager.leads
-    leads_scored = data_manager.leads_scored
-    transactions = data_manager.transactions
-    products = data_manager.products
+    conn = data_manager.get_connection()
 
     # Step 2: Execute SQL query using DuckDB
     try:
-        query_result_df = duckdb.query(query_response.content).to_df()                      # DuckDB automatically detects DataFrames in the local scope
-        query_result_json = query_result_df.to_json(orient='records')
+        with span('duckdb_query') as attrs, ResourceConfig().limit('interactive'):           # Bound concurrent queries and their threads
+            query_result_df = conn.query(query_response.content).to_df()
+            attrs['rows'] = len(query_result_df)
+        with span('to_json', source='query_result') as attrs:
+            query_result_json = query_result_df.to_json(orient='records')
+            attrs['bytes'] = len(query_result_json)
         LOGGER.info(f"Query executed successfully. Result rows: {len(query_result_df)}")
     except Exception as e:
         LOGGER.error(f"DuckDB Query Error: {e}")
@@ -318,8 +422,7 @@ def DataExplorer_node(state: State):
         return {'response': [AIMessage(content=error_message)]}
 
     # Step 3: Analyze query results with LLM
-    prompt_template = ChatPromptTemplate.from_template(DATA_EXPLORER_PROMPT)
-    analysis_agent = prompt_template | llm
+    analysis_agent = get_chain('data_explorer', state.get('model'), state.get('api_key'))
 
     result = analysis_agent.invoke({
         'initial_question': last_question,
@@ -327,10 +430,18 @@ def DataExplorer_node(state: State):
         'query_result': query_result_json
     })
 
+    # Chart of the query result itself, inferred from its schema (no LLM call)
+    from chart_inference import infer_chart_json
+    chart_json = []
+    with span('chart_inference') as attrs:
+        adhoc_chart = infer_chart_json(query_response.content, query_result_df, data_manager.get_data_version())
+        attrs['bytes'] = len(adhoc_chart or '')
+    if adhoc_chart:
+        chart_json.append(adhoc_chart)
+
     # Load chart JSON for relevant plots
     relevant_plots = select_visualizations(last_question, state.get('model'), state.get('api_key'))
     
-    chart_json = []
     if relevant_plots and relevant_plots.get('paths'):                                    # Check if dict exists AND paths is not empty 
         for path in relevant_plots['paths']:
             chart_json.append(load_chart_json(path))
@@ -344,6 +455,7 @@ def DataExplorer_node(state: State):
         'chart_json': chart_json if chart_json else None
     }
 
+@traced_node('email_writer')
 def EmailWriter_node(state: State):
     """
     Description: Generate marketing email content based on analysis.
@@ -354,28 +466,26 @@ def EmailWriter_node(state: State):
     """
 
     data_manager = state.get('data_manager')
-    leads = data_manager.leads
-    leads_scored = data_manager.leads_scored
-    transactions = data_manager.transactions
-    products = data_manager.products
+    conn = data_manager.get_connection()                                                # Cursor with the cached tables registered as views
 
     last_message = state.get('message', [])[-1] if state.get('message') else None       # Get the last user message for email generation
 
-    models = get_models(state.get('api_key'))
-    llm = models[state.get('model')]
-    prompt_template = ChatPromptTemplate.from_template(BEST_EMAILS_PROMPT)
-    agent = prompt_template | llm
+    agent = get_chain('best_emails', state.get('model'), state.get('api_key'))
     query = agent.invoke({'user_message': last_message.content})
 
     LOGGER.info(f"Query generated to detect target emails. \n {query.content}")
 
-    target_emails = duckdb.query(query.content).to_df()
-    prompt_template = ChatPromptTemplate.from_template(WRITE_EMAILS_PROMPT)
-    agent = prompt_template | llm
+    with span('duckdb_query') as attrs, ResourceConfig().limit('interactive'):           # Bound concurrent queries and their threads
+        target_emails = conn.query(query.content).to_df()
+        attrs['rows'] = len(target_emails)
+    with span('to_json', source='target_emails') as attrs:
+        target_emails_json = target_emails.to_json()
+        attrs['bytes'] = len(target_emails_json)
+    agent = get_chain('write_emails', state.get('model'), state.get('api_key'))
 
     result = agent.invoke({
         'user_message': last_message.content,
-        'target_emails': target_emails.to_json()
+        'target_emails': target_emails_json
     })
 
     LOGGER.info("Email writer completed successfully.")
@@ -385,6 +495,7 @@ def EmailWriter_node(state: State):
             'sql_query': query.content}
 
 
+@traced_node('business_analysis')
 def BusinessAnalyst_node(state: State):
     """
     Description: Explore and provide business metrics summary.
@@ -399,44 +510,42 @@ def BusinessAnalyst_node(state: State):
     transactions = data_manager.transactions
     products = data_manager.products
 
-    # Merge transactions with products to get pricing
-    transactions_with_price = transactions.merge(products[['product_id', 'suggested_price', 'description']], on='product_id', how='left')
+    with span('pandas_metrics', source='business_summary'):
+        # Merge transactions with products to get pricing
+        transactions_with_price = transactions.merge(products[['product_id', 'suggested_price', 'description']], on='product_id', how='left')
     
-    # Calculate basic metrics
-    total_customers = int(leads_scored['user_email'].nunique())
-    active_customers = int(transactions['user_email'].nunique())
-    total_transactions = int(transactions.shape[0])
-    total_revenue = float(transactions_with_price['suggested_price'].sum())
+        # Calculate basic metrics
+        total_customers = int(leads_scored['user_email'].nunique())
+        active_customers = int(transactions['user_email'].nunique())
+        total_transactions = int(transactions.shape[0])
+        total_revenue = float(transactions_with_price['suggested_price'].sum())
     
-    # Top products by revenue - properly aggregate with specific column
-    top_products = (transactions_with_price.groupby(['product_id', 'description']).agg({'suggested_price': ['sum', 'count']}).reset_index())
-    top_products.columns = ['product_id', 'description', 'total_revenue', 'purchase_count']
-    top_products = top_products.nlargest(5, 'total_revenue')
+        # Top products by revenue - properly aggregate with specific column
+        top_products = (transactions_with_price.groupby(['product_id', 'description']).agg({'suggested_price': ['sum', 'count']}).reset_index())
+        top_products.columns = ['product_id', 'description', 'total_revenue', 'purchase_count']
+        top_products = top_products.nlargest(5, 'total_revenue')
     
-    # Top countries by revenue - use charge_country from transactions
-    top_countries = (transactions_with_price.groupby('charge_country').agg({'suggested_price': ['sum', 'count']}).reset_index())
-    top_countries.columns = ['charge_country', 'total_revenue', 'purchase_count']
-    top_countries = top_countries.nlargest(5, 'total_revenue')
-
-    business_summary = {
-        'total_customers': total_customers,
-        'total_transactions': total_transactions,
-        'total_revenue': round(total_revenue, 2),
-        'conversion_rate': round((active_customers / total_customers) * 100, 2),
-        'avg_customer_value': round(total_revenue / total_customers, 2),
-        'avg_transaction_value': round(total_revenue / total_transactions, 2),
-        'min_transaction': round(float(transactions_with_price['suggested_price'].min()), 2),
-        'max_transaction': round(float(transactions_with_price['suggested_price'].max()), 2),
-        'active_customers': active_customers,
-        'dormant_customers': total_customers - active_customers,
-        'top_products': top_products.to_dict(orient='records'),
-        'top_countries': top_countries.to_dict(orient='records'),
-    }
-
-    models = get_models(state.get('api_key'))
-    llm = models[state.get('model')] 
-    prompt_template = ChatPromptTemplate.from_template(BUSINESS_ANALYST_PROMPT)
-    agent = prompt_template | llm
+        # Top countries by revenue - use charge_country from transactions
+        top_countries = (transactions_with_price.groupby('charge_country').agg({'suggested_price': ['sum', 'count']}).reset_index())
+        top_countries.columns = ['charge_country', 'total_revenue', 'purchase_count']
+        top_countries = top_countries.nlargest(5, 'total_revenue')
+
+        business_summary = {
+            'total_customers': total_customers,
+            'total_transactions': total_transactions,
+            'total_revenue': round(total_revenue, 2),
+            'conversion_rate': round((active_customers / total_customers) * 100, 2),
+            'avg_customer_value': round(total_revenue / total_customers, 2),
+            'avg_transaction_value': round(total_revenue / total_transactions, 2),
+            'min_transaction': round(float(transactions_with_price['suggested_price'].min()), 2),
+            'max_transaction': round(float(transactions_with_price['suggested_price'].max()), 2),
+            'active_customers': active_customers,
+            'dormant_customers': total_customers - active_customers,
+            'top_products': top_products.to_dict(orient='records'),
+            'top_countries': top_countries.to_dict(orient='records'),
+        }
+
+    agent = get_chain('business_analyst', state.get('model'), state.get('api_key'))
 
     messages = state.get('message', [])
     last_question = messages[-1].content if messages else "Provide comprehensive data analysis"
@@ -464,6 +573,7 @@ def BusinessAnalyst_node(state: State):
         'chart_json': chart_json if chart_json else None
     }
 
+@traced_node('marketing_analysis')
 def MarketingAnalyst_node(state: State):
     """
     Description: Analyze customer segments using cached data from DataManager.
@@ -475,10 +585,7 @@ def MarketingAnalyst_node(state: State):
 
     data_manager = state.get('data_manager')
     
-    models = get_models(state.get('api_key'))
-    llm = models[state.get('model')] 
-    prompt_template = ChatPromptTemplate.from_template(MARKETING_ANALYST_PROMPT)
-    agent = prompt_template | llm 
+    agent = get_chain('marketing_analyst', state.get('model'), state.get('api_key'))
 
     try:
         leads_scored = data_manager.leads_scored
@@ -490,33 +597,34 @@ def MarketingAnalyst_node(state: State):
         LOGGER.error(f"Error loading data: {e}")
         return state
 
-    # Calculate transaction_frequency (group by user_email and count transactions)
-    purchase_frequency = transactions.groupby('user_email').size().reset_index(name='purchase_frequency')
-    LOGGER.info(f"Transaction frequency calculated. Mean frequency: {purchase_frequency['purchase_frequency'].mean():.2f}")
+    with span('pandas_metrics', source='segment_statistics'):
+        # Calculate transaction_frequency (group by user_email and count transactions)
+        purchase_frequency = transactions.groupby('user_email').size().reset_index(name='purchase_frequency')
+        LOGGER.info(f"Transaction frequency calculated. Mean frequency: {purchase_frequency['purchase_frequency'].mean():.2f}")
 
-    # Combines customer profiles with their purchase activity, keeping all customers even if they never purchased anything.
-    df_analysis = leads_scored.merge(purchase_frequency, on='user_email', how='left')
-    LOGGER.info(f"Features merged. Customer data shape: {df_analysis.shape}")
+        # Combines customer profiles with their purchase activity, keeping all customers even if they never purchased anything.
+        df_analysis = leads_scored.merge(purchase_frequency, on='user_email', how='left')
+        LOGGER.info(f"Features merged. Customer data shape: {df_analysis.shape}")
 
-    # Fill missing values
-    df_analysis['purchase_frequency'] = df_analysis['purchase_frequency'].fillna(0)
+        # Fill missing values
+        df_analysis['purchase_frequency'] = df_analysis['purchase_frequency'].fillna(0)
 
-    # Create summary statistics for each customer segment and rename user_email to customer_count
-    df_summary = df_analysis.groupby('customer_segment').agg({
-        'p1': 'mean',                                                                                                           # Use mean for lead score                        
-        'member_rating': 'mean',                                                                                                # Use mean for member rating                                                         
-        'purchase_frequency': 'mean',                                                                                           # Use mean for purchase frequency      
-        'user_email': 'count'                                                                                                   # Count customers in each segment   
-    }).rename(columns={'user_email': 'customer_count'}).reset_index()
+        # Create summary statistics for each customer segment and rename user_email to customer_count
+        df_summary = df_analysis.groupby('customer_segment').agg({
+            'p1': 'mean',                                                                                                           # Use mean for lead score                        
+            'member_rating': 'mean',                                                                                                # Use mean for member rating                                                         
+            'purchase_frequency': 'mean',                                                                                           # Use mean for purchase frequency      
+            'user_email': 'count'                                                                                                   # Count customers in each segment   
+        }).rename(columns={'user_email': 'customer_count'}).reset_index()
 
-    # Round statistics for better readability
-    df_summary['avg_p1'] = df_summary['p1'].round(3)
-    df_summary['avg_member_rating'] = df_summary['member_rating'].round(2)
-    df_summary['avg_purchase_frequency'] = df_summary['purchase_frequency'].round(2)
+        # Round statistics for better readability
+        df_summary['avg_p1'] = df_summary['p1'].round(3)
+        df_summary['avg_member_rating'] = df_summary['member_rating'].round(2)
+        df_summary['avg_purchase_frequency'] = df_summary['purchase_frequency'].round(2)
 
-    # Convert summary statistics to JSON format
-    segment_stats_json = df_summary[['customer_segment', 'customer_count', 
-                                     'avg_p1', 'avg_member_rating', 'avg_purchase_frequency']].to_json(orient='records')
+        # Convert summary statistics to JSON format
+        segment_stats_json = df_summary[['customer_segment', 'customer_count', 
+                                         'avg_p1', 'avg_member_rating', 'avg_purchase_frequency']].to_json(orient='records')
 
     
     messages = state.get('message', [])
@@ -525,10 +633,10 @@ def MarketingAnalyst_node(state: State):
                            'segment_statistics': segment_stats_json})
 
     # Get the plot path safely
+    from generate_plots import PlotGenerator
     plot_info = PlotGenerator().get_plot_by_title('Customer Segment Analysis')
-    if plot_info and os.path.exists(plot_info['path']):
-        chart_json = load_chart_json(plot_info['path'])
-    else:
+    chart_json = load_chart_json(plot_info['path']) if plot_info else None                 # Generated on first request
+    if not chart_json:
         chart_json = None
         LOGGER.warning("Chart JSON not found.")
 
@@ -541,79 +649,187 @@ def MarketingAnalyst_node(state: State):
     }
 # --------------------------------------GRAPH----------------------------------------------
 
-builder = StateGraph(State)
-builder.add_node('router', router_node)
-builder.add_node('data_overview', DataOverview_node)
-builder.add_node('data_exploration', DataExplorer_node)
-builder.add_node('email_writer', EmailWriter_node)
-builder.add_node('business_analysis', BusinessAnalyst_node)
-builder.add_node('marketing_analysis', MarketingAnalyst_node)
+_graph = None
+_graph_lock = threading.Lock()
 
-builder.add_edge(START, 'router')
-builder.add_conditional_edges('router', route_after_router, ['data_overview', 'data_exploration', 'email_writer',
-                                                             'business_analysis', 'marketing_analysis'])
-builder.add_edge('data_overview', END)
-builder.add_edge('data_exploration', END)
-builder.add_edge('email_writer', END)
-builder.add_edge('business_analysis', END)
-builder.add_edge('marketing_analysis', END)
+def get_graph():
+    """
+    Description: Build and compile the LangGraph workflow on first use (deferred so importing this module does not
+    load LangGraph or compile the graph).
+    Args:
+        None
+    Returns:
+        CompiledStateGraph: The compiled graph, shared by every session of the process
+    """
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            from langgraph.graph import StateGraph, START, END
+
+            start = time.perf_counter()
+            builder = StateGraph(State)
+            builder.add_node('router', router_node)
+            builder.add_node('data_overview', DataOverview_node)
+            builder.add_node('data_exploration', DataExplorer_node)
+            builder.add_node('email_writer', EmailWriter_node)
+            builder.add_node('business_analysis', BusinessAnalyst_node)
+            builder.add_node('marketing_analysis', MarketingAnalyst_node)
+
+            builder.add_edge(START, 'router')
+            builder.add_conditional_edges('router', route_after_router, ['data_overview', 'data_exploration', 'email_writer',
+                                                                         'business_analysis', 'marketing_analysis'])
+            builder.add_edge('data_overview', END)
+            builder.add_edge('data_exploration', END)
+            builder.add_edge('email_writer', END)
+            builder.add_edge('business_analysis', END)
+            builder.add_edge('marketing_analysis', END)
+
+            _graph = builder.compile()
+            LOGGER.info(f"Graph compiled in {time.perf_counter() - start:.3f}s")
+    return _graph
+
+def __getattr__(name):
+    """Keep `marketing_analyst.graph` available, compiled on first access."""
+    if name == 'graph':
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-graph = builder.compile()
+# --------------------------------------CLASS----------------------------------------------
 
-# ---------------------------------------PLOTTING------------------------------------------
+class AnalystEngine:
+    """Session-independent resources shared by every MarketingAnalyst of the process.
 
-if not os.path.exists(marketing_path):
-    try:
-        # Try to generate the graph with Mermaid API with higher retry settings
-        LOGGER.info("Attempting to generate marketing graph using Mermaid API...")
-        #analyst_graph = graph.get_graph().draw_mermaid_png(max_retries=5, retry_delay=2.0)
-        analyst_graph = graph.get_graph().print_ascii()                                                                         # Temporary change for testing without Mermaid API
-        with open(marketing_path, 'wb') as f:
-            f.write(analyst_graph)
-        LOGGER.info("Marketing graph generated successfully using Mermaid API.")
-    except Exception as e:
-        LOGGER.warning(f"Mermaid API failed: {e}")
-        LOGGER.info("Continuing without graph visualization. The application will work normally.")
+    Holds the loaded data and its DuckDB connection, the plot generator (and through it the plot and
+    chart caches) and the compiled graph. It is created once per process; sessions only add a model
+    choice, an API key and their history on top of it.
+    """
 
-# --------------------------------------CLASS----------------------------------------------
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls, db_path: str = 'data/leads_scored.db', background_plots: bool = False):
+        """Create the engine on first use (db_path and background_plots only apply on creation).
+
+        Args:
+            db_path: Path to the database
+            background_plots: If True, pre-generate every missing plot in a background thread. Otherwise plots
+                are generated lazily the first time they are requested
+        """
+        with cls._lock:                                                                     # Concurrent sessions build the engine only once
+            if cls._instance is None:
+                start = time.perf_counter()
+                from data_manager import DataManager
+                from generate_plots import PlotGenerator
+
+                instance = super().__new__(cls)
+                instance.db_path = db_path
+                instance.data_manager = DataManager()
+                instance.plot_generator = PlotGenerator()
+                instance.compiled_graph = get_graph()
+                instance.data_manager.load_data(db_path=db_path)
+                instance.data_manager.get_connection()                                      # Open the persistent DuckDB database now
+                if background_plots:
+                    instance.plot_generator.generate_plots(instance.data_manager, background=True)
+                instance.warmup_seconds = round(time.perf_counter() - start, 4)
+                LOGGER.info(f"Analyst engine ready in {instance.warmup_seconds:.3f}s")
+                cls._instance = instance
+        return cls._instance
 
 class MarketingAnalyst:
-    """A Marketing Analyst agent that analyzes customer segments and provides insights."""
+    """A Marketing Analyst agent that analyzes customer segments and provides insights.
+
+    Each instance is a lightweight session (model, API key and last response) on top of the shared AnalystEngine.
+    """
     
-    def __init__(self, model=None, api_key=None, db_path='data/leads_scored.db'):
+    def __init__(self, model=None, api_key=None, db_path='data/leads_scored.db', background_plots=False):
         """Initialize the Marketing Analyst agent.
         
         Args:
             model: Model name string (e.g., 'gpt-5-nano', 'llama3.1') or None for default
             api_key: OpenAI API key for session isolation in multi-user deployments
-            db_path: Path to the database
+            db_path: Path to the database (only used if the shared engine does not exist yet)
+            background_plots: If True, pre-generate every missing plot in a background thread when the shared
+                engine is created. Otherwise plots are generated lazily the first time they are requested
         """
         self.model = model
         self.api_key = api_key
-        self.db_path = db_path 
-        self.compiled_graph = graph
-        self.data_manager = DataManager()
-        self.plot_generator = PlotGenerator()
-        self.data_manager.load_data(db_path=self.db_path)
-        self.plot_generator.generate_plots(self.data_manager)
+        self.engine = AnalystEngine(db_path=db_path, background_plots=background_plots)
+        self.db_path = self.engine.db_path
+        self.compiled_graph = self.engine.compiled_graph
+        self.data_manager = self.engine.data_manager
+        self.plot_generator = self.engine.plot_generator
         self.response = None
+        self.last_trace = None
+
+    def set_model(self, model):
+        """Switch the model used by the agents of this session (no data or graph is rebuilt).
+
+        Args:
+            model: Model name string (e.g., 'gpt-5-nano', 'llama3.1')
+        """
+        self.model = model
     
-    def invoke_agent(self, user_instructions: str):
+    def invoke_agent(self, user_instructions: str, profile: str = None):
         """Invoke the agent with user instructions.
         
         Args:graph
             user_instructions: The user's question or request
+            profile: None, 'cprofile' or 'pyinstrument' to profile this turn (see tracing.py)
         """
         messages = [HumanMessage(content=user_instructions)]
-        # Pass the LLM instance through the state
-        self.response = self.compiled_graph.invoke({
-            'message': messages,
+        with trace_turn(profile=profile, question=user_instructions, model=self.model) as trace:
+            # Pass the LLM instance through the state
+            self.response = self.compiled_graph.invoke({
+                'message': messages,
+                'model': self.model,
+                'api_key': self.api_key,
+                'data_manager': self.data_manager
+            }, config={'callbacks': [trace.callback]})                                    # Records the LLM calls of every node
+            trace.attrs['route'] = self.response.get('next_action')
+        self.last_trace = trace
+        return self.response
+    
+    def stream_agent(self, user_instructions: str, profile: str = None):
+        """Invoke the agent and yield the output of every node as soon as it finishes.
+
+        Args:
+            user_instructions: The user's question or request
+            profile: None, 'cprofile' or 'pyinstrument' to profile this turn (see tracing.py)
+        Yields:
+            tuple: (node name, state update of the node). The merged final state is available with get_response()
+        """
+        state = {
+            'message': [HumanMessage(content=user_instructions)],
             'model': self.model,
             'api_key': self.api_key,
             'data_manager': self.data_manager
-        })
-        return self.response
-    
+        }
+        self.response = None
+        with trace_turn(profile=profile, question=user_instructions, model=self.model) as trace:
+            for update in self.compiled_graph.stream(state, config={'callbacks': [trace.callback]}, stream_mode='updates'):
+                for node, node_update in update.items():
+                    state.update(node_update or {})
+                    yield node, node_update
+            trace.attrs['route'] = state.get('next_action')
+        self.last_trace = trace
+        self.response = state
+
+    def get_last_trace(self):
+        """Get the latency breakdown of the last turn.
+
+        Returns:
+            dict: Trace with duration, per-span-name breakdown (time, calls, tokens, bytes) and spans, or None.
+        """
+        return self.last_trace.to_dict() if self.last_trace else None
+
+    def get_resource_settings(self):
+        """Get the thread budgets and the settings currently in effect.
+
+        Returns:
+            dict: Budgets per workload, native thread pools and DuckDB threads of the agent connection.
+        """
+        return ResourceConfig().get_effective_settings(self.data_manager.get_connection())
+
     def get_response(self):
         """Get the last response from the agent.
         
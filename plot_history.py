@@ -0,0 +1,122 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file implements the plot history of a Streamlit session. Charts are stored once per content hash
+# (the same stock chart shown in several turns is kept once), only the most recent ones stay in memory and older
+# ones are spilled to compressed files in a temporary folder. Parsed figures are cached for the charts on screen.
+
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+
+from chart_codec import compress_json, decode_payload, figure_from_json
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+SPILL_ROOT = os.path.join(tempfile.gettempdir(), 'marketing_analyst_plots')                        # One subfolder per session
+MAX_CHARTS_PER_TURN = 4                                                                             # Up to 3 selected plots plus the ad-hoc chart of a query
+
+# --------------------------------------PLOT HISTORY CLASS---------------------------------
+
+class PlotHistory:
+    """Deduplicated chart history with a bounded in-memory window and spill-to-disk."""
+
+    def __init__(self, max_in_memory: int = 20, recent_turns: int = 5):
+        """Initialize an empty history.
+
+        Args:
+            max_in_memory: Chart JSONs kept in memory; older ones are written to disk.
+            recent_turns: Turns rendered in full on every rerun. Parsed figures are kept for all of their
+                charts (recent_turns * MAX_CHARTS_PER_TURN), so a rerun does not parse any JSON again.
+        """
+        self.max_in_memory = max_in_memory
+        self.max_figures = recent_turns * MAX_CHARTS_PER_TURN
+        self._charts = OrderedDict()                                                                # hash -> chart JSON (most recent last)
+        self._figures = OrderedDict()                                                               # hash -> parsed figure
+        self._spilled = set()
+        self._lock = threading.Lock()
+        self._spill_dir = os.path.join(SPILL_ROOT, uuid.uuid4().hex)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self._spill_dir, True)             # Remove spilled files with the session
+
+    @staticmethod
+    def chart_hash(chart_json: str) -> str:
+        """Content hash of a chart JSON."""
+        return hashlib.sha1(chart_json.encode('utf-8')).hexdigest()[:16]
+
+    def add(self, chart_json: str) -> str:
+        """Store a chart (once per content) and return its hash."""
+        key = self.chart_hash(chart_json)
+        with self._lock:
+            if key in self._charts:
+                self._charts.move_to_end(key)
+            elif key not in self._spilled:
+                self._charts[key] = chart_json
+                self._spill_oldest()
+        return key
+
+    def _spill_oldest(self):
+        """Write the least recently added charts above the in-memory window to disk."""
+        while len(self._charts) > self.max_in_memory:
+            key, chart_json = self._charts.popitem(last=False)
+            os.makedirs(self._spill_dir, exist_ok=True)
+            with open(os.path.join(self._spill_dir, f'{key}.zst'), 'wb') as f:
+                f.write(compress_json(chart_json))
+            self._spilled.add(key)
+
+    def get_json(self, key: str) -> str:
+        """Get the chart JSON of a hash from memory or from its spilled file (None if unknown)."""
+        with self._lock:
+            chart_json = self._charts.get(key)
+            if chart_json is not None or key not in self._spilled:
+                return chart_json
+        with open(os.path.join(self._spill_dir, f'{key}.zst'), 'rb') as f:
+            return decode_payload(f.read())
+
+    def get_figure(self, key: str):
+        """Get the Plotly figure of a hash, parsing it only if it is not among the cached figures."""
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+                return fig
+        chart_json = self.get_json(key)
+        if chart_json is None:
+            return None
+        fig = figure_from_json(chart_json)
+        with self._lock:
+            self._figures[key] = fig
+            while len(self._figures) > self.max_figures:
+                self._figures.popitem(last=False)
+        return fig
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._charts or key in self._spilled
+
+    def __len__(self) -> int:
+        return len(self._charts) + len(self._spilled)
+
+    def clear(self):
+        """Forget every chart and delete the spilled files."""
+        with self._lock:
+            self._charts.clear()
+            self._figures.clear()
+            self._spilled.clear()
+        shutil.rmtree(self._spill_dir, ignore_errors=True)
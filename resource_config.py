@@ -0,0 +1,136 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file centralizes the thread budgets of the heavy workloads (interactive queries, plot generation
+# and segmentation). Each workload gets a DuckDB thread count, a maximum number of concurrent runs and, for
+# segmentation, a number of BLAS/OpenMP threads (threadpoolctl), so concurrent Streamlit sessions do not
+# oversubscribe the CPU cores.
+
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+
+from threadpoolctl import threadpool_info, threadpool_limits
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+CPU_COUNT = os.cpu_count() or 1
+INTERACTIVE_THREADS = max(1, CPU_COUNT // 4)
+
+@dataclass
+class ThreadBudget:
+    """Threads a single run of a workload may use and how many runs may execute at once."""
+    threads: int
+    max_concurrent: int
+    limit_blas: bool = False                                                                    # Also apply `threads` to BLAS/OpenMP (process-wide)
+
+# Interactive queries are many and short: few threads each, several in parallel.
+# Segmentation is rare and heavy: one run at a time using half of the cores.
+DEFAULT_BUDGETS = {
+    'interactive': ThreadBudget(threads=INTERACTIVE_THREADS, max_concurrent=max(1, CPU_COUNT // INTERACTIVE_THREADS)),
+    'plots': ThreadBudget(threads=INTERACTIVE_THREADS, max_concurrent=2),
+    'segmentation': ThreadBudget(threads=max(1, CPU_COUNT // 2), max_concurrent=1, limit_blas=True),
+}
+
+# threadpoolctl limits are process-wide and restored in LIFO order, so limited blocks must never overlap
+_BLAS_LOCK = threading.Lock()
+
+# --------------------------------------RESOURCE CONFIG CLASS------------------------------
+
+class ResourceConfig:
+    """Process-wide thread budgets per workload class."""
+
+    _instance = None
+
+    def __new__(cls):
+        """Ensure only one instance of ResourceConfig exists."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._budgets = {name: ThreadBudget(**asdict(budget)) for name, budget in DEFAULT_BUDGETS.items()}
+            cls._instance._semaphores = {name: threading.BoundedSemaphore(budget.max_concurrent)
+                                         for name, budget in cls._instance._budgets.items()}
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    def configure(self, workload: str, threads: int = None, max_concurrent: int = None):
+        """Change the budget of a workload.
+
+        Args:
+            workload: 'interactive', 'plots' or 'segmentation'.
+            threads: Threads per run (DuckDB, and BLAS/OpenMP if the workload limits them). Only applies to
+                DuckDB connections created afterwards, see apply_duckdb.
+            max_concurrent: Runs of this workload allowed at the same time.
+        """
+        with self._lock:
+            budget = self.get_budget(workload)
+            if threads is not None:
+                budget.threads = max(1, int(threads))
+            if max_concurrent is not None:
+                budget.max_concurrent = max(1, int(max_concurrent))
+                self._semaphores[workload] = threading.BoundedSemaphore(budget.max_concurrent)
+        LOGGER.info(f"Thread budget for '{workload}' set to {budget}")
+
+    def get_budget(self, workload: str) -> ThreadBudget:
+        """Get the budget of a workload."""
+        if workload not in self._budgets:
+            raise ValueError(f"Unknown workload '{workload}'. Expected one of {list(self._budgets)}")
+        return self._budgets[workload]
+
+    def apply_duckdb(self, conn, workload: str):
+        """Limit the thread pool of the DuckDB database behind conn to the workload budget.
+
+        `SET threads` is a database-wide setting shared by every cursor of the database, so call this once,
+        right after duckdb.connect(), on a database dedicated to one workload.
+        """
+        conn.execute(f"SET threads = {self.get_budget(workload).threads}")
+
+    @contextmanager
+    def limit(self, workload: str):
+        """Run a block within the workload budget.
+
+        Waits for a free slot of the workload. If the workload limits BLAS/OpenMP threads (segmentation),
+        they are limited for the whole process and restored on exit; such blocks run one at a time under a
+        global lock, since overlapping limits from several threads would be restored out of order.
+
+        Args:
+            workload: 'interactive', 'plots' or 'segmentation'.
+        """
+        budget = self.get_budget(workload)
+        with self._semaphores[workload]:
+            if not budget.limit_blas:
+                yield budget
+                return
+            with _BLAS_LOCK, threadpool_limits(limits=budget.threads):
+                yield budget
+
+    def get_effective_settings(self, conn=None) -> dict:
+        """Describe the budgets and the thread counts actually in effect.
+
+        Args:
+            conn: Optional DuckDB connection whose current 'threads' setting is reported.
+        Returns:
+            dict: cpu_count, budgets per workload, native thread pools and DuckDB threads.
+        """
+        settings = {
+            'cpu_count': CPU_COUNT,
+            'budgets': {name: asdict(budget) for name, budget in self._budgets.items()},
+            'threadpools': [{'user_api': info.get('user_api'), 'internal_api': info.get('internal_api'),
+                             'num_threads': info.get('num_threads')} for info in threadpool_info()],
+        }
+        if conn is not None:
+            settings['duckdb_threads'] = conn.execute("SELECT current_setting('threads')").fetchone()[0]
+        return settings
@@ -0,0 +1,215 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file runs customer segmentation as a daemon. It watches the row counts of the source tables and
+# re-segments customers only when enough rows changed, then invalidates the plots and caches that depend on
+# customer_segment. Run it with `python segmentation_scheduler.py` (see --help for the options).
+
+import os
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+
+from customer_segmentation import (run_segmentation, current_segment_centroids, load_segmentation_state,
+                                   save_segmentation_state, STATE_PATH)
+from data_manager import bump_data_version
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+WATCHED_TABLES = ('transactions', 'leads', 'leads_scored')                                         # Tables whose growth can move customers between segments
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+def get_row_counts(db_path: str = 'data/leads_scored.db') -> dict:
+    """Count the rows of every watched table."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in WATCHED_TABLES}
+    finally:
+        conn.close()
+
+def change_volume(previous: dict, current: dict) -> int:
+    """Number of rows added or removed across the watched tables since the previous counts.
+
+    Only row counts are compared: rows updated in place (e.g. an UPDATE of existing transactions) do not count
+    towards the threshold. Run `python segmentation_scheduler.py --once --force` after such changes.
+    """
+    return sum(abs(current.get(table, 0) - previous.get(table, 0)) for table in WATCHED_TABLES)
+
+def invalidate_segment_dependents(column: str = 'customer_segment'):
+    """Remove the saved plots that depend on the segment column, so they are rebuilt on their next request.
+
+    Other processes notice the new segments through the data version file (see bump_data_version), which is
+    bumped after every re-segmentation; this only drops the plot files eagerly when enough customers moved.
+    """
+    # Imported here so the daemon does not pay for plotly unless a re-segmentation actually happens
+    from generate_plots import PlotGenerator
+
+    PlotGenerator().invalidate_plots(column)
+
+# --------------------------------------SCHEDULER CLASS------------------------------------
+
+class SegmentationScheduler:
+    """Re-segments customers when the source tables changed by more than a threshold."""
+
+    def __init__(self, db_path: str = 'data/leads_scored.db', state_path: str = STATE_PATH,
+                 threshold: int = 1000, interval: float = 60.0, use_watchdog: bool = True,
+                 min_moved_fraction: float = 0.0):
+        """Initialize the scheduler.
+
+        Args:
+            db_path: Path to the SQLite database.
+            state_path: Where row counts and centroids of the last run are stored.
+            threshold: Minimum number of changed rows that triggers a re-segmentation.
+            interval: Seconds between row-count checks.
+            use_watchdog: If True, file changes on the database trigger an immediate check.
+            min_moved_fraction: Fraction of customers that must change segment before the saved dependent
+                plots are removed (any movement at all is required in every case). The data version is bumped
+                after every re-segmentation regardless, so cached tables are always reloaded.
+        """
+        self.db_path = db_path
+        self.state_path = state_path
+        self.threshold = threshold
+        self.interval = interval
+        self.use_watchdog = use_watchdog
+        self.min_moved_fraction = min_moved_fraction
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+
+    def check_once(self, force: bool = False) -> bool:
+        """Compare current row counts with the last segmentation and re-segment if needed.
+
+        Args:
+            force: Re-segment even if fewer rows than the threshold changed (e.g. after in-place updates).
+        Returns:
+            bool: True if a re-segmentation was run.
+        """
+        state = load_segmentation_state(self.state_path)
+        current = get_row_counts(self.db_path)
+
+        if 'row_counts' not in state:                                                               # First run: current segments become the baseline
+            state['row_counts'] = current
+            if 'centroids' not in state:
+                centroids = current_segment_centroids(self.db_path)                                 # Next run keeps the IDs of the stored segments
+                if centroids is not None:
+                    state['centroids'] = centroids.tolist()
+            save_segmentation_state(state, self.state_path)
+            LOGGER.info(f"Baseline recorded: {current} rows, centroids {'seeded' if 'centroids' in state else 'unavailable'}.")
+            return False
+
+        changed = change_volume(state['row_counts'], current)
+        if changed < self.threshold and not force:
+            LOGGER.info(f"{changed} rows changed (threshold {self.threshold}), segments are up to date.")
+            return False
+
+        LOGGER.info(f"{changed} rows changed (threshold {self.threshold}), re-segmenting customers.")
+        _, report = run_segmentation(self.db_path, self.state_path, incremental='centroids' in state)
+
+        state = load_segmentation_state(self.state_path)                                            # Reload to keep the centroids just saved
+        state['row_counts'] = get_row_counts(self.db_path)
+        save_segmentation_state(state, self.state_path)
+        bump_data_version(self.db_path)                                                             # leads_scored was rewritten: every process reloads it
+
+        if report['moved_customers'] > 0 and report['moved_fraction'] >= self.min_moved_fraction:
+            invalidate_segment_dependents()
+        else:
+            LOGGER.info(f"Only {report['moved_customers']} customers moved, keeping the saved segment plots.")
+        return True
+
+    def _run(self):
+        """Loop until stopped, checking on every interval or database change."""
+        while not self._stop.is_set():
+            try:
+                self.check_once()
+            except Exception as e:
+                LOGGER.error(f"Segmentation check failed: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def _start_watchdog(self):
+        """Wake the loop up whenever the database file is modified."""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            LOGGER.warning("watchdog is not installed, falling back to polling only.")
+            return
+
+        db_file = os.path.abspath(self.db_path)
+        wakeup = self._wakeup
+
+        class _DatabaseHandler(FileSystemEventHandler):
+            def on_modified(self, event):
+                if os.path.abspath(event.src_path) == db_file:
+                    wakeup.set()
+
+        self._observer = Observer()
+        self._observer.schedule(_DatabaseHandler(), os.path.dirname(db_file), recursive=False)
+        self._observer.start()
+
+    def start(self):
+        """Start the scheduler in a background daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        if self.use_watchdog:
+            self._start_watchdog()
+        self._thread = threading.Thread(target=self._run, name='segmentation-scheduler', daemon=True)
+        self._thread.start()
+        LOGGER.info(f"Segmentation scheduler started (threshold={self.threshold}, interval={self.interval}s).")
+
+    def stop(self):
+        """Stop the scheduler and the file watcher."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+# --------------------------------------MAIN-----------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-segment customers when the database changes.")
+    parser.add_argument('--db-path', default='data/leads_scored.db', help="Path to the SQLite database.")
+    parser.add_argument('--threshold', type=int, default=1000, help="Changed rows that trigger a re-segmentation.")
+    parser.add_argument('--interval', type=float, default=60.0, help="Seconds between row-count checks.")
+    parser.add_argument('--min-moved-fraction', type=float, default=0.0,
+                        help="Fraction of customers that must change segment to remove the saved segment plots.")
+    parser.add_argument('--no-watchdog', action='store_true', help="Only poll, do not watch the database file.")
+    parser.add_argument('--once', action='store_true', help="Run a single check and exit.")
+    parser.add_argument('--force', action='store_true', help="With --once, re-segment even below the threshold.")
+    args = parser.parse_args()
+
+    scheduler = SegmentationScheduler(db_path=args.db_path, threshold=args.threshold,
+                                      interval=args.interval, use_watchdog=not args.no_watchdog,
+                                      min_moved_fraction=args.min_moved_fraction)
+    if args.once:
+        scheduler.check_once(force=args.force)
+    else:
+        scheduler.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            LOGGER.info("Stopping segmentation scheduler.")
+            scheduler.stop()
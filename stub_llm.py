@@ -0,0 +1,259 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file implements a deterministic fake chat model for offline benchmarking and regression tests. It
+# recognizes which prompt of prompts.py it receives and answers with a scripted response (route, SQL query, plot
+# selection or report), or replays the responses stored in a cassette (prompt hash -> response). In record mode it
+# forwards cache misses to a real model and stores its answers. An artificial, seeded latency can be added per call.
+
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import functools
+import logging
+import threading
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+
+import prompts
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+TEMPLATE_NAMES = ['ROUTER_PROMPT', 'PLOT_SELECTION_PROMPT', 'DATA_OVERVIEW_PROMPT', 'QUERY_GENERATOR_PROMPT',
+                  'DATA_EXPLORER_PROMPT', 'BEST_EMAILS_PROMPT', 'WRITE_EMAILS_PROMPT', 'BUSINESS_ANALYST_PROMPT',
+                  'MARKETING_ANALYST_PROMPT']
+
+# First matching keyword decides the route, anything else is a data exploration question
+ROUTE_KEYWORDS = [
+    ('email_writer', ('email', 'campaign')),
+    ('marketing_analysis', ('segment', 'strateg', 'cluster')),
+    ('business_analysis', ('business', 'performance', 'insight', 'kpi')),
+    ('data_overview', ('introduce', 'structure', 'dataset', 'overview', 'schema')),
+]
+
+REVENUE_JOIN = "FROM transactions t JOIN products p ON t.product_id = p.product_id"
+SQL_KEYWORDS = [
+    (('product',), f"SELECT p.product_id, p.description, SUM(p.suggested_price) AS revenue {REVENUE_JOIN} "
+                   "GROUP BY p.product_id, p.description ORDER BY revenue DESC LIMIT 5"),
+    (('countr',), f"SELECT t.charge_country, SUM(p.suggested_price) AS revenue {REVENUE_JOIN} "
+                  "GROUP BY t.charge_country ORDER BY revenue DESC LIMIT 5"),
+    (('segment',), "SELECT customer_segment, COUNT(*) AS customers FROM leads_scored "
+                   "GROUP BY customer_segment ORDER BY customer_segment"),
+]
+DEFAULT_SQL = "SELECT COUNT(*) AS customers FROM leads"
+TARGET_EMAILS_SQL = ("SELECT l.user_email, l.user_full_name, s.p1 FROM leads l "
+                     "JOIN leads_scored s ON l.user_email = s.user_email ORDER BY s.p1 DESC LIMIT 10")
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+def _template_pattern(template: str):
+    """Regex matching a formatted prompt template, with a named group per placeholder."""
+    pattern, seen = '', set()
+    for part in re.split(r'(\{\{|\}\}|\{\w+\})', template):
+        if part == '{{':
+            pattern += re.escape('{')
+        elif part == '}}':
+            pattern += re.escape('}')
+        elif re.fullmatch(r'\{\w+\}', part):
+            name = part[1:-1]
+            pattern += '.*?' if name in seen else f'(?P<{name}>.*?)'
+            seen.add(name)
+        else:
+            pattern += re.escape(part)
+    return re.compile(pattern, re.DOTALL)
+
+TEMPLATE_HEADS = [(name, getattr(prompts, name)[:60]) for name in TEMPLATE_NAMES]
+
+@functools.lru_cache(maxsize=None)
+def template_regex(name: str):
+    """Regex of a template, compiled the first time a prompt of that template is seen (slow for the long prompts)."""
+    return _template_pattern(getattr(prompts, name))
+
+def match_prompt(text: str) -> tuple:
+    """Identify the prompts.py template a prompt was formatted from.
+
+    Returns:
+        tuple: (template name, dict of placeholder values), or (None, {}) if no template matches.
+    """
+    for name, head in TEMPLATE_HEADS:
+        if text.startswith(head):
+            match = template_regex(name).fullmatch(text)
+            return name, (match.groupdict() if match else {})
+    return None, {}
+
+def _keyword_choice(question: str, options: list, default):
+    """First option whose keywords appear in the question."""
+    question = question.lower()
+    for value, keywords in options:
+        if any(keyword in question for keyword in keywords):
+            return value
+    return default
+
+def scripted_response(text: str, response_words: int = 120) -> str:
+    """Deterministic answer for a prompt, shaped like what its node expects."""
+    name, fields = match_prompt(text)
+    question = (fields.get('user_question') or fields.get('initial_question') or fields.get('user_message') or '').strip()
+
+    if name == 'ROUTER_PROMPT':
+        return json.dumps({'next': _keyword_choice(question, ROUTE_KEYWORDS, 'data_exploration')})
+    if name == 'QUERY_GENERATOR_PROMPT':
+        return _keyword_choice(question, [(sql, keywords) for keywords, sql in SQL_KEYWORDS], DEFAULT_SQL)
+    if name == 'BEST_EMAILS_PROMPT':
+        return TARGET_EMAILS_SQL
+    if name == 'PLOT_SELECTION_PROMPT':
+        try:
+            plots = json.loads(fields.get('available_plots', '[]'))
+        except ValueError:
+            plots = []
+        words = {word for word in re.findall(r'[a-z]+', question.lower()) if len(word) > 4}
+        selected = [plot for plot in plots if words & set(re.findall(r'[a-z]+', plot['title'].lower()))][:2]
+        return json.dumps({'selected_plots': [plot['title'] for plot in selected],
+                           'paths': [plot['path'] for plot in selected]})
+
+    title = (name or 'RESPONSE').replace('_PROMPT', '').replace('_', ' ').title()
+    filler = ' '.join(['Stub analysis text.'] * max(1, response_words // 3))
+    return f"## {title}\n\n**Question:** {question or 'n/a'}\n\n{filler}"
+
+def prompt_key(model_name: str, text: str) -> str:
+    """Cassette key of a prompt."""
+    return hashlib.sha256(f'{model_name}\n{text}'.encode('utf-8')).hexdigest()
+
+# --------------------------------------CASSETTE CLASS-------------------------------------
+
+class Cassette:
+    """Prompt -> response pairs stored in a JSON file, shared by every stub model using the same path."""
+
+    _cassettes = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self.interactions = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.interactions = json.load(f).get('interactions', {})
+            LOGGER.info(f"Loaded {len(self.interactions)} recorded interactions from {path}")
+
+    @classmethod
+    def open(cls, path: str):
+        """Get the cassette of a path, loading it only once per process."""
+        with cls._registry_lock:
+            if path not in cls._cassettes:
+                cls._cassettes[path] = cls(path)
+            return cls._cassettes[path]
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.interactions.get(key)
+        return entry['response'] if entry else None
+
+    def record(self, key: str, text: str, response: str):
+        """Store an interaction and save the cassette."""
+        with self._lock:
+            self.interactions[key] = {'prompt_head': text[:200], 'response': response}
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'w') as f:
+                json.dump({'interactions': self.interactions}, f, indent=2)
+
+# --------------------------------------STUB MODEL CLASS-----------------------------------
+
+class StubChatModel(BaseChatModel):
+    """Deterministic fake chat model with record/replay cassettes and artificial latency."""
+
+    model_name: str = 'stub'
+    mode: str = 'scripted'                                                                         # 'scripted', 'replay' or 'record'
+    cassette_path: Optional[str] = None
+    strict: bool = False                                                                           # Replay: fail on prompts missing from the cassette
+    latency: float = 0.0                                                                           # Mean seconds per call
+    latency_jitter: float = 0.0                                                                    # Standard deviation of the latency
+    latency_seed: int = 0                                                                          # Seed of the latency stream of this model
+    response_words: int = 120                                                                      # Length of scripted reports
+    record_from: Optional[Any] = None                                                              # Real model called on misses in record mode
+
+    _latency_rng: Optional[random.Random] = PrivateAttr(default=None)                              # One stream per model, shared by every call
+    _latency_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @classmethod
+    def from_env(cls, record_from=None):
+        """Build a stub configured by the STUB_LLM_* environment variables."""
+        return cls(mode=os.environ.get('STUB_LLM_MODE', 'scripted'),
+                   cassette_path=os.environ.get('STUB_LLM_CASSETTE') or None,
+                   strict=os.environ.get('STUB_LLM_STRICT', '0') == '1',
+                   latency=float(os.environ.get('STUB_LLM_LATENCY', 0.0)),
+                   latency_jitter=float(os.environ.get('STUB_LLM_LATENCY_JITTER', 0.0)),
+                   latency_seed=int(os.environ.get('STUB_LLM_LATENCY_SEED', 0)),
+                   record_from=record_from)
+
+    @property
+    def _llm_type(self) -> str:
+        return 'stub'
+
+    def _respond(self, text: str, messages: List[BaseMessage], schema=None) -> str:
+        """Response from the cassette, the recorded model or the script, depending on the mode.
+
+        With a structured output schema, misses in record mode are recorded from the real model's structured
+        output and stored as the schema's JSON, which is what with_structured_output parses on replay.
+        """
+        cassette = Cassette.open(self.cassette_path) if self.cassette_path else None
+        key = prompt_key(self.model_name, text)
+        if cassette is not None and self.mode in ('replay', 'record'):
+            response = cassette.get(key)
+            if response is not None:
+                return response
+            if self.mode == 'record' and self.record_from is not None:
+                if schema is not None:
+                    response = self.record_from.with_structured_output(schema).invoke(messages).model_dump_json()
+                else:
+                    response = self.record_from.invoke(messages).content
+                cassette.record(key, text, response)
+                return response
+            if self.strict:
+                raise KeyError(f"Prompt {key[:12]} is not in cassette {self.cassette_path}")
+        return scripted_response(text, self.response_words)
+
+    def _next_latency(self) -> float:
+        """Seconds of the next call, drawn from the seeded stream of this model (repeats of a prompt vary too)."""
+        with self._latency_lock:
+            if self._latency_rng is None:
+                self._latency_rng = random.Random(self.latency_seed)
+            return max(0.0, self._latency_rng.gauss(self.latency, self.latency_jitter))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        text = '\n'.join(str(message.content) for message in messages)
+        start = time.perf_counter()
+        response = self._respond(text, messages, kwargs.get('structured_schema'))
+
+        if self.latency or self.latency_jitter:
+            delay = self._next_latency() - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        usage = {'input_tokens': len(text) // 4, 'output_tokens': len(response) // 4}              # Rough token counts
+        usage['total_tokens'] = usage['input_tokens'] + usage['output_tokens']
+        message = AIMessage(content=response, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def with_structured_output(self, schema, **kwargs):
+        """Parse the JSON response into the given pydantic schema (used by the router)."""
+        return self.bind(structured_schema=schema) | RunnableLambda(lambda message: schema.model_validate_json(message.content))
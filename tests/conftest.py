@@ -0,0 +1,34 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Shared pytest fixtures. Tests run offline against a small synthetic database (see
+# benchmarks/synthetic_data.py) and reset the process-wide singletons between tests.
+
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)                                                                   # Modules live at the repository root
+
+from benchmarks.synthetic_data import generate_database
+from data_manager import DataManager
+
+# --------------------------------------FIXTURES-------------------------------------------
+
+@pytest.fixture
+def synthetic_db(tmp_path):
+    """Path of a fresh synthetic database with 2000 customers."""
+    db_path = str(tmp_path / 'data' / 'leads_scored.db')
+    generate_database(db_path, n_customers=2000, n_products=20, seed=7)
+    return db_path
+
+@pytest.fixture(autouse=True)
+def fresh_data_manager():
+    """Every test starts with an empty DataManager cache."""
+    DataManager._instance = None
+    yield
+    DataManager._instance = None
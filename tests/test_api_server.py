@@ -0,0 +1,81 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Tests of the HTTP/JSON API status codes, run against the offline stub model.
+
+import json
+import threading
+import http.client
+
+import pytest
+
+from api_server import AgentServer
+from marketing_analyst import AnalystEngine
+
+# --------------------------------------FIXTURES-------------------------------------------
+
+@pytest.fixture
+def server(synthetic_db, tmp_path, monkeypatch):
+    """API server on a free port, with its engine loaded from the synthetic database."""
+    monkeypatch.chdir(tmp_path)                                                                     # Default data/leads_scored.db and plots/
+    monkeypatch.setenv('STUB_LLM_MODE', 'scripted')
+    AnalystEngine._instance = None
+    server = AgentServer(('127.0.0.1', 0), default_model='stub', max_concurrent=1, queue_timeout=0.05)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    AnalystEngine._instance = None
+
+def request(server, method: str, path: str, body: dict = None):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=30)
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), json.loads(response.read() or b'null')
+    finally:
+        conn.close()
+
+# --------------------------------------TESTS----------------------------------------------
+
+def test_health(server):
+    status, _, payload = request(server, 'GET', '/health')
+    assert status == 200
+    assert payload['status'] == 'ok'
+
+def test_invoke_with_stub_model(server):
+    status, headers, payload = request(server, 'POST', '/invoke', {'question': 'How many customers do we have?'})
+    assert status == 200
+    assert payload['next_action']
+    assert headers['X-Request-ID'] == payload['request_id']
+
+def test_bad_requests(server):
+    assert request(server, 'POST', '/invoke', {'model': 'stub'})[0] == 400                          # No question
+    assert request(server, 'POST', '/unknown', {'question': 'hi'})[0] == 404
+    assert request(server, 'GET', '/unknown')[0] == 404
+
+def test_unknown_model_is_rejected_before_taking_a_slot(server):
+    server.slots.acquire()                                                                          # Server busy
+    try:
+        status, _, payload = request(server, 'POST', '/invoke', {'question': 'hi', 'model': 'no-such-model'})
+    finally:
+        server.slots.release()
+    assert status == 400
+    assert 'no-such-model' in payload['error']
+    assert server.served == 0
+
+def test_busy_server_returns_503(server):
+    server.slots.acquire()
+    try:
+        status, headers, _ = request(server, 'POST', '/invoke', {'question': 'hi'})
+    finally:
+        server.slots.release()
+    assert status == 503
+    assert headers['Retry-After'] == '1'
+
+def test_unknown_default_model():
+    with pytest.raises(ValueError):
+        AgentServer(('127.0.0.1', 0), default_model='no-such-model')
@@ -0,0 +1,51 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Tests of the chart payload LRU cache.
+
+import pytest
+
+from chart_cache import ChartCache
+
+# --------------------------------------FIXTURES-------------------------------------------
+
+@pytest.fixture
+def cache():
+    """Fresh ChartCache holding at most 100 bytes."""
+    ChartCache._instance = None
+    yield ChartCache(max_bytes=100)
+    ChartCache._instance = None
+
+# --------------------------------------TESTS----------------------------------------------
+
+def test_least_recently_used_entries_are_evicted_above_byte_cap(cache):
+    cache.put('a', 1, b'x' * 40)
+    cache.put('b', 1, b'y' * 40)
+    assert cache.lookup('a', 1) == 'x' * 40                                                         # 'a' becomes the most recent
+    cache.put('c', 1, b'z' * 40)
+
+    assert cache.lookup('b', 1) is None
+    assert cache.lookup('a', 1) == 'x' * 40
+    assert cache.lookup('c', 1) == 'z' * 40
+    assert cache.stats()['bytes'] == 80
+
+def test_oversized_and_replaced_entries_keep_byte_count(cache):
+    cache.put('a', 1, b'x' * 60)
+    cache.put('a', 2, b'x' * 30)                                                                    # New version replaces the old one
+    cache.put('big', 1, b'x' * 101)                                                                 # Never cached
+
+    assert cache.lookup('a', 1) is None
+    assert cache.lookup('big', 1) is None
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['bytes'] == 30
+
+def test_file_is_reread_only_when_it_changes(cache, tmp_path):
+    path = tmp_path / 'chart.json'
+    path.write_text('{"data": []}')
+    assert cache.get(str(path), version='v1') == '{"data": []}'
+    path.write_text('{"data": [1]}')
+
+    assert cache.get(str(path), version='v1') == '{"data": []}'                                     # Same version: served from memory
+    assert cache.get(str(path), version='v2') == '{"data": [1]}'
+    assert cache.stats()['hits'] == 1
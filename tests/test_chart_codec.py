@@ -0,0 +1,47 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Tests of the compressed typed-array chart payloads.
+
+import json
+import base64
+
+import numpy as np
+import plotly.express as px
+import plotly.io as pio
+
+from chart_codec import ZSTD_MAGIC, encode_figure, compress_json, decode_payload, figure_from_json
+
+# --------------------------------------TESTS----------------------------------------------
+
+def unpack(values):
+    """Decode a typed array the way Plotly.js does (plain lists are returned as they are)."""
+    if isinstance(values, dict):
+        return np.frombuffer(base64.b64decode(values['bdata']), dtype=values['dtype']).tolist()
+    return list(values)
+
+def sample_figure():
+    return px.bar(x=[f'product {i}' for i in range(20)], y=np.arange(20) * 1.5, title='Sample')
+
+def test_figure_round_trip_keeps_data():
+    fig = sample_figure()
+    payload = encode_figure(fig)
+
+    assert payload[:4] == ZSTD_MAGIC
+    chart = json.loads(decode_payload(payload))
+    assert unpack(chart['data'][0]['x']) == list(fig.data[0].x)
+    np.testing.assert_allclose(unpack(chart['data'][0]['y']), fig.data[0].y)
+    assert figure_from_json(decode_payload(payload)).layout.title.text == 'Sample'
+
+def test_long_numeric_lists_are_packed():
+    chart = json.loads(decode_payload(encode_figure(px.line(x=list(range(50)), y=[v * 2 for v in range(50)]))))
+    assert chart['data'][0]['y']['dtype'] in ('i1', 'i2', 'i4', 'f8')
+    assert 'bdata' in chart['data'][0]['y']
+
+def test_plain_and_compressed_json_decode_the_same():
+    chart_json = pio.to_json(sample_figure())
+    assert decode_payload(chart_json) == chart_json
+    assert decode_payload(chart_json.encode('utf-8')) == chart_json
+    assert decode_payload(compress_json(chart_json)) == chart_json
+    assert figure_from_json(chart_json).layout.title.text == 'Sample'
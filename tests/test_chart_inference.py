@@ -0,0 +1,28 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Tests of the ad-hoc chart inference (cache key and column classification).
+
+import pandas as pd
+
+from chart_inference import query_hash, classify_columns
+
+# --------------------------------------TESTS----------------------------------------------
+
+def test_query_hash_keeps_string_literals_apart():
+    lower = "SELECT * FROM customers WHERE country = 'spain'"
+    upper = "SELECT * FROM customers WHERE country = 'Spain'"
+    assert query_hash(lower) != query_hash(upper)
+    assert query_hash("SELECT * FROM t WHERE name = 'a  b'") != query_hash("SELECT * FROM t WHERE name = 'a b'")
+
+def test_query_hash_ignores_outer_whitespace_and_trailing_semicolon():
+    query = "SELECT country, COUNT(*) FROM customers GROUP BY country"
+    assert query_hash(f"  {query} ;\n") == query_hash(query)
+
+def test_only_id_columns_are_identifiers():
+    df = pd.DataFrame({'id': [1, 2], 'product_id': [3, 4], 'paid': [1.0, 2.0], 'valid': [0, 1],
+                       'amount_paid': [5.0, 6.0]})
+    columns = classify_columns(df)
+    assert columns['categorical'] == ['id', 'product_id']
+    assert columns['numeric'] == ['paid', 'valid', 'amount_paid']
@@ -0,0 +1,138 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Tests of the segmentation pipeline (feature extraction and stable labels).
+
+import sqlite3
+
+import numpy as np
+
+import customer_segmentation
+from customer_segmentation import (FEATURES_QUERY, extract_features, load_data, load_features, preprocess_data,
+                                   run_segmentation)
+from data_manager import DataManager
+
+# --------------------------------------TESTS----------------------------------------------
+
+def test_extract_features_matches_pandas(synthetic_db):
+    data_manager = DataManager()
+    data_manager.load_data(synthetic_db)
+    user_emails, X = extract_features(synthetic_db, conn=data_manager.get_connection())
+
+    conn = sqlite3.connect(synthetic_db)
+    try:
+        customer_data, _ = preprocess_data(*load_data(conn))
+    finally:
+        conn.close()
+    expected = customer_data.set_index('user_email').loc[user_emails, ['purchase_frequency', 'p1', 'member_rating']]
+    np.testing.assert_allclose(X, expected.to_numpy(dtype=float))
+
+def no_pandas_load(*args, **kwargs):
+    raise AssertionError("tables loaded into pandas")
+
+def sqlite_features(db_path: str, conn=None):
+    """extract_features over the SQLite file, run by SQLite itself (the DuckDB sqlite extension needs a download)."""
+    assert conn is None
+    sqlite_conn = sqlite3.connect(db_path)
+    try:
+        rows = sqlite_conn.execute(FEATURES_QUERY.format(prefix='')).fetchall()
+    finally:
+        sqlite_conn.close()
+    return np.array([row[0] for row in rows], dtype=object), np.array([row[1:] for row in rows], dtype=np.float64)
+
+def test_load_features_on_cold_cache_scans_the_file(synthetic_db, monkeypatch):
+    monkeypatch.setattr(customer_segmentation, 'extract_features', sqlite_features)
+    monkeypatch.setattr(customer_segmentation, 'load_data', no_pandas_load)
+    monkeypatch.setattr(DataManager, 'load_data', no_pandas_load)
+
+    conn = sqlite3.connect(synthetic_db)
+    try:
+        customer_data, X_scaled = load_features(synthetic_db, conn)
+    finally:
+        conn.close()
+
+    assert not DataManager().is_loaded                                                              # No transactions DataFrame was built
+    assert len(customer_data) == 2000
+    assert X_scaled.shape == (2000, 3)
+
+def test_run_segmentation_uses_data_manager_connection(synthetic_db, tmp_path, monkeypatch):
+    DataManager().load_data(synthetic_db)                                                           # Warm cache, e.g. inside the app
+    monkeypatch.setattr(customer_segmentation, 'load_data', no_pandas_load)
+
+    customer_data, report = run_segmentation(synthetic_db, str(tmp_path / 'state.json'))
+
+    assert report['total_customers'] == 2000
+    assert customer_data['customer_segment'].nunique() == 5
+
+def test_labels_follow_database_segments_without_state(synthetic_db, tmp_path):
+    run_segmentation(synthetic_db, str(tmp_path / 'first.json'))
+
+    # Renumber the stored segments, as if they came from an older model
+    conn = sqlite3.connect(synthetic_db)
+    conn.execute('UPDATE leads_scored SET customer_segment = (customer_segment + 2) % 5')
+    conn.commit()
+    stored = dict(conn.execute('SELECT user_email, customer_segment FROM leads_scored').fetchall())
+    conn.close()
+
+    customer_data, report = run_segmentation(synthetic_db, str(tmp_path / 'second.json'))
+
+    assert report['changed_customers'] == 0
+    assert (customer_data['user_email'].map(stored) == customer_data['customer_segment']).all()
+
+def test_scheduler_baseline_keeps_labels(synthetic_db, tmp_path, monkeypatch):
+    from segmentation_scheduler import SegmentationScheduler
+
+    monkeypatch.chdir(tmp_path)                                                                     # Invalidated plots live under ./plots
+
+    run_segmentation(synthetic_db, str(tmp_path / 'initial.json'))
+    conn = sqlite3.connect(synthetic_db)
+    conn.execute('UPDATE leads_scored SET customer_segment = 4 - customer_segment')
+    conn.commit()
+    conn.close()
+
+    scheduler = SegmentationScheduler(synthetic_db, str(tmp_path / 'state.json'), threshold=1, use_watchdog=False)
+    assert scheduler.check_once() is False                                                          # Baseline only
+    state = customer_segmentation.load_segmentation_state(str(tmp_path / 'state.json'))
+    assert len(state['centroids']) == 5
+
+    conn = sqlite3.connect(synthetic_db)
+    conn.execute("INSERT INTO transactions SELECT transaction_id + 1000000, purchased_at, user_full_name, user_email, "
+                 "charge_country, product_id FROM transactions LIMIT 20")
+    conn.commit()
+    conn.close()
+
+    assert scheduler.check_once() is True
+    state = customer_segmentation.load_segmentation_state(str(tmp_path / 'state.json'))
+    assert state['last_diff']['moved_fraction'] < 0.05
+
+def test_scheduler_publishes_every_rewrite(synthetic_db, tmp_path, monkeypatch):
+    from data_manager import read_data_version
+    from segmentation_scheduler import SegmentationScheduler
+
+    monkeypatch.chdir(tmp_path)
+    removed = []
+    monkeypatch.setattr('segmentation_scheduler.invalidate_segment_dependents', lambda: removed.append(True))
+    scheduler = SegmentationScheduler(synthetic_db, str(tmp_path / 'state.json'), threshold=10**9,
+                                      use_watchdog=False, min_moved_fraction=1.0)
+    scheduler.check_once()                                                                          # Baseline
+    assert scheduler.check_once() is False                                                          # Below the row threshold
+
+    assert scheduler.check_once(force=True) is True
+    assert read_data_version(synthetic_db) is not None                                              # Published despite few moves
+    assert removed == []                                                                            # Plot files kept below min_moved_fraction
+
+def test_segment_customers_keeps_its_signature(synthetic_db):
+    from customer_segmentation import segment_customers, segment_customers_with_centroids
+
+    conn = sqlite3.connect(synthetic_db)
+    try:
+        customer_data, X_scaled = preprocess_data(*load_data(conn))
+    finally:
+        conn.close()
+    segmented = segment_customers(customer_data.copy(), X_scaled)
+    assert list(segmented.columns)[-1] == 'customer_segment'                                        # A DataFrame, as before
+
+    with_centroids, centroids = segment_customers_with_centroids(customer_data.copy(), X_scaled)
+    assert centroids.shape == (5, 3)
+    assert (with_centroids['customer_segment'] == segmented['customer_segment']).all()
@@ -0,0 +1,29 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Tests of the DataManager cache and its cross-process invalidation.
+
+import sqlite3
+
+from data_manager import DataManager, bump_data_version, read_data_version
+
+# --------------------------------------TESTS----------------------------------------------
+
+def test_bumped_version_reloads_changed_tables(synthetic_db):
+    data_manager = DataManager()
+    data_manager.load_data(synthetic_db)
+    transactions_version = data_manager.get_data_version(['transactions'])
+    segments_version = data_manager.get_data_version(['leads_scored'])
+
+    # Another process rewrites the segments and publishes the change
+    conn = sqlite3.connect(synthetic_db)
+    conn.execute('UPDATE leads_scored SET customer_segment = (customer_segment + 1) % 5')
+    conn.commit()
+    conn.close()
+    assert data_manager.get_data_version(['leads_scored']) == segments_version                      # Not published yet
+    token = bump_data_version(synthetic_db)
+
+    assert read_data_version(synthetic_db) == token
+    assert data_manager.get_data_version(['leads_scored']) != segments_version
+    assert data_manager.get_data_version(['transactions']) == transactions_version                  # Untouched table keeps its version
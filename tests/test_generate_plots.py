@@ -0,0 +1,92 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Tests of plot generation (manifest staleness).
+
+import sqlite3
+
+import pytest
+
+from data_manager import DataManager, bump_data_version
+from generate_plots import PlotGenerator
+
+# --------------------------------------FIXTURES-------------------------------------------
+
+@pytest.fixture
+def plot_generator(tmp_path, monkeypatch):
+    """Fresh PlotGenerator writing its plots and manifest under a temporary directory."""
+    monkeypatch.chdir(tmp_path)
+    PlotGenerator._instance = None
+    yield PlotGenerator()
+    PlotGenerator._instance = None
+
+# --------------------------------------TESTS----------------------------------------------
+
+def test_only_plots_of_changed_tables_are_regenerated(synthetic_db, plot_generator):
+    data_manager = DataManager()
+    data_manager.load_data(synthetic_db)
+
+    first = plot_generator.generate_plots(data_manager, max_workers=2)
+    assert set(first) == {plot['title'] for plot in plot_generator.get_plots()}
+    assert plot_generator.generate_plots(data_manager) == {}                                       # Manifest says everything is fresh
+
+    conn = sqlite3.connect(synthetic_db)
+    conn.execute('UPDATE products SET suggested_price = suggested_price * 2')
+    conn.commit()
+    conn.close()
+    bump_data_version(synthetic_db)
+
+    regenerated = plot_generator.generate_plots(data_manager, max_workers=2)
+    assert set(regenerated) == {plot['title'] for plot in PlotGenerator._plots if 'products' in plot['sources']}
+
+def test_missing_plot_file_is_stale(synthetic_db, plot_generator):
+    data_manager = DataManager()
+    data_manager.load_data(synthetic_db)
+    plot_generator.generate_plots(data_manager, max_workers=2)
+
+    removed = plot_generator.invalidate_plots('customer_segment')
+
+    regenerated = plot_generator.generate_plots(data_manager, max_workers=2)
+    assert {plot_generator.get_plot_by_title(title)['path'] for title in regenerated} == set(removed)
+
+def test_plot_variant_filters_segment_numerically(synthetic_db, plot_generator):
+    data_manager = DataManager()
+    data_manager.load_data(synthetic_db)
+    sales = data_manager.transactions.merge(data_manager.leads_scored[['user_email', 'customer_segment']], on='user_email')
+    expected = sales[sales['customer_segment'] == 2].groupby('user_email').size().sort_values(ascending=False)
+
+    result = plot_generator.get_plot_variant_data('Best Users by Number of Purchases', data_manager, top_n=3, segment='2')
+
+    assert len(result) == 3
+    assert result['purchase_count'].tolist() == expected.head(3).tolist()
+    assert set(result['user_email']) <= set(expected.index)
+
+def test_plot_variant_binds_filters_as_parameters(synthetic_db, plot_generator):
+    data_manager = DataManager()
+    data_manager.load_data(synthetic_db)
+
+    result = plot_generator.get_plot_variant_data('Best Countries by Revenue', data_manager, country="US' OR '1'='1")
+
+    assert result.empty                                                                             # Treated as a value, not as SQL
+
+def test_user_variants_rank_the_same_customers_as_the_stock_plots(synthetic_db, plot_generator):
+    conn = sqlite3.connect(synthetic_db)
+    product_id = conn.execute('SELECT product_id FROM products LIMIT 1').fetchone()[0]
+    conn.executemany('INSERT INTO transactions (transaction_id, purchased_at, user_email, product_id) VALUES (?, ?, ?, ?)',
+                     [(10_000_000 + i, '2024-01-01', 'not.scored@example.com', product_id) for i in range(500)])
+    conn.commit()
+    conn.close()
+    data_manager = DataManager()
+    data_manager.load_data(synthetic_db)
+
+    revenue = plot_generator.get_plot_variant_data('Best Users by Revenue', data_manager, top_n=5)
+    purchases = plot_generator.get_plot_variant_data('Best Users by Number of Purchases', data_manager, top_n=5)
+
+    stock_revenue = plot_generator._query("""SELECT user_email, SUM(total_revenue) AS total_revenue FROM agg_customer
+                                             GROUP BY user_email ORDER BY total_revenue DESC NULLS LAST LIMIT 5""")
+    stock_purchases = plot_generator._query("""SELECT user_email, SUM(purchase_count) AS purchase_count FROM agg_customer
+                                               GROUP BY user_email ORDER BY purchase_count DESC LIMIT 5""")
+    assert 'not.scored@example.com' not in set(revenue['user_name']) | set(purchases['user_email'])  # Not in leads_scored
+    assert revenue['total_revenue'].round(2).tolist() == stock_revenue['total_revenue'].round(2).tolist()
+    assert purchases['purchase_count'].tolist() == stock_purchases['purchase_count'].tolist()
@@ -0,0 +1,45 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Tests of the session plot history.
+
+import json
+
+import plot_history
+from plot_history import PlotHistory, MAX_CHARTS_PER_TURN
+
+# --------------------------------------TESTS----------------------------------------------
+
+def chart(i: int) -> str:
+    return json.dumps({'data': [{'type': 'bar', 'x': ['a', 'b'], 'y': [i, i + 1]}], 'layout': {'title': {'text': f'Chart {i}'}}})
+
+def test_rerun_over_recent_turns_parses_nothing(monkeypatch):
+    parsed = []
+    original = plot_history.figure_from_json
+    monkeypatch.setattr(plot_history, 'figure_from_json', lambda chart_json: parsed.append(chart_json) or original(chart_json))
+
+    history = PlotHistory(recent_turns=5)
+    turns = [[history.add(chart(turn * 10 + i)) for i in range(MAX_CHARTS_PER_TURN)] for turn in range(5)]
+    for turn in turns:                                                                              # First render of every turn
+        for key in turn:
+            history.get_figure(key)
+    assert len(parsed) == 5 * MAX_CHARTS_PER_TURN
+
+    parsed.clear()
+    for turn in turns:                                                                              # Streamlit rerun
+        for key in turn:
+            assert history.get_figure(key) is not None
+    assert parsed == []
+
+def test_duplicate_and_spilled_charts():
+    history = PlotHistory(max_in_memory=2)
+    first = history.add(chart(0))
+    assert history.add(chart(0)) == first                                                           # Stored once per content
+    history.add(chart(1))
+    history.add(chart(2))
+
+    assert len(history) == 3
+    assert history.get_json(first) == chart(0)                                                      # Read back from its spilled file
+    history.clear()
+    assert first not in history
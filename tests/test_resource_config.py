@@ -0,0 +1,52 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Tests of the per-workload thread budgets.
+
+import threading
+
+import duckdb
+from threadpoolctl import threadpool_info
+
+from resource_config import ResourceConfig
+
+# --------------------------------------TESTS----------------------------------------------
+
+def blas_threads():
+    return [info['num_threads'] for info in threadpool_info()]
+
+def test_interactive_blocks_leave_blas_threads_alone():
+    before = blas_threads()
+    barrier = threading.Barrier(4)
+    seen = []
+
+    def query():
+        with ResourceConfig().limit('interactive'):
+            barrier.wait(timeout=5)                                                                 # All blocks overlap
+            seen.append(blas_threads())
+
+    threads = [threading.Thread(target=query) for _ in range(4)]
+    ResourceConfig().configure('interactive', max_concurrent=4)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        ResourceConfig._instance = None                                                             # Back to the default budgets
+
+    assert seen == [before] * 4
+    assert blas_threads() == before
+
+def test_segmentation_limit_is_restored():
+    before = blas_threads()
+    with ResourceConfig().limit('segmentation') as budget:
+        assert all(threads <= budget.threads for threads in blas_threads())
+    assert blas_threads() == before
+
+def test_duckdb_threads_set_once_per_database():
+    conn = duckdb.connect()
+    ResourceConfig().apply_duckdb(conn, 'plots')
+    expected = ResourceConfig().get_budget('plots').threads
+    assert conn.cursor().execute("SELECT current_setting('threads')").fetchone()[0] == expected      # Shared by every cursor
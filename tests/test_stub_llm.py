@@ -0,0 +1,71 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Tests of the stub chat model and its record/replay cassettes.
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from marketing_analyst import Route
+from prompts import ROUTER_PROMPT
+from stub_llm import Cassette, StubChatModel
+
+# --------------------------------------HELPERS--------------------------------------------
+
+class RealModel:
+    """Stands in for a real chat model: a bare route name as text, a Route object as structured output."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return AIMessage(content='email_writer')
+
+    def with_structured_output(self, schema):
+        def structured(messages):
+            self.calls += 1
+            return schema(next='email_writer')
+        return RunnableLambda(structured)
+
+def router_messages(question: str) -> list:
+    return [{'role': 'system', 'content': ROUTER_PROMPT.format(user_question=question)}]
+
+# --------------------------------------TESTS----------------------------------------------
+
+def test_recorded_route_replays(tmp_path):
+    cassette_path = str(tmp_path / 'cassette.json')
+    real_model = RealModel()
+    messages = router_messages('Write a campaign for our best leads')
+
+    recorder = StubChatModel(mode='record', cassette_path=cassette_path, record_from=real_model)
+    assert recorder.with_structured_output(Route).invoke(messages).next == 'email_writer'
+
+    Cassette._cassettes.pop(cassette_path)                                                          # Replay reads the file like a new process
+    replayer = StubChatModel(mode='replay', cassette_path=cassette_path, strict=True)
+    assert replayer.with_structured_output(Route).invoke(messages).next == 'email_writer'
+    assert real_model.calls == 1
+
+def test_scripted_router_returns_routes():
+    router = StubChatModel().with_structured_output(Route)
+    assert router.invoke(router_messages('Write emails to our top customers')).next == 'email_writer'
+    assert router.invoke(router_messages('Which products sell best?')).next == 'data_exploration'
+
+def test_latency_varies_across_repeats_of_a_prompt():
+    def latencies(seed):
+        model = StubChatModel(latency=1.0, latency_jitter=0.5, latency_seed=seed)
+        return [model._next_latency() for _ in range(5)]
+
+    assert len(set(latencies(0))) == 5                                                              # Repeats of one question differ
+    assert latencies(0) == latencies(0)                                                            # Same seed, same stream
+    assert latencies(0) != latencies(1)
+
+def test_changed_stub_settings_build_a_new_stub(monkeypatch):
+    from marketing_analyst import get_llm
+
+    monkeypatch.setenv('STUB_LLM_LATENCY', '0.1')
+    first = get_llm('stub')
+    assert get_llm('stub') is first
+    monkeypatch.setenv('STUB_LLM_LATENCY', '0.5')
+    assert get_llm('stub').latency == 0.5
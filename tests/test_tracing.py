@@ -0,0 +1,43 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: Tests of the per-turn trace export.
+
+import os
+import json
+
+import tracing
+from tracing import Trace, export_trace, span, trace_turn
+
+# --------------------------------------TESTS----------------------------------------------
+
+def test_turns_are_not_exported_by_default(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, 'TRACE_DIR', str(tmp_path))
+    monkeypatch.setattr(tracing, 'TRACE_ENABLED', False)
+    exported = []
+    monkeypatch.setattr(tracing, 'export_trace', lambda trace: exported.append(trace))
+
+    with trace_turn(question='private question') as trace:
+        with span('duckdb_query'):
+            pass
+    assert exported == []
+    assert [record['name'] for record in trace.spans] == ['duckdb_query']                           # Still available in memory
+
+    with trace_turn(profile='cprofile', question='profiled question'):
+        pass
+    assert len(exported) == 1                                                                       # Profiled turns are exported
+
+def test_trace_file_is_rotated(tmp_path):
+    path = str(tmp_path / 'agent_traces.jsonl')
+    for _ in range(10):
+        trace = Trace(question='x' * 200)
+        trace.finish()
+        export_trace(trace, path, max_bytes=1000)
+
+    files = sorted(name for name in os.listdir(tmp_path))
+    assert files == ['agent_traces.jsonl', 'agent_traces.jsonl.1', 'agent_traces.jsonl.2', 'agent_traces.jsonl.3']
+    for name in files:
+        assert os.path.getsize(tmp_path / name) <= 1000
+        with open(tmp_path / name) as f:
+            assert all(json.loads(line)['question'] for line in f)
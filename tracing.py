@@ -0,0 +1,261 @@
+# PROJECT: Data Analyst Agent
+# AUTHOR: Antonio Castañares Rodríguez
+# -----------------------
+
+# DESCRIPTION: This file records a latency breakdown of every agent turn. A turn is a trace made of nested spans (graph
+# nodes, LLM calls, DuckDB queries, JSON serialization, plot selection, chart loading) with their durations, token
+# counts and bytes moved. The last trace is always kept in memory; exporting traces to a local JSONL file (which holds
+# the question text) is opt-in with AGENT_TRACE=1 and the file is rotated by size. A single turn can also be profiled
+# with cProfile or pyinstrument (optional dependency), profiled turns are always exported.
+
+import os
+import json
+import time
+import uuid
+import pstats
+import logging
+import cProfile
+import functools
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# --------------------------------------LOGGING--------------------------------------------
+# Logging configuration (print time, name, level and message using the terminal)
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+# Suppress the httpx library logs to avoid cluttering the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOGGER = logging.getLogger(__name__)
+
+# --------------------------------------VARIABLES------------------------------------------
+
+TRACE_DIR = os.environ.get('AGENT_TRACE_DIR', 'traces')                                         # Trace file and profiles
+TRACE_FILE = os.path.join(TRACE_DIR, 'agent_traces.jsonl')
+TRACE_ENABLED = os.environ.get('AGENT_TRACE', '0') == '1'                                       # AGENT_TRACE=1 exports every turn
+TRACE_MAX_BYTES = int(os.environ.get('AGENT_TRACE_MAX_BYTES', 10 * 1024**2))                    # Trace file size before it is rotated
+TRACE_BACKUPS = 3                                                                               # Rotated files kept (agent_traces.jsonl.1 ...)
+PROFILE_TOP_FUNCTIONS = 15                                                                      # cProfile functions kept in the trace
+
+_current_trace = ContextVar('agent_trace', default=None)                                        # Trace of the running turn
+_current_span = ContextVar('agent_span', default=None)                                          # Innermost open span
+_export_lock = threading.Lock()
+
+# --------------------------------------TRACE CLASS----------------------------------------
+
+class Trace:
+    """Spans recorded during one agent turn."""
+
+    def __init__(self, **attrs):
+        self.trace_id = uuid.uuid4().hex
+        self.timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.attrs = attrs
+        self.spans = []
+        self.profile = None
+        self.duration_ms = None
+        self._start = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.callback = TraceCallbackHandler(self)                                              # Passed to the graph to record LLM calls
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._start) * 1000, 3)
+
+    def open_span(self, name: str, parent=None, **attrs) -> dict:
+        """Start a span (closed with close_span)."""
+        return {'id': next(self._ids), 'parent': parent['id'] if parent else None, 'name': name,
+                'start_ms': self.elapsed_ms(), 'attrs': dict(attrs), '_start': time.perf_counter()}
+
+    def close_span(self, record: dict):
+        """Set the duration of a span and add it to the trace."""
+        record['duration_ms'] = round((time.perf_counter() - record.pop('_start')) * 1000, 3)
+        with self._lock:
+            self.spans.append(record)
+
+    def finish(self):
+        self.duration_ms = self.elapsed_ms()
+        self.spans.sort(key=lambda record: record['start_ms'])
+
+    def breakdown(self) -> dict:
+        """Total milliseconds, calls, tokens and bytes per span name."""
+        totals = {}
+        for record in self.spans:
+            total = totals.setdefault(record['name'], {'calls': 0, 'duration_ms': 0.0, 'tokens': 0, 'bytes': 0})
+            total['calls'] += 1
+            total['duration_ms'] = round(total['duration_ms'] + record['duration_ms'], 3)
+            total['tokens'] += record['attrs'].get('total_tokens', 0)
+            total['bytes'] += record['attrs'].get('bytes', 0)
+        return totals
+
+    def to_dict(self) -> dict:
+        return {'trace_id': self.trace_id, 'timestamp': self.timestamp, 'duration_ms': self.duration_ms,
+                **self.attrs, 'breakdown': self.breakdown(), 'spans': self.spans, 'profile': self.profile}
+
+# --------------------------------------CALLBACK CLASS-------------------------------------
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """LangChain callback that records every LLM call of a turn as an 'llm' span with its token usage."""
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._runs = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        chars = sum(len(str(message.content)) for batch in messages for message in batch)
+        self._start_run(run_id, serialized, chars, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start_run(run_id, serialized, sum(len(prompt) for prompt in prompts), kwargs)
+
+    def _start_run(self, run_id, serialized, chars, kwargs):
+        params = kwargs.get('invocation_params') or {}
+        model = params.get('model') or params.get('model_name') or (serialized or {}).get('name')
+        self._runs[run_id] = self.trace.open_span('llm', _current_span.get(), model=model, bytes=chars)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        record = self._runs.pop(run_id, None)
+        if record is None:
+            return
+        usage, output_chars = {}, 0
+        for generations in response.generations:
+            for generation in generations:
+                output_chars += len(generation.text or '')
+                message_usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None) or {}
+                for key in ('input_tokens', 'output_tokens', 'total_tokens'):
+                    usage[key] = usage.get(key, 0) + message_usage.get(key, 0)
+        record['attrs'].update(usage)
+        record['attrs']['bytes'] += output_chars
+        self.trace.close_span(record)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        record = self._runs.pop(run_id, None)
+        if record is not None:
+            record['attrs']['error'] = str(error)
+            self.trace.close_span(record)
+
+# --------------------------------------FUNCTIONS------------------------------------------
+
+@contextmanager
+def span(name: str, **attrs):
+    """Record a block as a span of the running turn. Yields the span attributes so the block can add
+    counts (e.g. bytes or rows). Does nothing outside a traced turn."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield {}
+        return
+    record = trace.open_span(name, _current_span.get(), **attrs)
+    token = _current_span.set(record)
+    try:
+        yield record['attrs']
+    except Exception as e:
+        record['attrs']['error'] = str(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.close_span(record)
+
+def traced_node(name: str):
+    """Decorator recording a graph node as a 'node:<name>' span."""
+    def decorator(node):
+        @functools.wraps(node)
+        def wrapper(state):
+            with span(f'node:{name}'):
+                return node(state)
+        return wrapper
+    return decorator
+
+def _start_profiler(profile):
+    """Start cProfile or pyinstrument for one turn (None if profiling is off or unavailable)."""
+    if profile == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if profile == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler                                                   # Optional dependency
+        except ImportError:
+            LOGGER.warning("pyinstrument is not installed, turn not profiled")
+            return None
+        profiler = Profiler()
+        profiler.start()
+        return profiler
+    if profile:
+        LOGGER.warning(f"Unknown profiler '{profile}'. Expected 'cprofile' or 'pyinstrument'")
+    return None
+
+def _stop_profiler(profiler, trace: Trace) -> dict:
+    """Stop the profiler, save its output next to the trace file and summarize it."""
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        path = os.path.join(TRACE_DIR, f'{trace.trace_id}.prof')                                 # Open with snakeviz or pstats
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler)
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+        functions = [{'function': f'{file}:{line}({func})', 'calls': calls, 'cumulative_ms': round(cumulative * 1000, 3)}
+                     for (file, line, func), (_, calls, _, cumulative, _) in top]
+        return {'profiler': 'cprofile', 'path': path, 'top_cumulative': functions}
+    profiler.stop()
+    path = os.path.join(TRACE_DIR, f'{trace.trace_id}.html')
+    with open(path, 'w') as f:
+        f.write(profiler.output_html())
+    return {'profiler': 'pyinstrument', 'path': path}
+
+def _rotate(path: str, backups: int = TRACE_BACKUPS):
+    """Shift path -> path.1 -> ... -> path.<backups>, dropping the oldest file."""
+    for index in range(backups - 1, 0, -1):
+        if os.path.exists(f'{path}.{index}'):
+            os.replace(f'{path}.{index}', f'{path}.{index + 1}')
+    if backups > 0:
+        os.replace(path, f'{path}.1')
+    else:
+        os.remove(path)
+
+def export_trace(trace: Trace, path: str = TRACE_FILE, max_bytes: int = TRACE_MAX_BYTES):
+    """Append a finished trace to the JSONL trace file, rotating it first if it would exceed max_bytes."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    line = json.dumps(trace.to_dict(), default=str) + '\n'
+    with _export_lock:
+        if os.path.exists(path) and os.path.getsize(path) + len(line.encode('utf-8')) > max_bytes:
+            _rotate(path)
+        with open(path, 'a') as f:
+            f.write(line)
+
+@contextmanager
+def trace_turn(profile: str = None, **attrs):
+    """Trace one agent turn: spans opened inside the block (and LLM calls made with trace.callback) are recorded,
+    then the trace is exported to the JSONL trace file if tracing is enabled or the turn was profiled.
+
+    Args:
+        profile: None, 'cprofile' or 'pyinstrument' to profile this turn only.
+        attrs: Fields stored with the trace (question, model, route...).
+    Yields:
+        Trace: The trace of the turn.
+    """
+    trace = Trace(**attrs)
+    token = _current_trace.set(trace)
+    profiler = _start_profiler(profile)
+    try:
+        yield trace
+    except Exception as e:
+        trace.attrs['error'] = str(e)
+        raise
+    finally:
+        if profiler is not None:
+            trace.profile = _stop_profiler(profiler, trace)
+        trace.finish()
+        try:
+            _current_trace.reset(token)
+        except ValueError:                                                                      # Streamed turn closed from another context
+            _current_trace.set(None)
+        if TRACE_ENABLED or profile:
+            try:
+                export_trace(trace)
+            except OSError as e:
+                LOGGER.warning(f"Could not export trace {trace.trace_id}: {e}")